@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+alert_coalescer.py
+Time-windowed aggregation of failure and recovery alerts
+Groups alerts per cluster into one digest, switches to a cluster-level alert past the threshold, suppresses repeats
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class AlertCoalescer:
+    """Holds alerts for a short window and hands each (kind, cluster) group to deliver(group) once"""
+
+    def __init__(self, config, deliver):
+        self.logger = logging.getLogger(__name__)
+        self.deliver = deliver
+
+        coalesce_config = config.get('alert_coalescing', {})
+        self.enabled = coalesce_config.get('enabled', True)
+        self.window = coalesce_config.get('window_seconds', 60)
+        self.quiet_period = coalesce_config.get('quiet_period_minutes', 30) * 60
+        self.state_file = coalesce_config.get('state_file', '/opt/kafka-monitor/state/alert_quiet.json')
+        self.cluster_threshold = config.get('thresholds', {}).get('cluster_failure_threshold', 2)
+
+        # Hosts map to clusters through an optional 'cluster' key on each server entry
+        default_cluster = coalesce_config.get('cluster_name', 'kafka')
+        self.clusters = {server['host']: server.get('cluster', default_cluster) for server in config.get('servers', [])}
+        self.default_cluster = default_cluster
+
+        self.groups = OrderedDict()        # (kind, cluster) -> open group
+        self.quiet = {}                    # fingerprint -> last announcement (epoch seconds, kind, service key)
+        self.suppressed = {}               # fingerprint -> repeats dropped since the last announcement
+        self.stopping = False
+        self.thread = None
+        self.condition = threading.Condition()
+        self.metrics = {'received': 0, 'merged': 0, 'suppressed': 0, 'emails': 0, 'digests': 0, 'cluster_alerts': 0}
+
+        if self.enabled:
+            self.load()
+
+    def start(self):
+        """Start the flusher thread; returns self"""
+        if self.enabled:
+            self.thread = threading.Thread(target=self._run, name='alert-coalescer', daemon=True)
+            self.thread.start()
+        return self
+
+    def add(self, kind, host, service, signature, payload):
+        """Queue one alert; True once it is held for the window or suppressed as a repeat"""
+        service_key = f"{host}:{service}"
+        fingerprint = self.fingerprint(kind, service_key, signature)
+        cluster = self.clusters.get(host, self.default_cluster)
+        now = time.time()
+
+        with self.condition:
+            self.metrics['received'] += 1
+            announced = self.quiet.get(fingerprint)
+            if announced and now - announced['at'] < self.quiet_period:
+                self.suppressed[fingerprint] = self.suppressed.get(fingerprint, 0) + 1
+                self.metrics['suppressed'] += 1
+                self.logger.info(
+                    f"Suppressed repeat {kind} alert for {service_key} "
+                    f"(announced {(now - announced['at']) / 60:.0f} min ago, quiet period {self.quiet_period / 60:.0f} min)"
+                )
+                return True
+
+            key = (kind, cluster)
+            group = self.groups.get(key)
+            if group is None:
+                group = {'kind': kind, 'cluster': cluster, 'deadline': time.monotonic() + self.window, 'alerts': OrderedDict()}
+                self.groups[key] = group
+                self.condition.notify()
+
+            alert = group['alerts'].get(fingerprint)
+            if alert is not None:
+                # Same service and signature again inside the window: keep the newest details, count the repeat
+                alert['payload'] = payload
+                alert['repeats'] += 1
+                self.metrics['merged'] += 1
+            else:
+                group['alerts'][fingerprint] = {
+                    'fingerprint': fingerprint,
+                    'host': host,
+                    'service': service,
+                    'service_key': service_key,
+                    'first_seen': now,
+                    'repeats': 0,
+                    'payload': payload,
+                }
+            pending = len(group['alerts'])
+
+        self.logger.info(f"Holding {kind} alert for {service_key} ({pending} in the {cluster} window)")
+        return True
+
+    def flush(self):
+        """Deliver every open group now (shutdown, one-shot runs)"""
+        with self.condition:
+            groups = list(self.groups.values())
+            self.groups.clear()
+        for group in groups:
+            self._emit(group)
+
+    def close(self):
+        if self.thread is not None:
+            with self.condition:
+                self.stopping = True
+                self.condition.notify_all()
+            self.thread.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        with self.condition:
+            return {
+                **self.metrics,
+                'open_groups': len(self.groups),
+                'held': sum(len(group['alerts']) for group in self.groups.values()),
+                'quiet_fingerprints': len(self.quiet),
+            }
+
+    @staticmethod
+    def fingerprint(kind, service_key, signature):
+        return hashlib.sha1(f"{kind}|{service_key}|{signature}".encode('utf-8')).hexdigest()[:12]
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.stopping:
+                    return
+                now = time.monotonic()
+                due = [key for key, group in self.groups.items() if group['deadline'] <= now]
+                if not due:
+                    deadlines = [group['deadline'] for group in self.groups.values()]
+                    self.condition.wait(max(min(deadlines) - now, 0.01) if deadlines else None)
+                    continue
+                groups = [self.groups.pop(key) for key in due]
+
+            for group in groups:
+                self._emit(group)
+
+    def _emit(self, group):
+        alerts = list(group['alerts'].values())
+        services = {alert['service_key'] for alert in alerts}
+        group['cluster_level'] = len(services) >= self.cluster_threshold
+        now = time.time()
+
+        with self.condition:
+            for alert in alerts:
+                alert['suppressed'] = self.suppressed.pop(alert['fingerprint'], 0)
+                # A state change re-arms the opposite kind: a failure after an announced recovery is never suppressed
+                for fingerprint, announced in list(self.quiet.items()):
+                    if announced['service_key'] == alert['service_key'] and announced['kind'] != group['kind']:
+                        del self.quiet[fingerprint]
+                        self.suppressed.pop(fingerprint, None)
+                self.quiet[alert['fingerprint']] = {'at': now, 'kind': group['kind'], 'service_key': alert['service_key']}
+            self.metrics['emails'] += 1
+            if len(alerts) > 1:
+                self.metrics['digests'] += 1
+            if group['cluster_level']:
+                self.metrics['cluster_alerts'] += 1
+
+        level = 'cluster-level alert' if group['cluster_level'] else ('digest' if len(alerts) > 1 else 'alert')
+        self.logger.info(f"Sending {group['kind']} {level} for {group['cluster']}: {len(alerts)} alert(s) across {len(services)} service(s)")
+        try:
+            self.deliver(group)
+        except Exception as e:
+            self.logger.error(f"Error delivering {group['kind']} alerts for {group['cluster']}: {e}")
+        self.save()
+
+    def load(self):
+        """Load announcement times so repeats stay suppressed across restarts and one-shot runs"""
+        if not self.state_file or not Path(self.state_file).exists():
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                quiet = json.load(f)
+            cutoff = time.time() - self.quiet_period
+            self.quiet = {fingerprint: announced for fingerprint, announced in quiet.items() if announced['at'] >= cutoff}
+        except Exception as e:
+            self.logger.warning(f"Error loading alert quiet state from {self.state_file}: {e}")
+
+    def save(self):
+        if not self.state_file:
+            return
+        path = Path(self.state_file)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            cutoff = time.time() - self.quiet_period
+            with self.condition:
+                self.quiet = {fingerprint: announced for fingerprint, announced in self.quiet.items() if announced['at'] >= cutoff}
+                quiet = dict(self.quiet)
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(quiet, f)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            self.logger.error(f"Error saving alert quiet state to {path}: {e}")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+analysis_cache.py
+Fingerprint-keyed cache for AI analysis results
+LRU + TTL eviction with an on-disk store that survives monitor restarts
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def fingerprint(*parts):
+    """Stable SHA-256 fingerprint of normalized key parts"""
+    normalized = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """Thread-safe LRU/TTL cache of analysis text keyed by fingerprint"""
+
+    def __init__(self, config, section='analysis_cache'):
+        self.logger = logging.getLogger(__name__)
+
+        cache_config = config.get(section, {})
+        self.enabled = cache_config.get('enabled', True)
+        self.max_entries = cache_config.get('max_entries', 500)
+        self.ttl_seconds = cache_config.get('ttl_hours', 24) * 3600
+        self.state_file = cache_config.get('state_file')
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'stores': 0}
+
+        if self.enabled and self.state_file:
+            self.load()
+
+    def get(self, key, ttl_seconds=None):
+        """Return the cached entry dict for key, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.metrics['misses'] += 1
+                return None
+
+            if time.time() - entry['stored_at'] > ttl:
+                del self.entries[key]
+                self.metrics['expirations'] += 1
+                self.metrics['misses'] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            entry['hits'] = entry.get('hits', 0) + 1
+            self.metrics['hits'] += 1
+            return dict(entry)
+
+    def put(self, key, value, **metadata):
+        """Store a value and persist the cache"""
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.entries[key] = {'value': value, 'stored_at': time.time(), 'hits': 0, **metadata}
+            self.entries.move_to_end(key)
+            self.metrics['stores'] += 1
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+
+        self.save()
+
+    def invalidate(self, key=None):
+        """Drop one entry, or the whole cache when key is None"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+        self.save()
+
+    def stats(self):
+        """Hit/miss metrics for logging and reports"""
+        with self.lock:
+            lookups = self.metrics['hits'] + self.metrics['misses']
+            return {
+                **self.metrics,
+                'entries': len(self.entries),
+                'hit_rate': round(self.metrics['hits'] / lookups, 3) if lookups else 0.0,
+            }
+
+    def load(self):
+        """Load non-expired entries from disk"""
+        path = Path(self.state_file)
+        if not path.exists():
+            return
+
+        try:
+            with open(path, 'r') as f:
+                stored = json.load(f)
+
+            now = time.time()
+            for key, entry in stored.get('entries', []):
+                if now - entry.get('stored_at', 0) <= self.ttl_seconds:
+                    self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+            self.logger.info(f"Loaded {len(self.entries)} cached analyses from {path}")
+        except Exception as e:
+            self.logger.error(f"Error loading analysis cache from {path}: {e}")
+            self.entries.clear()
+
+    def save(self):
+        """Write the cache to disk atomically, preserving LRU order"""
+        if not self.state_file:
+            return
+
+        path = Path(self.state_file)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self.lock:
+                snapshot = {'entries': list(self.entries.items())}
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Error saving analysis cache to {path}: {e}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+analysis_queue.py
+Central, prioritized queue in front of LogAnalyzer
+Caps concurrent LLM generations and merges duplicate in-flight requests
+Speculative requests can be cancelled or downgraded to background priority
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from ollama_client import CancelToken, GenerationCancelled
+
+SEVERITY_PRIORITY = {'Critical': 0, 'High': 1, 'Medium': 2, 'Low': 3}
+BACKGROUND_PRIORITY = len(SEVERITY_PRIORITY) + 1
+
+
+class AnalysisQueue:
+    """Priority queue of analysis requests drained by a fixed pool of workers"""
+
+    def __init__(self, config, analyzer):
+        self.analyzer = analyzer
+        self.logger = logging.getLogger(__name__)
+
+        queue_config = config.get('analysis_queue', {})
+        self.max_concurrent = max(1, queue_config.get('max_concurrent_generations', 1))
+        if analyzer.client.name == 'llama_cpp' and self.max_concurrent > 1:
+            # One in-process model evaluates one prompt at a time; extra workers would only queue on
+            # its lock, outside severity order
+            self.logger.info(f"llama.cpp backend: analysis concurrency {self.max_concurrent} -> 1")
+            self.max_concurrent = 1
+        self.service_priority = queue_config.get('service_priority', {'zookeeper': 0, 'kafka': 1})
+        self.default_service_priority = max(self.service_priority.values(), default=0) + 1
+
+        self.queue = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.in_flight = {}
+        self.requests = {}      # future -> {'token', 'shares', 'background'}
+        self.lock = threading.Lock()
+
+        self.metrics = {
+            'submitted': 0,
+            'merged': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'downgraded': 0,
+            'max_depth': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+        self.wait_times = []
+
+        self.workers = []
+        for index in range(self.max_concurrent):
+            worker = threading.Thread(target=self._worker, name=f"analysis-worker-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def priority(self, service_name, severity):
+        """Lower sorts first: severity, then service (ZooKeeper ahead of Kafka)"""
+        return (
+            SEVERITY_PRIORITY.get(severity, len(SEVERITY_PRIORITY)),
+            self.service_priority.get(service_name, self.default_service_priority),
+        )
+
+    def submit(self, service_name, log_content, server_host, log_templates=None, exceptions=None, evidence=None):
+        """Queue an analysis and return a Future; identical in-flight requests share one Future"""
+        if log_templates is None:
+            log_templates = self.analyzer.summarize_log_templates(log_content)
+        if exceptions is None:
+            exceptions = self.analyzer.fold_exceptions(log_content)
+
+        severity = self.analyzer.estimate_severity(service_name, log_templates)
+        key = self.analyzer.analysis_fingerprint(service_name, severity, log_templates, exceptions)
+
+        with self.lock:
+            existing = self.in_flight.get(key)
+            if existing is not None and not existing.cancelled() and not self.requests[existing]['token'].cancelled:
+                self.metrics['merged'] += 1
+                state = self.requests[existing]
+                state['shares'] += 1
+                # Someone is waiting on it again
+                state['background'] = False
+                self.logger.info(f"Merged duplicate analysis request for {service_name} on {server_host}")
+                return existing
+
+            future = Future()
+            self.in_flight[key] = future
+            self.requests[future] = {'token': CancelToken(), 'shares': 1, 'background': False}
+            self.metrics['submitted'] += 1
+
+        request = (service_name, log_content, server_host, log_templates, exceptions, evidence)
+        self.queue.put((self.priority(service_name, severity), next(self.sequence), time.monotonic(), key, request, future))
+
+        depth = self.queue.qsize()
+        with self.lock:
+            self.metrics['max_depth'] = max(self.metrics['max_depth'], depth)
+        self.logger.debug(f"Queued {severity} analysis for {service_name} on {server_host} (depth {depth})")
+        return future
+
+    def analyze(self, service_name, log_content, server_host, log_templates=None, exceptions=None, evidence=None, timeout=None):
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(service_name, log_content, server_host, log_templates, exceptions, evidence).result(timeout=timeout)
+
+    def cancel(self, future):
+        """Withdraw one interest in a request; cancels it (queued or generating) once nobody else shares it"""
+        with self.lock:
+            state = self.requests.get(future)
+            if state is None:
+                return False
+            state['shares'] -= 1
+            if state['shares'] > 0:
+                return False
+            self.metrics['cancelled'] += 1
+
+        if not future.cancel():
+            # Already generating: stop the stream
+            state['token'].cancel()
+        return True
+
+    def downgrade(self, future):
+        """Move a request nobody is waiting on urgently behind all other work"""
+        with self.lock:
+            state = self.requests.get(future)
+            if state is None or state['shares'] > 1:
+                return False
+            state['background'] = True
+            self.metrics['downgraded'] += 1
+        return True
+
+    def stats(self):
+        """Queue depth, wait time and throughput metrics"""
+        with self.lock:
+            waits = sorted(self.wait_times)
+            started = len(waits)
+            return {
+                **self.metrics,
+                'depth': self.queue.qsize(),
+                'in_flight': len(self.in_flight),
+                'max_concurrent': self.max_concurrent,
+                'avg_wait_seconds': round(self.metrics['total_wait_seconds'] / started, 3) if started else 0.0,
+                'p95_wait_seconds': round(waits[int(0.95 * (started - 1))], 3) if started else 0.0,
+            }
+
+    def _worker(self):
+        while True:
+            priority, sequence, queued_at, key, request, future = self.queue.get()
+            with self.lock:
+                state = self.requests.get(future)
+                requeue = state is not None and state['background'] and priority[0] != BACKGROUND_PRIORITY and not future.cancelled()
+            if requeue:
+                # Downgraded while queued: re-enter behind everything else
+                self.queue.put(((BACKGROUND_PRIORITY, 0), sequence, queued_at, key, request, future))
+                self.queue.task_done()
+                continue
+
+            wait = time.monotonic() - queued_at
+            with self.lock:
+                self.metrics['total_wait_seconds'] += wait
+                self.metrics['max_wait_seconds'] = max(self.metrics['max_wait_seconds'], wait)
+                self.wait_times.append(wait)
+                del self.wait_times[:-1000]
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    service_name, log_content, server_host, log_templates, exceptions, evidence = request
+                    future.set_result(self.analyzer.analyze_service_logs(
+                        service_name=service_name,
+                        log_content=log_content,
+                        server_host=server_host,
+                        log_templates=log_templates,
+                        exceptions=exceptions,
+                        evidence=evidence,
+                        cancel_token=state['token'] if state else None
+                    ))
+                    with self.lock:
+                        self.metrics['completed'] += 1
+            except GenerationCancelled as e:
+                self.logger.info(f"Analysis request {key[:12]} cancelled")
+                future.set_exception(e)
+            except Exception as e:
+                self.logger.error(f"Analysis request failed: {e}")
+                future.set_exception(e)
+                with self.lock:
+                    self.metrics['failed'] += 1
+            finally:
+                with self.lock:
+                    if self.in_flight.get(key) is future:
+                        del self.in_flight[key]
+                    self.requests.pop(future, None)
+                self.queue.task_done()
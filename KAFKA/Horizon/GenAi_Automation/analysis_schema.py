@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+analysis_schema.py
+Compact JSON schema for structured AI analysis (Ollama `format`)
+Validation, free-text field extraction and rendering in the classic section layout
+"""
+
+import json
+import re
+
+from rule_engine import ACTION_ORDER, SEVERITY_ORDER
+
+ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'summary': {'type': 'string', 'maxLength': 400},
+        'root_cause': {'type': 'string', 'maxLength': 600},
+        'severity': {'type': 'string', 'enum': SEVERITY_ORDER},
+        'severity_reason': {'type': 'string', 'maxLength': 200},
+        'action': {'type': 'string', 'enum': ACTION_ORDER},
+        'immediate_actions': {'type': 'array', 'items': {'type': 'string', 'maxLength': 200}, 'maxItems': 3},
+        'steps': {'type': 'array', 'items': {'type': 'string', 'maxLength': 200}, 'maxItems': 6},
+        'prevention': {'type': 'array', 'items': {'type': 'string', 'maxLength': 200}, 'maxItems': 3},
+        'related_components': {'type': 'array', 'items': {'type': 'string', 'maxLength': 60}, 'maxItems': 5},
+    },
+    'required': ['summary', 'root_cause', 'severity', 'action', 'steps'],
+}
+
+# Appended to the analysis prompt in structured mode instead of the section template
+JSON_INSTRUCTIONS = f"""Respond with ONLY a JSON object (no prose, no markdown) with these fields:
+- "summary": main issue in 2-3 sentences
+- "root_cause": technical explanation of what went wrong
+- "severity": one of {', '.join(SEVERITY_ORDER)}
+- "severity_reason": why, in one sentence
+- "action": one of {', '.join(ACTION_ORDER)} (what the monitor should do next)
+- "immediate_actions": up to 3 urgent actions
+- "steps": up to 6 solution steps, including configuration changes
+- "prevention": up to 3 prevention measures
+- "related_components": other services or components affected
+"""
+
+LIST_FIELDS = ('immediate_actions', 'steps', 'prevention', 'related_components')
+SEVERITY_LINE = re.compile(r'SEVERITY LEVEL:\s*\n?\s*\[?(%s)\b' % '|'.join(SEVERITY_ORDER), re.IGNORECASE)
+ACTION_LINE = re.compile(r'RECOMMENDED ACTION:\s*\n?\s*(%s)\b' % '|'.join(re.escape(a) for a in ACTION_ORDER), re.IGNORECASE)
+SECTION = r'%s:\s*\n(.*?)(?:\n\s*\n[A-Z][A-Z ]+:|\Z)'
+LIST_ITEM = re.compile(r'^\s*(?:\d+[.)]|[-*•])\s+(.*\S)')
+
+
+def parse_analysis(text):
+    """Validate a JSON reply against ANALYSIS_SCHEMA; returns normalized fields or raises ValueError"""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.strip('`').split('\n', 1)[-1]
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in reply")
+
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("reply is not a JSON object")
+
+    missing = [name for name in ANALYSIS_SCHEMA['required'] if not data.get(name)]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+
+    severity = str(data['severity']).strip().capitalize()
+    if severity not in SEVERITY_ORDER:
+        raise ValueError(f"unknown severity {data['severity']!r}")
+    action = str(data['action']).strip().lower().replace(' ', '-').replace('_', '-')
+    if action not in ACTION_ORDER:
+        raise ValueError(f"unknown action {data['action']!r}")
+
+    fields = {
+        'summary': str(data['summary']).strip(),
+        'root_cause': str(data['root_cause']).strip(),
+        'severity': severity,
+        'severity_reason': str(data.get('severity_reason') or '').strip(),
+        'action': action,
+    }
+    for name in LIST_FIELDS:
+        value = data.get(name) or []
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            raise ValueError(f"{name} is not a list")
+        limit = ANALYSIS_SCHEMA['properties'][name]['maxItems']
+        fields[name] = [str(item).strip() for item in value if str(item).strip()][:limit]
+    if not fields['steps']:
+        raise ValueError("no solution steps")
+    return fields
+
+
+def extract_fields(text, default_severity=None, default_action=None):
+    """Best-effort severity, action and steps from a free-text (section layout) analysis"""
+    severity = SEVERITY_LINE.search(text)
+    action = ACTION_LINE.search(text)
+    return {
+        'summary': _section(text, 'PROBLEM SUMMARY'),
+        'root_cause': _section(text, 'ROOT CAUSE'),
+        'severity': severity.group(1).capitalize() if severity else default_severity,
+        'action': action.group(1).lower() if action else default_action,
+        'immediate_actions': _items(_section(text, 'IMMEDIATE ACTIONS')),
+        'steps': _items(_section(text, 'SOLUTION STEPS')),
+        'prevention': _items(_section(text, 'PREVENTION MEASURES')),
+    }
+
+
+def render_analysis(fields):
+    """Structured fields in the classic section layout (incident index, plain-text email)"""
+    numbered = lambda items: '\n'.join(f"{i + 1}. {item}" for i, item in enumerate(items)) or '-'
+    bulleted = lambda items: '\n'.join(f"- {item}" for item in items) or '-'
+    reason = f" - {fields['severity_reason']}" if fields.get('severity_reason') else ''
+    return f"""PROBLEM SUMMARY:
+{fields['summary']}
+
+ROOT CAUSE:
+{fields['root_cause']}
+
+SEVERITY LEVEL:
+{fields['severity']}{reason}
+
+RECOMMENDED ACTION:
+{fields['action']}
+
+IMMEDIATE ACTIONS:
+{numbered(fields.get('immediate_actions', []))}
+
+SOLUTION STEPS:
+{numbered(fields.get('steps', []))}
+
+PREVENTION MEASURES:
+{bulleted(fields.get('prevention', []))}
+
+RELATED COMPONENTS:
+{', '.join(fields.get('related_components', [])) or '-'}
+"""
+
+
+def _section(text, header):
+    match = re.search(SECTION % re.escape(header), text, re.DOTALL)
+    return match.group(1).strip() if match else ''
+
+
+def _items(section):
+    return [match.group(1) for match in map(LIST_ITEM.match, section.splitlines()) if match]
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+anomaly_detector.py
+Streaming EWMA rate anomaly detection on log levels and templates
+Raises early-warning events before a port check fails and keeps pre-failure context for the AI
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from log_columns import LEVEL_CODES, ColumnarLog
+
+RECONNECT_PATTERN = re.compile(
+    r'could not be established|Connection refused|Reconnect|Retrying|Unable to connect|'
+    r'Session expired|Cannot open channel|Disconnected|connection loss|will attempt to reconnect',
+    re.IGNORECASE
+)
+
+
+class RateAnomalyDetector:
+    """Per-service EWMA mean/variance of per-bucket counts for levels, reconnect loops and templates
+
+    Each series is one row in a set of NumPy arrays (about 40 bytes per series), so tens of
+    thousands of templates across the fleet stay small in memory and on disk.
+    """
+
+    ALERT_KINDS = ('level', 'reconnect')
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        detector_config = config.get('anomaly_detection', {})
+        self.enabled = detector_config.get('enabled', True)
+        self.bucket_seconds = detector_config.get('bucket_seconds', 60)
+        self.alpha = detector_config.get('ewma_alpha', 0.1)
+        self.z_threshold = detector_config.get('z_threshold', 4.0)
+        self.min_count = detector_config.get('min_count', 5)
+        self.warmup_buckets = detector_config.get('warmup_buckets', 10)
+        self.levels = detector_config.get('levels', ['ERROR', 'WARN'])
+        self.track_templates = detector_config.get('track_templates', True)
+        self.cooldown = detector_config.get('alert_cooldown_minutes', 30) * 60
+        self.max_series = detector_config.get('max_series', 50000)
+        self.max_gap_updates = detector_config.get('max_gap_updates', 120)
+        self.state_file = detector_config.get('state_file', '/opt/kafka-monitor/state/anomaly_detector.npz')
+
+        self.lock = threading.Lock()
+        self.rows = {}              # (service_key, kind, name) -> row
+        self.keys = []              # row -> (service_key, kind, name)
+        self.service_rows = {}      # service_key -> [row]
+        self.size = 0
+        self._allocate(1024)
+
+        self.samples = {}           # row -> first line of the open bucket (alerting kinds only)
+        self.events = {}            # service_key -> deque of recent events
+        self.last_alert = {}        # (service_key, series) -> time.time() of last alert
+        self.positions = {}         # watched log -> (inode, offset) already fed in; saved with the series
+
+        if self.enabled and self.state_file:
+            self.load()
+
+    def _allocate(self, capacity):
+        self.mean = np.zeros(capacity, dtype=np.float32)
+        self.var = np.zeros(capacity, dtype=np.float32)
+        self.current = np.zeros(capacity, dtype=np.int32)     # count in the open bucket
+        self.bucket = np.full(capacity, -1, dtype=np.int64)   # index of the open bucket
+        self.observed = np.zeros(capacity, dtype=np.int32)    # closed buckets seen
+
+    def _grow(self):
+        capacity = len(self.mean) * 2
+        for name in ('mean', 'var', 'current', 'observed'):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(capacity - len(array), dtype=array.dtype)]))
+        self.bucket = np.concatenate([self.bucket, np.full(capacity - len(self.bucket), -1, dtype=np.int64)])
+
+    def _row(self, service_key, kind, name):
+        key = (service_key, kind, name)
+        row = self.rows.get(key)
+        if row is None:
+            if self.size >= self.max_series:
+                return None
+            if self.size >= len(self.mean):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[key] = row
+            self.keys.append(key)
+            self.service_rows.setdefault(service_key, []).append(row)
+        return row
+
+    def _close(self, row, bucket):
+        """Fold the open bucket into the EWMA, then decay through empty buckets up to bucket"""
+        event = None
+        if self.bucket[row] >= 0:
+            count = float(self.current[row])
+            mean, var = float(self.mean[row]), float(self.var[row])
+            if self.observed[row] >= self.warmup_buckets and count >= self.min_count:
+                z = (count - mean) / max(np.sqrt(var), 1.0)
+                if z >= self.z_threshold:
+                    event = (int(self.bucket[row]), int(count), mean, float(np.sqrt(var)), float(z), self.samples.get(row, ''))
+
+            # O(1) EWMA mean/variance update
+            delta = count - mean
+            mean += self.alpha * delta
+            var = (1 - self.alpha) * (var + self.alpha * delta * delta)
+
+            # Empty buckets in between count as zeros (capped; the series has decayed by then)
+            for _ in range(min(int(bucket - self.bucket[row] - 1), self.max_gap_updates)):
+                var = (1 - self.alpha) * (var + self.alpha * mean * mean)
+                mean -= self.alpha * mean
+
+            self.mean[row], self.var[row] = mean, var
+            self.observed[row] += 1
+        self.bucket[row] = bucket
+        self.current[row] = 0
+        return event
+
+    def _count(self, row, bucket, raised, line=None):
+        if bucket < self.bucket[row]:
+            # Already folded into the EWMA (re-read after a rotation or a lost position)
+            return
+        if bucket > self.bucket[row]:
+            event = self._close(row, bucket)
+            if event:
+                raised.append((row, event))
+        if line is not None and self.current[row] == 0:
+            # First line of the bucket is kept as the example for an alert on it
+            self.samples[row] = line
+        self.current[row] += 1
+
+    def observe(self, service_key, log_content, template_lookup=None, now=None):
+        """Feed newly appended log text for a service; returns new early-warning events"""
+        if not self.enabled or not log_content:
+            return []
+
+        columns = ColumnarLog.parse(log_content, template_lookup if self.track_templates else None)
+        if not len(columns):
+            return []
+
+        buckets = columns.timestamps.astype('datetime64[s]').astype(np.int64) // self.bucket_seconds
+        level_names = {LEVEL_CODES[name]: name for name in self.levels}
+        raised = []
+
+        with self.lock:
+            level_rows = {code: self._row(service_key, 'level', name) for code, name in level_names.items()}
+            reconnect_row = self._row(service_key, 'reconnect', 'reconnect-loop')
+
+            for index in range(len(columns)):
+                bucket = int(buckets[index])
+                first_line = None
+
+                row = level_rows.get(int(columns.levels[index]))
+                if row is not None:
+                    first_line = self._first_line(columns, index)
+                    self._count(row, bucket, raised, first_line)
+
+                if reconnect_row is not None:
+                    first_line = first_line or self._first_line(columns, index)
+                    if RECONNECT_PATTERN.search(first_line):
+                        self._count(reconnect_row, bucket, raised, first_line)
+
+                template_id = int(columns.templates[index])
+                if template_id >= 0:
+                    template_row = self._row(service_key, 'template', template_id)
+                    if template_row is not None:
+                        self._count(template_row, bucket, raised)
+
+            # Close every bucket that ended before the newest record so a burst right before
+            # the service goes quiet is still evaluated; idle series start counting zeros
+            latest = int(buckets.max())
+            for row in self.service_rows.get(service_key, []):
+                if self.bucket[row] < latest:
+                    event = self._close(row, latest)
+                    if event:
+                        raised.append((row, event))
+
+            return self._record_events(service_key, raised, now or time.time())
+
+    def _first_line(self, columns, index):
+        start = int(columns.starts[index])
+        end = columns.buffer.find(b'\n', start, int(columns.ends[index]))
+        return columns.buffer[start:end if end >= 0 else int(columns.ends[index])].decode('utf-8', 'replace').strip()
+
+    def _record_events(self, service_key, raised, now):
+        alerts = []
+        history = self.events.setdefault(service_key, deque(maxlen=50))
+
+        for row, (bucket, count, mean, stddev, z, sample) in raised:
+            _, kind, name = self.keys[row]
+            event = {
+                'service': service_key,
+                'kind': kind,
+                'series': name,
+                'time': np.datetime64(bucket * self.bucket_seconds, 's').astype(datetime).strftime('%Y-%m-%d %H:%M:%S'),
+                'count': count,
+                'baseline': round(mean, 2),
+                'stddev': round(stddev, 2),
+                'z': round(z, 1),
+                'sample': sample[:300],
+            }
+            history.append(event)
+
+            if kind not in self.ALERT_KINDS:
+                continue
+            alert_key = (service_key, f"{kind}:{name}")
+            if now - self.last_alert.get(alert_key, 0) < self.cooldown:
+                continue
+            self.last_alert[alert_key] = now
+            alerts.append(event)
+
+        if alerts:
+            self.logger.warning(f"Early warning for {service_key}: " + ', '.join(f"{e['series']} {e['count']}/bucket (z={e['z']})" for e in alerts))
+        return alerts
+
+    def recent_events(self, service_key, since_seconds=3600):
+        """Events for a service within the last since_seconds (by bucket time)"""
+        # Log timestamps are naive local time, like datetime.now()
+        cutoff = (datetime.now() - timedelta(seconds=since_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        with self.lock:
+            return [event for event in self.events.get(service_key, []) if event['time'] >= cutoff]
+
+    def format_context(self, events, describe_template=None, limit=10):
+        """Compact rendering of rate anomalies for prompts and emails"""
+        lines = []
+        for event in events[-limit:]:
+            series = event['series']
+            if event['kind'] == 'template':
+                series = f"template {describe_template(series) if describe_template else series}"
+            line = (f"{event['time'][11:16]} {series}: {event['count']} per {self.bucket_seconds}s "
+                    f"vs baseline {event['baseline']}±{event['stddev']} (z={event['z']})")
+            if event['sample']:
+                line += f"\n      e.g. {event['sample'][:200]}"
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def load(self):
+        """Load series state and log positions from disk"""
+        path = Path(self.state_file)
+        keys_path = path.with_suffix('.keys.json')
+        positions_path = path.with_suffix('.positions.json')
+        if positions_path.exists():
+            try:
+                with open(positions_path, 'r') as f:
+                    self.positions.update((key, tuple(position)) for key, position in json.load(f).items())
+            except Exception as e:
+                self.logger.error(f"Error loading log positions from {positions_path}: {e}")
+        if not path.exists() or not keys_path.exists():
+            return
+
+        try:
+            with open(keys_path, 'r') as f:
+                keys = [tuple(key) for key in json.load(f)]
+            arrays = np.load(path)
+            if len(arrays['mean']) != len(keys):
+                raise ValueError("state arrays do not match keys")
+
+            with self.lock:
+                self._allocate(max(1024, len(keys)))
+                self.size = len(keys)
+                for name in ('mean', 'var', 'current', 'bucket', 'observed'):
+                    getattr(self, name)[:self.size] = arrays[name]
+                self.keys = keys
+                self.rows = {key: row for row, key in enumerate(keys)}
+                self.service_rows = {}
+                for (service_key, _, _), row in self.rows.items():
+                    self.service_rows.setdefault(service_key, []).append(row)
+            self.logger.info(f"Loaded {self.size} rate series from {path}")
+        except Exception as e:
+            self.logger.error(f"Error loading anomaly detector state from {path}: {e}")
+
+    def save(self):
+        """Persist series state and log positions (write-then-rename)"""
+        if not self.enabled or not self.state_file:
+            return
+
+        path = Path(self.state_file)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self.lock:
+                keys = list(self.keys)
+                arrays = {name: getattr(self, name)[:self.size].copy() for name in ('mean', 'var', 'current', 'bucket', 'observed')}
+
+            tmp_path = path.with_suffix('.tmp.npz')
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+
+            keys_path = path.with_suffix('.keys.json')
+            with open(f"{keys_path}.tmp", 'w') as f:
+                json.dump(keys, f)
+            os.replace(f"{keys_path}.tmp", keys_path)
+
+            # Written after the series, so a crash in between re-reads data the bucket check skips
+            positions_path = path.with_suffix('.positions.json')
+            with open(f"{positions_path}.tmp", 'w') as f:
+                json.dump(dict(self.positions), f)
+            os.replace(f"{positions_path}.tmp", positions_path)
+        except Exception as e:
+            self.logger.error(f"Error saving anomaly detector state to {path}: {e}")
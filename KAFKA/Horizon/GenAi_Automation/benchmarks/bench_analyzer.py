@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+bench_analyzer.py
+Throughput and latency benchmark for the LogAnalyzer pipeline
+Per-stage lines/sec, MB/sec, p50/p99 latency and peak memory; LLM path runs against a stub server
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+BENCH_DIR = Path(__file__).resolve().parent
+MONITOR_DIR = BENCH_DIR.parent
+CHUNK_CHARS = 16
+sys.path.insert(0, str(MONITOR_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from log_analyzer import ANALYSIS_SECTIONS, LogAnalyzer
+from log_columns import ColumnarLog
+from stub_ollama import STUB_ANALYSIS, STUB_JSON, StubOllama
+from synthetic_logs import SIZE_UNITS, cached_log, parse_size
+
+
+def content_stages(analyzer, service_name, log_content):
+    """(name, callable, input) triples; input is the text the stage scans, None if it scans nothing"""
+    columns = ColumnarLog.parse(log_content)
+    failure_time = columns.timestamps.max().astype(datetime) - timedelta(minutes=1) if len(columns) else None
+    error_lines = analyzer.extract_error_patterns(log_content)
+    triage = analyzer.rule_engine.evaluate(service_name, error_lines)
+    token_budget = analyzer.prompt_builder.available_tokens('')
+
+    error_text = '\n'.join(error_lines) + '\n' if error_lines else ''
+
+    return [
+        ('columnar_parse', lambda: ColumnarLog.parse(log_content), log_content),
+        ('failure_window', lambda: analyzer.slice_failure_window(log_content, failure_time), log_content),
+        ('extract_error_patterns', lambda: analyzer.extract_error_patterns(log_content), log_content),
+        ('rule_triage', lambda: analyzer.rule_engine.evaluate(service_name, error_lines), error_text),
+        ('rule_based_analysis', lambda: analyzer.rule_based_analysis(triage=triage), None),
+        ('template_mining', lambda: analyzer.summarize_log_templates(log_content), log_content),
+        ('exception_folding', lambda: analyzer.fold_exceptions(log_content), log_content),
+        ('prompt_excerpt', lambda: analyzer.prompt_builder.build_log_excerpt(log_content, token_budget), log_content),
+        ('analyze_service_logs', lambda: analyzer.analyze_service_logs(service_name, log_content, 'bench-host'), log_content),
+    ]
+
+
+def measure(function, repeat, track_memory=True):
+    """Wall-clock samples (seconds) plus traced peak memory (MB) of one extra run"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            function()
+            peak_mb = tracemalloc.get_traced_memory()[1] / SIZE_UNITS['MB']
+        finally:
+            tracemalloc.stop()
+    return samples, peak_mb
+
+
+def summarize(stage, samples, peak_mb, size_bytes=None, lines=None, **extra):
+    p50 = float(np.percentile(samples, 50))
+    result = {
+        'stage': stage,
+        'samples': len(samples),
+        'p50_ms': round(p50 * 1000, 3),
+        'p99_ms': round(float(np.percentile(samples, 99)) * 1000, 3),
+        'mean_ms': round(float(np.mean(samples)) * 1000, 3),
+        'peak_mem_mb': round(peak_mb, 2) if peak_mb is not None else None,
+        **extra,
+    }
+    if size_bytes is not None:
+        result['size_bytes'] = size_bytes
+        result['lines'] = lines
+        result['lines_per_sec'] = round(lines / p50, 1) if p50 else None
+        result['mb_per_sec'] = round(size_bytes / SIZE_UNITS['MB'] / p50, 2) if p50 else None
+    return result
+
+
+def bench_config(config_path, stub_url, state_dir, enable_incident_index=False):
+    """Monitor config pointed at the stub server with all state in a scratch directory"""
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    config = copy.deepcopy(config)
+
+    config['ai']['ollama_url'] = stub_url
+    config.setdefault('circuit_breaker', {}).update({'auto_start_ollama': False, 'health_poll_interval_seconds': 3600})
+    config.setdefault('analysis_cache', {}).update({'enabled': False})
+    config.setdefault('rule_engine', {})['rules_file'] = str(MONITOR_DIR / 'rules.yml')
+    config.setdefault('log_mining', {})['state_file'] = str(Path(state_dir) / 'log_templates.json')
+    config.setdefault('incident_index', {}).update({
+        'enabled': enable_incident_index,
+        'use_ollama_embeddings': False,
+        'directory': str(Path(state_dir) / 'incidents'),
+    })
+    return config
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=MONITOR_DIR, capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=MONITOR_DIR, capture_output=True, text=True, timeout=30).stdout.strip())
+        return commit or 'unknown', dirty
+    except Exception:
+        return 'unknown', False
+
+
+def run(args):
+    commit, dirty = git_revision()
+    report = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+        'results': [],
+    }
+
+    with StubOllama(first_token_latency=args.llm_latency, chunk_latency=args.llm_chunk_latency, chunk_chars=CHUNK_CHARS) as stub, \
+            tempfile.TemporaryDirectory(prefix='kafka-monitor-bench-') as state_dir:
+        config = bench_config(args.config, stub.url, state_dir, args.incident_index)
+        analyzer = LogAnalyzer(config)
+
+        for service_name in args.services:
+            for size in args.sizes:
+                size_bytes = parse_size(size)
+                path = cached_log(size_bytes, service_name, args.error_rate, args.warn_rate, args.trace_rate, args.seed)
+                with open(path, 'r') as f:
+                    log_content = f.read()
+                lines = log_content.count('\n')
+                actual_bytes = len(log_content.encode('utf-8'))
+                print(f"{service_name} {size}: {lines} lines, {actual_bytes / SIZE_UNITS['MB']:.1f} MB", file=sys.stderr)
+
+                for stage, function, stage_input in content_stages(analyzer, service_name, log_content):
+                    if args.stages and stage not in args.stages:
+                        continue
+                    samples, peak_mb = measure(function, args.repeat, not args.no_memory)
+                    input_size = (len(stage_input.encode('utf-8')), stage_input.count('\n')) if stage_input is not None else (None, None)
+                    report['results'].append(summarize(
+                        stage, samples, peak_mb, *input_size, service=service_name, size=size
+                    ))
+
+        if not args.stages or 'call_ollama' in args.stages:
+            prompt = 'Benchmark prompt\n' * 200
+            samples, peak_mb = measure(
+                lambda: analyzer.call_ollama(prompt, required_sections=ANALYSIS_SECTIONS), args.llm_calls, not args.no_memory
+            )
+            expected = args.llm_latency + args.llm_chunk_latency * -(-len(STUB_ANALYSIS) // CHUNK_CHARS)
+            report['results'].append(summarize(
+                'call_ollama', samples, peak_mb,
+                overhead_ms=round((float(np.percentile(samples, 50)) - expected) * 1000, 3),
+                stub_latency_ms=round(expected * 1000, 3),
+            ))
+
+        if not args.stages or 'call_structured' in args.stages:
+            prompt = 'Benchmark prompt\n' * 200
+            samples, peak_mb = measure(lambda: analyzer.call_structured(prompt), args.llm_calls, not args.no_memory)
+            expected = args.llm_latency + args.llm_chunk_latency * -(-len(json.dumps(STUB_JSON)) // CHUNK_CHARS)
+            report['results'].append(summarize(
+                'call_structured', samples, peak_mb,
+                overhead_ms=round((float(np.percentile(samples, 50)) - expected) * 1000, 3),
+                stub_latency_ms=round(expected * 1000, 3),
+            ))
+
+        analyzer.client.close()
+
+    report['meta']['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+def format_rate(value, spec):
+    return format(value, spec) if value is not None else '-'
+
+
+def result_key(result):
+    return (result['stage'], result.get('service', ''), result.get('size', ''))
+
+
+def print_table(report, baseline=None, threshold=10.0):
+    """Print results; with a baseline, show p50 change and flag regressions above threshold %"""
+    previous = {result_key(r): r for r in (baseline or {}).get('results', [])}
+    regressions = []
+
+    if baseline:
+        differing = sorted(
+            key for key, value in report['meta']['parameters'].items()
+            if key not in ('stages', 'threshold') and baseline['meta'].get('parameters', {}).get(key) != value
+        )
+        if differing:
+            print(f"WARNING: baseline ran with different parameters ({', '.join(differing)}); results are not comparable")
+
+    header = f"{'stage':<24}{'service':<11}{'size':>7}{'p50 ms':>12}{'p99 ms':>12}{'lines/s':>14}{'MB/s':>10}{'peak MB':>9}"
+    if baseline:
+        header += f"{'vs ' + baseline['meta']['commit']:>16}"
+    print(header)
+    print('-' * len(header))
+
+    for result in report['results']:
+        row = (
+            f"{result['stage']:<24}{result.get('service', '-'):<11}{result.get('size', '-'):>7}"
+            f"{result['p50_ms']:>12.2f}{result['p99_ms']:>12.2f}"
+            f"{format_rate(result.get('lines_per_sec'), ',.0f'):>14}{format_rate(result.get('mb_per_sec'), '.2f'):>10}"
+            f"{result['peak_mem_mb'] if result['peak_mem_mb'] is not None else 0:>9.1f}"
+        )
+        old = previous.get(result_key(result))
+        if old and old['p50_ms']:
+            change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+            flag = ' !' if change > threshold else ''
+            row += f"{change:>+14.1f}%{flag}"
+            if flag:
+                regressions.append((result_key(result), change))
+        print(row)
+
+    meta = report['meta']
+    print(f"\ncommit {meta['commit']}{' (dirty)' if meta['dirty'] else ''}, python {meta['python']}, "
+          f"{meta['cpus']} cpus, max RSS {meta['max_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the LogAnalyzer pipeline on synthetic logs')
+    parser.add_argument('--config', default=str(MONITOR_DIR / 'config.yml'))
+    parser.add_argument('--sizes', default='1MB,8MB', help='Comma-separated log sizes (1MB .. 1GB)')
+    parser.add_argument('--services', default='kafka,zookeeper')
+    parser.add_argument('--stages', default='', help='Comma-separated subset of stages (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per stage and size')
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--warn-rate', type=float, default=0.08)
+    parser.add_argument('--trace-rate', type=float, default=0.3, help='Fraction of ERROR records with a stack trace')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Stub time to first token (seconds)')
+    parser.add_argument('--llm-chunk-latency', type=float, default=0.0, help='Stub delay between streamed chunks (seconds)')
+    parser.add_argument('--llm-calls', type=int, default=20)
+    parser.add_argument('--incident-index', action='store_true', help='Include incident indexing in analyze_service_logs')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc run per stage')
+    parser.add_argument('--output', help='Write JSON results here (default: results/<commit>.json)')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0, help='p50 regression threshold in percent')
+    args = parser.parse_args()
+
+    args.sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    args.services = [s.strip() for s in args.services.split(',') if s.strip()]
+    args.stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+
+    logging.basicConfig(level=logging.ERROR)
+    report = run(args)
+
+    output = Path(args.output) if args.output else BENCH_DIR / 'results' / f"{report['meta']['commit']}{'-dirty' if report['meta']['dirty'] else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    regressions = print_table(report, baseline, args.threshold)
+    print(f"Results written to {output}")
+
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed by more than {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+bench_backends.py
+Ollama HTTP vs in-process llama.cpp on the same structured analysis prompt
+Per-request overhead (one-token generations), time to first token and decode tokens/sec per backend,
+with and without a reused instruction prefix
+"""
+
+import argparse
+import copy
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+BENCH_DIR = Path(__file__).resolve().parent
+MONITOR_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(MONITOR_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_analyzer import bench_config, git_revision, measure, summarize
+from llm_backend import create_backend
+from log_analyzer import LogAnalyzer
+from stub_ollama import StubOllama
+from synthetic_logs import cached_log, parse_size
+
+OVERHEAD_PROMPT = 'Reply with OK.'
+
+
+def analysis_prompt(args, ollama_url):
+    """Structured analysis prompt (prefix, suffix) exactly as LogAnalyzer sends it, from a synthetic Kafka log"""
+    with tempfile.TemporaryDirectory(prefix='kafka-monitor-bench-') as state_dir:
+        config = bench_config(args.config, ollama_url, state_dir)
+        config['ai']['backend'] = 'ollama'
+        analyzer = LogAnalyzer(config)
+
+        # Capture (prefix, suffix) instead of generating; the analysis then ends on the rule tier
+        prompts = []
+        analyzer.call_structured = lambda prompt, cancel_token=None, prefix=None: (prompts.append((prefix, prompt)), (None, False))[1]
+        with open(cached_log(parse_size(args.size), 'kafka', 0.02, 0.08, 0.3, args.seed), 'r') as f:
+            analyzer.analyze_service_logs('kafka', f.read(), 'bench-host')
+        analyzer.client.close()
+    return prompts[0], analyzer.structured_format
+
+
+def available(config, backend):
+    """None when the backend can run here, otherwise the reason it is skipped"""
+    if backend == 'llama_cpp':
+        if importlib.util.find_spec('llama_cpp') is None:
+            return 'llama-cpp-python is not installed'
+        if not os.path.isfile(config['llama_cpp']['model_path']):
+            return f"model not found: {config['llama_cpp']['model_path']}"
+        return None
+    try:
+        client = create_backend(config)
+        client.probe()
+        client.close()
+        return None
+    except Exception as e:
+        return f"Ollama unreachable at {config['ai']['ollama_url']}: {e}"
+
+
+def timed_generations(client, prompt, options, format, calls, prefix=None):
+    """Durations, time to first token and decode tokens/sec of repeated generations"""
+    durations, ttfts, rates, tokens = [], [], [], []
+    for _ in range(calls):
+        result = client.generate(prompt, options=options, format=format, prefix=prefix)
+        if result.time_to_first_token is None:
+            continue
+        count = result.eval_count or result.chunks
+        decode = result.duration - result.time_to_first_token
+        durations.append(result.duration)
+        ttfts.append(result.time_to_first_token)
+        tokens.append(count)
+        if decode > 0 and count > 1:
+            rates.append((count - 1) / decode)
+    if not durations:
+        return None
+    return durations, {
+        'ttft_p50_ms': round(float(np.percentile(ttfts, 50)) * 1000, 3),
+        'tokens_p50': int(np.percentile(tokens, 50)),
+        'tokens_per_sec': round(float(np.percentile(rates, 50)), 1) if rates else None,
+    }
+
+
+def bench_backend(config, backend, prompt, format, args):
+    client = create_backend(config)
+    options = {'temperature': 0.2, 'top_p': 0.9}
+    results = []
+
+    # First call loads the model (llama.cpp mmap, Ollama keep-alive); reported separately
+    warmup = client.generate(OVERHEAD_PROMPT, options={**options, 'num_predict': 1})
+    if not warmup.ok:
+        client.close()
+        return [{'stage': 'error', 'backend': backend, 'error': str(warmup.error or warmup.stop_reason)}]
+    results.append({'stage': 'cold_start', 'backend': backend, 'p50_ms': round(warmup.duration * 1000, 3)})
+
+    samples, peak_mb = measure(
+        lambda: client.generate(OVERHEAD_PROMPT, options={**options, 'num_predict': 1}), args.calls, False
+    )
+    results.append(summarize('request_overhead', samples, peak_mb, backend=backend))
+
+    prefix, suffix = prompt
+    options = {**options, 'num_predict': args.num_predict}
+    timed = timed_generations(client, prefix + suffix, options, format, args.calls)
+    if timed:
+        results.append(summarize('analysis', timed[0], None, backend=backend, **timed[1]))
+
+    # Same prompt with the instruction prefix evaluated once (prompt_prefix.py)
+    try:
+        cached_prefix = client.prime(prefix)
+    except Exception as e:
+        cached_prefix = None
+        print(f"{backend}: prefix priming failed: {e}", file=sys.stderr)
+    if cached_prefix is not None:
+        timed = timed_generations(client, suffix, options, format, args.calls, prefix=cached_prefix)
+        if timed:
+            results.append(summarize(
+                'analysis_prefixed', timed[0], None, backend=backend,
+                prefix_tokens=cached_prefix.tokens, prefix_eval_ms=round(cached_prefix.eval_seconds * 1000, 3), **timed[1]
+            ))
+
+    client.close()
+    return results
+
+
+def run(args):
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+    llama_config = config.setdefault('llama_cpp', {})
+    if args.model_path:
+        llama_config['model_path'] = args.model_path
+    if args.threads:
+        llama_config['n_threads'] = args.threads
+
+    commit, dirty = git_revision()
+    report = {'meta': {'commit': commit, 'dirty': dirty, 'cpus': os.cpu_count(), 'parameters': vars(args)}, 'results': []}
+
+    with ExitStack() as stack:
+        if args.ollama_url == 'stub':
+            stub = stack.enter_context(StubOllama(first_token_latency=args.stub_latency, chunk_latency=args.stub_chunk_latency))
+            config['ai']['ollama_url'] = stub.url
+        elif args.ollama_url:
+            config['ai']['ollama_url'] = args.ollama_url
+
+        prompt, format = analysis_prompt(args, config['ai']['ollama_url'])
+        report['meta']['prompt_chars'] = len(prompt[0]) + len(prompt[1])
+        print(f"Prompt: {len(prompt[0])} + {len(prompt[1])} chars (prefix + suffix) from a {args.size} synthetic log", file=sys.stderr)
+
+        for backend in args.backends:
+            backend_config = copy.deepcopy(config)
+            backend_config['ai']['backend'] = backend
+            reason = available(backend_config, backend)
+            if reason:
+                print(f"Skipping {backend}: {reason}", file=sys.stderr)
+                report['results'].append({'stage': 'skipped', 'backend': backend, 'reason': reason})
+                continue
+            report['results'].extend(bench_backend(backend_config, backend, prompt, format, args))
+    return report
+
+
+def print_table(report):
+    header = f"{'backend':<11}{'stage':<19}{'p50 ms':>12}{'p99 ms':>12}{'ttft ms':>12}{'tokens':>8}{'tok/s':>9}{'prefix ms':>11}"
+    print(header)
+    print('-' * len(header))
+    for result in report['results']:
+        if result['stage'] in ('skipped', 'error'):
+            print(f"{result['backend']:<11}{result['stage']:<19}{result.get('reason') or result.get('error')}")
+            continue
+        value = lambda key, spec: format(result[key], spec) if result.get(key) is not None else '-'
+        print(
+            f"{result['backend']:<11}{result['stage']:<19}{value('p50_ms', '.2f'):>12}{value('p99_ms', '.2f'):>12}"
+            f"{value('ttft_p50_ms', '.1f'):>12}{value('tokens_p50', 'd'):>8}{value('tokens_per_sec', '.1f'):>9}"
+            f"{value('prefix_eval_ms', '.1f'):>11}"
+        )
+    meta = report['meta']
+    print(f"\ncommit {meta['commit']}{' (dirty)' if meta['dirty'] else ''}, {meta['cpus']} cpus, prompt {meta['prompt_chars']} chars")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the Ollama and llama.cpp analysis backends')
+    parser.add_argument('--config', default=str(MONITOR_DIR / 'config.yml'))
+    parser.add_argument('--backends', default='ollama,llama_cpp')
+    parser.add_argument('--ollama-url', help="Ollama URL (default from config; 'stub' runs against stub_ollama.py)")
+    parser.add_argument('--model-path', help='GGUF model for llama_cpp (default llama_cpp.model_path); use the same weights as the Ollama model')
+    parser.add_argument('--threads', type=int, help='llama.cpp threads (default llama_cpp.n_threads)')
+    parser.add_argument('--size', default='1MB', help='Synthetic log the prompt is built from')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--calls', type=int, default=5, help='Timed generations per measurement')
+    parser.add_argument('--num-predict', type=int, default=400, help='Token cap per analysis (ai.structured_num_predict)')
+    parser.add_argument('--stub-latency', type=float, default=0.05)
+    parser.add_argument('--stub-chunk-latency', type=float, default=0.005)
+    parser.add_argument('--output', help='Write JSON results here')
+    args = parser.parse_args()
+    args.backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+
+    logging.basicConfig(level=logging.ERROR)
+    report = run(args)
+    print_table(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
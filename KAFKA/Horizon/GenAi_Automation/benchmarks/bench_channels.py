@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+bench_channels.py
+Alert wave delivered to SMTP, webhook, file and syslog channels: serial sends vs parallel fan-out
+Reports caller latency and when each channel finished; the webhook stand-in is deliberately slow
+"""
+
+import argparse
+import json
+import logging
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+MONITOR_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(MONITOR_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_analyzer import summarize
+from email_sender import EmailSender
+from stub_smtp import StubSmtp
+from stub_webhook import StubWebhook
+
+
+class SyslogReceiver:
+    """UDP socket counting syslog datagrams"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.messages = []
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='syslog-receiver', daemon=True)
+        self.thread.start()
+
+    @property
+    def address(self):
+        return f"127.0.0.1:{self.sock.getsockname()[1]}"
+
+    def _run(self):
+        while self.running:
+            try:
+                self.messages.append(self.sock.recv(65536))
+            except socket.timeout:
+                continue
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+def bench_mode(mode, args):
+    """mode: serial (each channel's deliver() in turn, as a single sink would) or fanout (publish to channel workers)"""
+    with StubSmtp(greeting_latency=args.greeting_latency, message_latency=args.message_latency) as smtp, \
+            StubWebhook(latency=args.webhook_latency) as webhook, \
+            tempfile.TemporaryDirectory(prefix='kafka-monitor-channels-') as directory:
+        syslog = SyslogReceiver()
+        config = {
+            'email': {'smtp_server': '127.0.0.1', 'smtp_port': smtp.port, 'from_email': 'monitor@localhost', 'to_emails': ['oncall@localhost']},
+            'smtp_pool': {'max_connections': 1},
+            'notification_spool': {'enabled': False},
+            'alert_coalescing': {'enabled': False, 'state_file': ''},
+            'notification_channels': {
+                'smtp': {'rate_per_minute': 60000, 'burst': args.messages},
+                'webhook': {'enabled': True, 'url': webhook.url, 'rate_per_minute': 60000, 'burst': args.messages,
+                            'timeout_seconds': args.webhook_latency * 4 + 1},
+                'file': {'enabled': True, 'path': str(Path(directory) / 'notifications.jsonl')},
+                'syslog': {'enabled': True, 'address': syslog.address, 'rate_per_minute': 60000, 'burst': args.messages},
+            },
+        }
+        sender = EmailSender(config)
+        channels = sender.channels.channels
+        body = '<p>' + 'x' * args.body_bytes + '</p>'
+        finished = {}
+        samples = []
+
+        started = time.perf_counter()
+        if mode == 'serial':
+            for i in range(args.messages):
+                call = time.perf_counter()
+                notification = {'subject': f"Alert {i}", 'html': body, 'text': 'alert', 'recipients': None, 'priority': 1,
+                                'lane': 'critical', 'attachments': None, 'details': {'host': 'bench'}, 'created': time.time()}
+                for channel in channels:
+                    channel.deliver(notification)
+                    finished[channel.name] = time.perf_counter() - started
+                samples.append(time.perf_counter() - call)
+        else:
+            for i in range(args.messages):
+                call = time.perf_counter()
+                sender.send_email(f"Alert {i}", body, 'alert', priority=1, lane='critical', details={'host': 'bench'})
+                samples.append(time.perf_counter() - call)
+
+            def wait(channel):
+                channel.drain(600)
+                finished[channel.name] = time.perf_counter() - started
+
+            waiters = [threading.Thread(target=wait, args=(channel,)) for channel in channels]
+            for waiter in waiters:
+                waiter.start()
+            for waiter in waiters:
+                waiter.join()
+        wall = time.perf_counter() - started
+        stats = sender.channels.stats()
+        sender.close()
+        syslog.close()
+
+        return summarize(
+            mode, samples, None, wall_seconds=round(wall, 3),
+            finished_seconds={name: round(seconds, 3) for name, seconds in finished.items()},
+            received={'smtp': len(smtp.messages), 'webhook': len(webhook.payloads), 'syslog': len(syslog.messages),
+                      'file': sum(1 for _ in open(config['notification_channels']['file']['path']))},
+            channels=stats if mode == 'fanout' else None,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serial vs fanned-out notification channels')
+    parser.add_argument('--messages', type=int, default=20, help='Notifications in the alert wave')
+    parser.add_argument('--webhook-latency', type=float, default=0.2, help='Stub webhook response latency (seconds)')
+    parser.add_argument('--greeting-latency', type=float, default=0.02, help='Stub SMTP connect + greeting latency (seconds)')
+    parser.add_argument('--message-latency', type=float, default=0.005, help='Stub SMTP per-message accept latency (seconds)')
+    parser.add_argument('--body-bytes', type=int, default=20000)
+    parser.add_argument('--output', help='Write JSON results here')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    results = [bench_mode(mode, args) for mode in ('serial', 'fanout')]
+
+    names = list(results[0]['finished_seconds'])
+    header = f"{'mode':<8}{'caller p50 ms':>15}{'caller p99 ms':>15}" + ''.join(f"{name + ' done s':>15}" for name in names)
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['stage']:<8}{result['p50_ms']:>15.2f}{result['p99_ms']:>15.2f}"
+              + ''.join(f"{result['finished_seconds'][name]:>15.3f}" for name in names))
+    serial, fanout = results
+    print(f"\nSMTP finished after {fanout['finished_seconds']['smtp']:.3f}s fanned out vs {serial['finished_seconds']['smtp']:.3f}s "
+          f"behind a {args.webhook_latency}s webhook; received {fanout['received']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+bench_daily_report.py
+Daily report render time, peak memory and size for fleets of increasing size
+Compares the old per-service string concatenation and per-service template loop with fleet_report.py
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+MONITOR_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(MONITOR_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_analyzer import git_revision, measure, summarize
+from email_templates import create_environment
+from fleet_report import FleetReport
+
+# The per-service loop the daily report template used before fleet_report.py
+LOOP_TEMPLATE = """<div class="services-list">
+    {% for service in services %}
+    <div class="service-item">
+        <span>{{ service.key }}</span>
+        {% if service.up %}<span class="service-status status-up">UP ✅</span>{% else %}<span class="service-status status-down">DOWN ❌</span>{% endif %}
+    </div>
+    {% endfor %}
+</div>"""
+
+
+def fleet(services, hosts_per_cluster, failure_rate, seed=7):
+    """(config, service_status) for a fleet of kafka/zookeeper pairs split into clusters"""
+    rng = random.Random(seed)
+    hosts = [f"kafka-{index:05d}.ebiz.verizon.com" for index in range(max(services // 2, 1))]
+    config = {'servers': [{'host': host, 'cluster': f"cluster-{index // hosts_per_cluster:03d}"} for index, host in enumerate(hosts)]}
+    status = {}
+    for host in hosts:
+        for service in ('kafka', 'zookeeper'):
+            if len(status) < services:
+                status[f"{host}:{service}"] = rng.random() >= failure_rate
+    return config, status
+
+
+def concatenate(service_status):
+    """The original loop: html_body += per service"""
+    html_body = '<div class="services-list">'
+    for service_key, status in service_status.items():
+        status_class = "status-up" if status else "status-down"
+        status_text = "UP ✅" if status else "DOWN ❌"
+        html_body += f"""
+                        <div class="service-item">
+                            <span>{service_key}</span>
+                            <span class="service-status {status_class}">{status_text}</span>
+                        </div>
+            """
+    return html_body + '</div>'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark daily report rendering by fleet size')
+    parser.add_argument('--sizes', default='100,1000,10000,50000', help='Comma-separated service counts')
+    parser.add_argument('--failure-rate', type=float, default=0.002, help='Fraction of services down')
+    parser.add_argument('--hosts-per-cluster', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=10, help='Renders per stage')
+    parser.add_argument('--output', help='Write JSON results here')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    loop_template = create_environment([]).from_string(LOOP_TEMPLATE)
+    results = []
+    for size in (int(size) for size in args.sizes.split(',')):
+        config, status = fleet(size, args.hosts_per_cluster, args.failure_rate)
+        report = FleetReport(config)
+
+        def template_loop():
+            return loop_template.render({'services': [{'key': key, 'up': up} for key, up in status.items()]})
+
+        def fleet_report():
+            summary = report.summarize(status)
+            return report.render_html(summary) + report.render_text(summary)
+
+        for name, function in (('concatenate', lambda: concatenate(status)), ('template_loop', template_loop), ('fleet_report', fleet_report)):
+            samples, peak = measure(function, args.repeat)
+            results.append(summarize(name, samples, peak, services=size, report_chars=len(function())))
+
+    header = f"{'stage':<15}{'services':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>10}{'chars':>11}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['stage']:<15}{result['services']:>10}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['peak_mem_mb']:>10.2f}{result['report_chars']:>11}")
+
+    if args.output:
+        commit, dirty = git_revision()
+        with open(args.output, 'w') as f:
+            json.dump({'commit': commit, 'dirty': dirty, 'parameters': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+bench_smtp.py
+Per-message SMTP cost of an alert wave: one connection per message, pooled sessions, spooled delivery
+Runs EmailSender.send_email against stub_smtp.py with a configurable greeting latency
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+MONITOR_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(MONITOR_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_analyzer import summarize
+from email_sender import EmailSender
+from stub_smtp import StubSmtp
+
+
+def bench_mode(mode, args):
+    """mode: per_message, pooled or spooled (caller latency is the channel publish; wall time includes the drain)"""
+    with StubSmtp(greeting_latency=args.greeting_latency, message_latency=args.message_latency) as stub, \
+            tempfile.TemporaryDirectory(prefix='kafka-monitor-spool-') as spool_dir:
+        config = {
+            'email': {'smtp_server': '127.0.0.1', 'smtp_port': stub.port, 'from_email': 'monitor@localhost', 'to_emails': ['oncall@localhost']},
+            'smtp_pool': {'enabled': mode != 'per_message', 'max_connections': args.concurrency},
+            'notification_spool': {'enabled': mode == 'spooled', 'directory': spool_dir, 'drain_timeout_seconds': 600},
+            'notification_channels': {'smtp': {'rate_per_minute': 600000, 'burst': args.messages}},
+        }
+        sender = EmailSender(config)
+        body = '<p>' + 'x' * args.body_bytes + '</p>'
+
+        def send(i):
+            started = time.perf_counter()
+            ok = sender.send_email(f"Alert {i}", body, 'alert')
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            outcomes = list(executor.map(send, range(args.messages)))
+        sender.channels.drain(600)
+        sender.spool.drain(600)
+        wall = time.perf_counter() - started
+        sender.close()
+
+        samples = [seconds for seconds, ok in outcomes]
+        return summarize(
+            mode, samples, None,
+            messages=len(stub.messages), failed=sum(1 for _, ok in outcomes if not ok),
+            connections=stub.connections, wall_seconds=round(wall, 3),
+            messages_per_sec=round(args.messages / wall, 1), pool=sender.transport.stats(),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pooled vs per-message SMTP delivery')
+    parser.add_argument('--messages', type=int, default=50, help='Emails in the alert wave')
+    parser.add_argument('--concurrency', type=int, default=2, help='Sending threads (and pool size)')
+    parser.add_argument('--greeting-latency', type=float, default=0.05, help='Stub connect + greeting latency (seconds)')
+    parser.add_argument('--message-latency', type=float, default=0.005, help='Stub per-message accept latency (seconds)')
+    parser.add_argument('--body-bytes', type=int, default=20000)
+    parser.add_argument('--output', help='Write JSON results here')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    results = [bench_mode(mode, args) for mode in ('per_message', 'pooled', 'spooled')]
+
+    header = f"{'mode':<13}{'p50 ms':>10}{'p99 ms':>10}{'msg/s':>9}{'conns':>7}{'failed':>8}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['stage']:<13}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['messages_per_sec']:>9.1f}{result['connections']:>7}{result['failed']:>8}")
+    speedup = results[0]['wall_seconds'] / results[1]['wall_seconds'] if results[1]['wall_seconds'] else float('nan')
+    print(f"\nPooled wave finished {speedup:.1f}x faster ({args.messages} messages, {args.concurrency} threads); "
+          f"spooled callers returned in {results[2]['p50_ms']:.2f} ms (p50)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'parameters': vars(args), 'results': results, 'speedup': round(speedup, 2)}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+bench_templates.py
+Email render time with compiled, cached templates vs reading and compiling the template on every send
+Renders the failure alert (HTML + text) for a synthetic Kafka failure; also times compiles and mtime reloads
+and reports the size of the finished MIME message (minified body, short excerpt, compressed log attachments)
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+MONITOR_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(MONITOR_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_analyzer import git_revision, measure, summarize
+from email_sender import EmailSender
+from email_templates import BUNDLED_DIRECTORY, TemplateRenderer, create_environment, minify_html
+from exception_folder import ExceptionFolder
+from log_attachments import LogAttachments
+from log_templates import LogTemplateMiner
+from synthetic_logs import SyntheticLogGenerator
+
+
+class CaptureSender(EmailSender):
+    """EmailSender that keeps rendered bodies instead of queueing them"""
+
+    def __init__(self, config):
+        self.config = config
+        self.email_config = config['email']
+        self.logger = logging.getLogger(__name__)
+        self.templates = TemplateRenderer(config)
+        self.attachments = LogAttachments({'log_attachments': {'enabled': False}})
+        self.sent = []
+
+    def send_email(self, subject, body_html, body_text=None, **kwargs):
+        self.sent.append((subject, body_html, body_text, kwargs))
+        return True
+
+
+def failure_alert_args(args):
+    """send_failure_alert arguments for a synthetic Kafka failure"""
+    records = SyntheticLogGenerator('kafka', error_rate=0.2).records()
+    log_content = ''.join(islice(records, args.log_lines))
+    templates = LogTemplateMiner({}).summarize(log_content)
+    exceptions = [event.to_dict() for event in ExceptionFolder().fold(log_content)[:10]]
+    analysis = {
+        'text': 'Broker lost its ZooKeeper session and could not re-register. ' * 20,
+        'structured': True, 'severity': 'High', 'action': 'escalate',
+        'summary': 'Broker lost its ZooKeeper session', 'root_cause': 'ZooKeeper session expiry <GC pause>',
+        'severity_reason': 'Partitions offline', 'immediate_actions': ['Check ZooKeeper quorum', 'Restart broker'],
+        'steps': ['Verify zookeeper.connect', 'Check GC logs'], 'prevention': ['Tune zookeeper.session.timeout.ms'],
+        'related_components': ['zookeeper', 'controller'],
+    }
+    return dict(
+        server_host='tpaldey2va028.ebiz.verizon.com', service_name='kafka', log_content=log_content,
+        ai_analysis=analysis, restart_attempted=True, restart_attempts=3, log_templates=templates,
+        exceptions=exceptions, error_profile='12:00 ERROR=12 WARN=40\n12:01 ERROR=95 WARN=210',
+        early_warnings='ERROR rate 8.3x baseline at 11:58', gc_metrics='p99 pause 1.8s, heap after GC 92%',
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark compiled, cached email template rendering')
+    parser.add_argument('--repeat', type=int, default=200, help='Renders per stage')
+    parser.add_argument('--log-lines', type=int, default=500, help='Synthetic log lines in the alert')
+    parser.add_argument('--output', help='Write JSON results here')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    alert = failure_alert_args(args)
+
+    with tempfile.TemporaryDirectory(prefix='kafka-monitor-templates-') as directory:
+        for path in BUNDLED_DIRECTORY.iterdir():
+            shutil.copy(path, directory)
+        config = {'email': {'from_email': 'monitor@localhost', 'to_emails': ['oncall@localhost']}, 'templates': {'directory': directory}}
+        sender = CaptureSender(config)
+        html_path = Path(directory) / 'failure_alert.html'
+        source = minify_html(html_path.read_text(encoding='utf-8'))
+        environment = create_environment([directory])
+
+        def render_cached():
+            sender._send_failure_alert(**alert)
+
+        def render_uncached():
+            # What a loader without a cache pays: a fresh renderer reads and compiles both files on every send
+            sender.templates = TemplateRenderer(config)
+            sender._send_failure_alert(**alert)
+
+        def compile_only():
+            environment.from_string(source)
+
+        def reload_after_edit():
+            os.utime(html_path, ns=(time.time_ns(), time.time_ns()))
+            sender._send_failure_alert(**alert)
+
+        results = []
+        render_cached()
+        sender.templates = TemplateRenderer(config)
+        samples, peak = measure(render_cached, args.repeat)
+        results.append(summarize('render_cached', samples, peak, body_bytes=len(sender.sent[-1][1]) + len(sender.sent[-1][2] or '')))
+        samples, peak = measure(render_uncached, args.repeat)
+        results.append(summarize('render_uncached', samples, peak))
+        samples, peak = measure(compile_only, args.repeat)
+        results.append(summarize('compile', samples, peak))
+        sender.templates = TemplateRenderer(config)
+        render_cached()
+        samples, peak = measure(reload_after_edit, args.repeat, track_memory=False)
+        results.append(summarize('reload_after_edit', samples, peak, reloads=sender.templates.stats()['reloads']))
+
+        def build_message():
+            subject, body_html, body_text, kwargs = sender.sent[-1]
+            return sender.build_message(subject, body_html, body_text, kwargs.get('recipients'), kwargs.get('priority'), kwargs.get('attachments'))
+
+        def send_message():
+            # Whole alert as it goes on the wire: render, compress attachments, encode the MIME message
+            sender._send_failure_alert(**alert)
+            build_message().as_bytes()
+
+        sender.templates = TemplateRenderer(config)
+        sender.attachments = LogAttachments(config)
+        samples, peak = measure(send_message, args.repeat)
+        sender.attachments = LogAttachments(config)
+        sender._send_failure_alert(**alert)
+        message_bytes = len(build_message().as_bytes())
+        attached = sender.attachments.stats()
+        unminified = TemplateRenderer({**config, 'templates': {**config['templates'], 'minify': False}})
+        sender.templates = unminified
+        sender._send_failure_alert(**alert)
+        results.append(summarize(
+            'message', samples, peak, message_bytes=message_bytes,
+            unminified_html_bytes=len(sender.sent[-1][1]), html_bytes=len(sender.sent[-2][1]), text_bytes=len(sender.sent[-2][2]),
+            attached_bytes=attached['raw_bytes'], attachment_bytes=attached['compressed_bytes'], codec=attached['codec'],
+        ))
+
+    header = f"{'stage':<20}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        print(f"{result['stage']:<20}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['mean_ms']:>10.3f}")
+    speedup = results[1]['p50_ms'] / results[0]['p50_ms'] if results[0]['p50_ms'] else float('nan')
+    print(f"\nCached render {speedup:.1f}x faster than read + compile per send "
+          f"({results[0]['body_bytes']} bytes of HTML + text, {args.log_lines} log lines)")
+    message = results[-1]
+    print(f"Message on the wire: {message['message_bytes']} bytes (HTML {message['html_bytes']} bytes, "
+          f"{message['unminified_html_bytes']} unminified; text {message['text_bytes']} bytes); "
+          f"{message['attached_bytes']} bytes of log + error summary attached as {message['attachment_bytes']} bytes {message['codec']}")
+
+    if args.output:
+        commit, dirty = git_revision()
+        with open(args.output, 'w') as f:
+            json.dump({'commit': commit, 'dirty': dirty, 'parameters': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
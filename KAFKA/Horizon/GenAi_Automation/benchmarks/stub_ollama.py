@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+stub_ollama.py
+Local Ollama-compatible stub server for benchmarks
+Configurable time-to-first-token and per-chunk latency; no model required
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANALYSIS = """PROBLEM SUMMARY:
+Broker lost its ZooKeeper session and failed to restart.
+
+ROOT CAUSE:
+ZooKeeper quorum unavailable; broker startup aborted after session timeout.
+
+SEVERITY LEVEL:
+High - broker offline, partitions under-replicated
+
+RECOMMENDED ACTION:
+escalate
+
+IMMEDIATE ACTIONS:
+1. Check ZooKeeper ensemble status
+2. Verify network connectivity to zk nodes
+3. Restart the broker once ZooKeeper is healthy
+
+SOLUTION STEPS:
+1. Restore ZooKeeper quorum
+2. Restart Kafka
+
+PREVENTION MEASURES:
+- Monitor ZooKeeper latency and session expirations
+
+RELATED COMPONENTS:
+kafka, zookeeper
+"""
+
+STUB_JSON = {
+    "summary": "Broker lost its ZooKeeper session",
+    "root_cause": "ZooKeeper quorum unavailable",
+    "severity": "High",
+    "action": "restart",
+    "steps": ["Restore ZooKeeper quorum", "Restart Kafka"],
+    "prevention": ["Monitor ZooKeeper session expirations"],
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._send_json({'models': [{'name': name} for name in self.server.models]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.requests += 1
+
+        if self.path in ('/api/embeddings', '/api/embed'):
+            digest = hashlib.sha256(body.get('prompt', body.get('input', '')).encode('utf-8')).digest()
+            self._send_json({'embedding': [b / 255.0 for b in digest]})
+            return
+
+        time.sleep(self.server.first_token_latency)
+        text = json.dumps(STUB_JSON) if body.get('format') else STUB_ANALYSIS
+        chunks = [text[i:i + self.server.chunk_chars] for i in range(0, len(text), self.server.chunk_chars)]
+        final = {
+            'response': '', 'done': True, 'context': [1, 2, 3],
+            'eval_count': len(chunks), 'prompt_eval_count': len(body.get('prompt', '')) // 4,
+            'prompt_eval_duration': int(self.server.first_token_latency * 1e9),
+        }
+
+        if not body.get('stream', True):
+            time.sleep(self.server.chunk_latency * len(chunks))
+            self._send_json({**final, 'response': text})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in chunks:
+            self._write_chunk({'response': chunk, 'done': False})
+            time.sleep(self.server.chunk_latency)
+        self._write_chunk(final)
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, obj):
+        line = (json.dumps(obj) + '\n').encode('utf-8')
+        self.wfile.write(b'%x\r\n' % len(line) + line + b'\r\n')
+        self.wfile.flush()
+
+    def _send_json(self, obj):
+        payload = json.dumps(obj).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubOllama:
+    """Threaded stub server; use as a context manager or call start()/stop()"""
+
+    def __init__(self, port=0, first_token_latency=0.0, chunk_latency=0.0, chunk_chars=16, models=('llama3:8b',)):
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+        self.server.daemon_threads = True
+        self.server.first_token_latency = first_token_latency
+        self.server.chunk_latency = chunk_latency
+        self.server.chunk_chars = chunk_chars
+        self.server.models = list(models)
+        self.server.requests = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-ollama', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ollama-compatible stub server')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--first-token-latency', type=float, default=0.0, help='Seconds before the first chunk')
+    parser.add_argument('--chunk-latency', type=float, default=0.0, help='Seconds between streamed chunks')
+    parser.add_argument('--model', default='llama3:8b')
+    args = parser.parse_args()
+
+    stub = StubOllama(args.port, args.first_token_latency, args.chunk_latency, models=[args.model])
+    print(f"Stub Ollama listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+stub_smtp.py
+Local SMTP stand-in for notification tests and benchmarks
+Configurable greeting latency, session drops and counters; messages are kept in memory
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class StubSmtpHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: HELO/EHLO, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.sessions.add(self.connection)
+        try:
+            time.sleep(server.greeting_latency)
+            self.reply('220 stub-smtp ESMTP ready')
+            sent = 0
+            envelope = None
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode('utf-8', 'replace').strip()
+                verb = command[:4].upper()
+
+                if verb == 'EHLO':
+                    self.reply('250-stub-smtp\r\n250 8BITMIME')
+                elif verb == 'HELO':
+                    self.reply('250 stub-smtp')
+                elif verb == 'NOOP':
+                    with server.lock:
+                        server.noops += 1
+                    self.reply('250 OK')
+                elif verb == 'MAIL':
+                    envelope = {'from': command[10:].strip(), 'to': []}
+                    self.reply('250 OK')
+                elif verb == 'RCPT':
+                    envelope['to'].append(command[8:].strip())
+                    self.reply('250 OK')
+                elif verb == 'DATA':
+                    self.reply('354 End data with <CR><LF>.<CR><LF>')
+                    data = []
+                    for data_line in iter(self.rfile.readline, b''):
+                        if data_line in (b'.\r\n', b'.\n'):
+                            break
+                        data.append(data_line)
+                    time.sleep(server.message_latency)
+                    with server.lock:
+                        server.messages.append({**envelope, 'data': b''.join(data)})
+                    self.reply('250 OK queued')
+                    sent += 1
+                    if server.drop_after and sent >= server.drop_after:
+                        # Relay closing the session without notice (idle timeout, restart)
+                        return
+                elif verb == 'RSET':
+                    envelope = None
+                    self.reply('250 OK')
+                elif verb == 'QUIT':
+                    self.reply('221 Bye')
+                    return
+                else:
+                    self.reply('502 Command not implemented')
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with server.lock:
+                server.sessions.discard(self.connection)
+
+    def reply(self, text):
+        self.wfile.write(text.encode('utf-8') + b'\r\n')
+        self.wfile.flush()
+
+
+class StubSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StubSmtp:
+    """Threaded stub SMTP server; use as a context manager or call start()/stop()"""
+
+    def __init__(self, port=0, greeting_latency=0.0, message_latency=0.0, drop_after=None):
+        self.server = StubSmtpServer(('127.0.0.1', port), StubSmtpHandler)
+        self.server.greeting_latency = greeting_latency
+        self.server.message_latency = message_latency
+        self.server.drop_after = drop_after
+        self.server.lock = threading.Lock()
+        self.server.connections = 0
+        self.server.noops = 0
+        self.server.messages = []
+        self.server.sessions = set()
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def connections(self):
+        return self.server.connections
+
+    @property
+    def noops(self):
+        return self.server.noops
+
+    @property
+    def messages(self):
+        return self.server.messages
+
+    def drop_sessions(self):
+        """Close every open session server-side, as a relay does on idle timeout"""
+        with self.server.lock:
+            sessions = list(self.server.sessions)
+        for connection in sessions:
+            try:
+                connection.shutdown(2)
+            except OSError:
+                pass
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-smtp', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local SMTP stand-in')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--greeting-latency', type=float, default=0.0, help='Seconds before the 220 greeting')
+    parser.add_argument('--message-latency', type=float, default=0.0, help='Seconds to accept each message')
+    parser.add_argument('--drop-after', type=int, help='Close the session after this many messages')
+    args = parser.parse_args()
+
+    stub = StubSmtp(args.port, args.greeting_latency, args.message_latency, args.drop_after)
+    print(f"Stub SMTP listening on 127.0.0.1:{stub.port}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+stub_webhook.py
+Local HTTP stand-in for the webhook notification channel
+Configurable response latency and status (with an optional number of initial failures); payloads are kept in memory
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(server.latency)
+        with server.lock:
+            server.attempts += 1
+            failing = server.attempts <= server.fail_first
+            if not failing:
+                server.payloads.append(json.loads(body or b'{}'))
+        status = 503 if failing else server.status
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+
+class StubWebhook:
+    """Threaded stub webhook receiver; use as a context manager or call start()/stop()"""
+
+    def __init__(self, port=0, latency=0.0, status=200, fail_first=0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), StubWebhookHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.status = status
+        self.server.fail_first = fail_first
+        self.server.lock = threading.Lock()
+        self.server.attempts = 0
+        self.server.payloads = []
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+
+    @property
+    def attempts(self):
+        return self.server.attempts
+
+    @property
+    def payloads(self):
+        return self.server.payloads
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-webhook', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local webhook stand-in')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before each response')
+    parser.add_argument('--status', type=int, default=200, help='HTTP status returned')
+    parser.add_argument('--fail-first', type=int, default=0, help='Answer this many requests with 503 first')
+    args = parser.parse_args()
+
+    stub = StubWebhook(args.port, args.latency, args.status, args.fail_first)
+    print(f"Stub webhook listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
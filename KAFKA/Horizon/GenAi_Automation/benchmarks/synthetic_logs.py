@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+synthetic_logs.py
+Deterministic synthetic Kafka (server.log) and Zookeeper (zookeeper.out) logs for benchmarks
+Error/warning mix and stack trace rate are configurable; output is streamed to disk
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+KAFKA_INFO = [
+    ("[Log partition={topic}-{partition}, dir=/data/kafka-logs] Rolled new log segment at offset {offset} in {ms} ms.", "kafka.log.Log"),
+    ("[ReplicaFetcher replicaId={broker}, leaderId={leader}, fetcherId=0] Truncating partition {topic}-{partition} to local high watermark {offset}", "kafka.server.ReplicaFetcherThread"),
+    ("[GroupCoordinator {broker}]: Member consumer-{group}-{member} in group {group} has left, removing it from the group", "kafka.coordinator.group.GroupCoordinator"),
+    ("[Partition {topic}-{partition} broker={broker}] ISR updated to {broker},{leader} and version updated to [{offset}]", "kafka.cluster.Partition"),
+    ("Deleted log segment {offset} for partition {topic}-{partition}", "kafka.log.LogCleaner"),
+    ("[KafkaApi-{broker}] Auto creation of topic {topic} with {partition} partitions and replication factor 3 is successful", "kafka.server.KafkaApis"),
+]
+KAFKA_WARN = [
+    ("[Controller id={broker}, targetBrokerId={leader}] Connection to node {leader} (broker{leader}.example.com/10.0.{partition}.{leader}:9092) could not be established. Broker may not be available.", "org.apache.kafka.clients.NetworkClient"),
+    ("[ReplicaFetcher replicaId={broker}, leaderId={leader}, fetcherId=0] Error in response for fetch request (type=FetchRequest, replicaId={broker}, maxWait=500, minBytes=1)", "kafka.server.ReplicaFetcherThread"),
+    ("Client session timed out, have not heard from server in {ms}ms for sessionid 0x{session}", "org.apache.zookeeper.ClientCnxn"),
+    ("[Log partition={topic}-{partition}] Found a corrupted index file, deleting and rebuilding index", "kafka.log.Log"),
+]
+KAFKA_ERROR = [
+    ("Unable to connect to ZooKeeper at zk{leader}.example.com:2181", "kafka.zookeeper.ZooKeeperClient"),
+    ("[KafkaServer id={broker}] Fatal error during KafkaServer startup. Prepare to shutdown", "kafka.server.KafkaServer"),
+    ("Error while writing to checkpoint file /data/kafka-logs/{topic}-{partition}/leader-epoch-checkpoint", "kafka.server.LogDirFailureChannel"),
+    ("[ReplicaManager broker={broker}] Error processing append operation on partition {topic}-{partition}", "kafka.server.ReplicaManager"),
+]
+KAFKA_TRACES = [
+    ["java.net.BindException: Address already in use",
+     "sun.nio.ch.Net.bind0(Native Method)", "sun.nio.ch.Net.bind(Net.java:555)",
+     "kafka.network.Acceptor.openServerSocket(SocketServer.scala:667)", "kafka.network.Acceptor.<init>(SocketServer.scala:560)",
+     "kafka.network.SocketServer.createAcceptor(SocketServer.scala:279)", "kafka.server.KafkaServer.startup(KafkaServer.scala:278)"],
+    ["java.lang.OutOfMemoryError: Java heap space",
+     "java.nio.HeapByteBuffer.<init>(HeapByteBuffer.java:61)", "java.nio.ByteBuffer.allocate(ByteBuffer.java:348)",
+     "org.apache.kafka.common.memory.MemoryPool$1.tryAllocate(MemoryPool.java:30)", "kafka.network.Processor.poll(SocketServer.scala:1089)",
+     "kafka.network.Processor.run(SocketServer.scala:936)", "java.lang.Thread.run(Thread.java:833)"],
+    ["org.apache.kafka.common.errors.TimeoutException: Timed out waiting for a node assignment. Call: listNodes",
+     "kafka.zookeeper.ZooKeeperClient.waitUntilConnected(ZooKeeperClient.scala:271)", "kafka.zookeeper.ZooKeeperClient.<init>(ZooKeeperClient.scala:125)",
+     "kafka.zk.KafkaZkClient$.apply(KafkaZkClient.scala:1948)", "kafka.server.KafkaServer.initZkClient(KafkaServer.scala:431)"],
+]
+KAFKA_CAUSES = ["Caused by: java.io.IOException: No space left on device", "Caused by: java.net.ConnectException: Connection refused"]
+
+ZOOKEEPER_INFO = [
+    ("Accepted socket connection from /10.0.{partition}.{leader}:{port}", "NIOServerCxnFactory", "NIOServerCxn.Factory:0.0.0.0/0.0.0.0:2181"),
+    ("Established session 0x{session} with negotiated timeout 6000 for client /10.0.{partition}.{leader}:{port}", "ZooKeeperServer", "CommitProcessor:1"),
+    ("Closed socket connection for client /10.0.{partition}.{leader}:{port} which had sessionid 0x{session}", "NIOServerCnxn", "NIOWorkerThread-{partition}"),
+    ("Snapshotting: 0x{offset} to /data/zookeeper/version-2/snapshot.{offset}", "FileTxnSnapLog", "SyncThread:1"),
+]
+ZOOKEEPER_WARN = [
+    ("Unable to read additional data from client sessionid 0x{session}, likely client has closed socket", "NIOServerCnxn", "NIOWorkerThread-{partition}"),
+    ("fsync-ing the write ahead log in SyncThread:1 took {ms}ms which will adversely effect operation latency.", "FileTxnLog", "SyncThread:1"),
+    ("Cannot open channel to {leader} at election address zk{leader}.example.com/10.0.0.{leader}:3888", "QuorumCnxManager", "QuorumPeer[myid=1](plain=0.0.0.0:2181)(secure=disabled)"),
+]
+ZOOKEEPER_ERROR = [
+    ("Unable to load database on disk", "QuorumPeer", "main"),
+    ("Unexpected exception causing shutdown while sock still open", "LearnerHandler", "LearnerHandler-/10.0.0.{leader}:{port}"),
+    ("Severe unrecoverable error, exiting", "ZooKeeperCriticalThread", "SyncThread:1"),
+]
+ZOOKEEPER_TRACES = [
+    ["java.io.IOException: No space left on device",
+     "java.io.FileOutputStream.writeBytes(Native Method)", "java.io.FileOutputStream.write(FileOutputStream.java:354)",
+     "org.apache.zookeeper.server.persistence.FileTxnLog.append(FileTxnLog.java:291)", "org.apache.zookeeper.server.SyncRequestProcessor.run(SyncRequestProcessor.java:169)"],
+    ["java.net.ConnectException: Connection refused (Connection refused)",
+     "java.net.PlainSocketImpl.socketConnect(Native Method)", "java.net.Socket.connect(Socket.java:607)",
+     "org.apache.zookeeper.server.quorum.QuorumCnxManager.connectOne(QuorumCnxManager.java:664)"],
+]
+
+TOPICS = ['orders', 'payments', 'clickstream', 'audit-events', '__consumer_offsets', 'inventory']
+
+
+def parse_size(text):
+    """'16MB' -> bytes"""
+    text = str(text).strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+class SyntheticLogGenerator:
+    """Seeded generator of log4j records in the Kafka or Zookeeper layout"""
+
+    def __init__(self, service='kafka', error_rate=0.02, warn_rate=0.08, trace_rate=0.3, seed=42, start=None):
+        self.service = service
+        self.error_rate = error_rate
+        self.warn_rate = warn_rate
+        self.trace_rate = trace_rate   # Fraction of ERROR records followed by a stack trace
+        self.random = random.Random(seed)
+        self.clock = start or datetime(2024, 1, 15, 10, 0, 0)
+
+    def fields(self):
+        r = self.random
+        return {
+            'topic': r.choice(TOPICS), 'partition': r.randint(0, 11), 'offset': r.randint(1, 10 ** 9),
+            'broker': r.randint(1, 3), 'leader': r.randint(1, 3), 'ms': r.randint(1, 9000),
+            'group': f"group-{r.randint(1, 20)}", 'member': r.randint(1, 9999),
+            'session': f"{r.getrandbits(48):012x}", 'port': r.randint(30000, 60000),
+        }
+
+    def records(self):
+        """Endless iterator of records; each record is one log line plus optional trace lines"""
+        kafka = self.service == 'kafka'
+        while True:
+            self.clock += timedelta(milliseconds=self.random.randint(1, 400))
+            roll = self.random.random()
+            if roll < self.error_rate:
+                level, choices = 'ERROR', KAFKA_ERROR if kafka else ZOOKEEPER_ERROR
+            elif roll < self.error_rate + self.warn_rate:
+                level, choices = 'WARN', KAFKA_WARN if kafka else ZOOKEEPER_WARN
+            else:
+                level, choices = 'INFO', KAFKA_INFO if kafka else ZOOKEEPER_INFO
+
+            entry = self.random.choice(choices)
+            message = entry[0].format(**self.fields())
+            stamp = f"{self.clock:%Y-%m-%d %H:%M:%S},{self.clock.microsecond // 1000:03d}"
+            if kafka:
+                lines = [f"[{stamp}] {level} {message} ({entry[1]})"]
+            else:
+                thread = entry[2].format(**self.fields())
+                lines = [f"{stamp} [myid:1] - {level:<5} [{thread}:{entry[1]}@{self.random.randint(50, 900)}] - {message}"]
+
+            if level == 'ERROR' and self.random.random() < self.trace_rate:
+                trace = self.random.choice(KAFKA_TRACES if kafka else ZOOKEEPER_TRACES)
+                lines.append(trace[0])
+                lines.extend(f"\tat {frame}" for frame in trace[1:])
+                if kafka and self.random.random() < 0.5:
+                    lines.append(self.random.choice(KAFKA_CAUSES))
+                    lines.append(f"\tat {trace[1]}")
+                    lines.append(f"\t... {len(trace) - 2} more")
+            yield '\n'.join(lines) + '\n'
+
+    def write(self, path, size_bytes):
+        """Stream records to path until size_bytes is reached; returns (bytes, lines)"""
+        written = lines = 0
+        with open(path, 'w', buffering=1024 * 1024) as f:
+            for record in self.records():
+                f.write(record)
+                written += len(record.encode('utf-8'))
+                lines += record.count('\n')
+                if written >= size_bytes:
+                    break
+        return written, lines
+
+
+def cached_log(size_bytes, service='kafka', error_rate=0.02, warn_rate=0.08, trace_rate=0.3, seed=42, directory=None):
+    """Path to a generated log with these parameters, generating it once per parameter set"""
+    directory = Path(directory or os.environ.get('BENCH_DATA_DIR', Path(tempfile.gettempdir()) / 'kafka-monitor-bench'))
+    directory.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha1(repr((size_bytes, service, error_rate, warn_rate, trace_rate, seed)).encode()).hexdigest()[:12]
+    path = directory / f"{service}_{size_bytes}_{key}.log"
+    if not path.exists():
+        tmp_path = path.with_suffix('.tmp')
+        SyntheticLogGenerator(service, error_rate, warn_rate, trace_rate, seed).write(tmp_path, size_bytes)
+        os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Kafka/Zookeeper logs')
+    parser.add_argument('output', help='Output file')
+    parser.add_argument('--size', default='1MB', help='Target size (e.g. 1MB, 256MB, 1GB)')
+    parser.add_argument('--service', choices=['kafka', 'zookeeper'], default='kafka')
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--warn-rate', type=float, default=0.08)
+    parser.add_argument('--trace-rate', type=float, default=0.3, help='Fraction of ERROR records with a stack trace')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generator = SyntheticLogGenerator(args.service, args.error_rate, args.warn_rate, args.trace_rate, args.seed)
+    written, lines = generator.write(args.output, parse_size(args.size))
+    print(f"Wrote {lines} lines ({written / SIZE_UNITS['MB']:.1f} MB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+circuit_breaker.py
+Circuit breaker and background health poller for the Ollama backend
+A known-bad backend is skipped in milliseconds while recovery is probed asynchronously
+"""
+
+import logging
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures; half-open trial after the reset timeout"""
+
+    def __init__(self, config, name='ollama'):
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+
+        breaker_config = config.get('circuit_breaker', {})
+        self.failure_threshold = breaker_config.get('failure_threshold', 3)
+        self.reset_timeout = breaker_config.get('reset_timeout_seconds', 60)
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+        self.metrics = {'short_circuited': 0, 'opened': 0, 'closed': 0}
+
+    def allow_request(self):
+        """True if a call may go to the backend right now"""
+        with self.lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.trial_in_progress:
+                self.trial_in_progress = True
+                return True
+
+            self.metrics['short_circuited'] += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.trial_in_progress = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_progress = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def release(self):
+        """A call ended without a verdict (cancelled); free the half-open trial slot"""
+        with self.lock:
+            self.trial_in_progress = False
+
+    def trip(self):
+        """Open now (used when a health probe fails), so callers skip a backend already known to be down"""
+        with self.lock:
+            if self.state != OPEN:
+                self._transition(OPEN)
+
+    def half_open(self):
+        """Allow a trial call now (used when a health probe succeeds)"""
+        with self.lock:
+            if self.state == OPEN:
+                self._transition(HALF_OPEN)
+
+    @property
+    def is_open(self):
+        with self.lock:
+            return self.state == OPEN
+
+    @property
+    def is_closed(self):
+        with self.lock:
+            return self.state == CLOSED
+
+    def stats(self):
+        with self.lock:
+            return {**self.metrics, 'state': self.state, 'consecutive_failures': self.failures}
+
+    def _transition(self, state):
+        if state == self.state:
+            if state == OPEN:
+                self.opened_at = time.monotonic()
+            return
+
+        self.logger.warning(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.metrics['opened'] += 1
+        elif state == CLOSED:
+            self.opened_at = None
+            self.metrics['closed'] += 1
+        self.trial_in_progress = False
+
+
+class HealthPoller:
+    """Background thread caching backend health and driving breaker recovery"""
+
+    def __init__(self, config, breaker, probe, recover=None):
+        self.breaker = breaker
+        self.probe = probe
+        self.recover = recover
+        self.logger = logging.getLogger(__name__)
+
+        breaker_config = config.get('circuit_breaker', {})
+        self.interval = breaker_config.get('health_poll_interval_seconds', 15)
+        self.auto_recover = breaker_config.get('auto_start_ollama', True)
+
+        self.healthy = None
+        self.last_checked = None
+        self.recovery_attempted = False
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"{breaker.name}-health", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def check(self):
+        """Run one probe and update the cached health and breaker"""
+        try:
+            healthy = bool(self.probe())
+        except Exception as e:
+            self.logger.debug(f"Health probe failed: {e}")
+            healthy = False
+
+        self.healthy = healthy
+        self.last_checked = time.time()
+
+        if healthy:
+            self.recovery_attempted = False
+            if self.breaker.is_open:
+                self.logger.info(f"Backend '{self.breaker.name}' healthy again, allowing trial request")
+                self.breaker.half_open()
+            return healthy
+
+        # Don't let callers find out one first-token timeout at a time
+        self.breaker.trip()
+        if self.auto_recover and self.recover and not self.recovery_attempted:
+            # Only once per outage, and never on a caller's thread
+            self.recovery_attempted = True
+            self.recover()
+        return healthy
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self.check()
+            self.stop_event.wait(self.interval)
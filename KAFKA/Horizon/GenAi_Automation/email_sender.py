@@ -5,392 +5,430 @@ Email notification system using Verizon SMTP
 Sends detailed failure alerts and recovery notifications
 """
 
-import smtplib
 import logging
+import time
+from email import charset
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
 from datetime import datetime
 
+from alert_coalescer import AlertCoalescer
+from email_templates import TemplateRenderer
+from exception_folder import format_exceptions
+from fleet_report import FleetReport
+from log_attachments import LogAttachments
+from log_sources import format_evidence
+from notification_channels import NotificationChannels
+from notification_spool import NotificationSpool
+from smtp_pool import SmtpPool
+
+# Bodies are mostly ASCII: quoted-printable keeps them near their real size where base64 adds a third
+BODY_CHARSET = charset.Charset('utf-8')
+BODY_CHARSET.body_encoding = charset.QP
+
 class EmailSender:
     def __init__(self, config):
         self.config = config
         self.email_config = config['email']
         self.logger = logging.getLogger(__name__)
         
-    def send_email(self, subject, body_html, body_text=None):
-        """Send email notification with HTML and text versions"""
+        # HTML and plain-text bodies come from templates.directory, compiled once and reloaded on edit
+        self.templates = TemplateRenderer(config)
+        
+        # Full logs travel as compressed attachments; only a short tail is inlined
+        self.attachments = LogAttachments(config)
+        
+        # Daily report service section: grouped by cluster and host, degraded services only in detail
+        self.fleet_report = FleetReport(config)
+        
+        # Persistent SMTP sessions shared by all alerts (NOOP-checked, reconnected on drop)
+        self.transport = SmtpPool(config)
+        
+        # Durable spool: callers return after a local append, a background thread talks to SMTP
+        self.spool = NotificationSpool(config, self.transport).start()
+        
+        # With the spool on, email is journalled on the caller's thread so it survives a crash once send_email
+        # returns; webhook/file/syslog (and email without a spool) fan out to channels on their own workers
+        self.spool_email = self.spool.enabled and config.get('notification_channels', {}).get('smtp', {}).get('enabled', True)
+        self.channels = NotificationChannels(config, None if self.spool.enabled else self._deliver_email)
+        
+        # Failure/recovery alerts are held briefly and sent as one email per cluster; repeats are suppressed
+        self.coalescer = AlertCoalescer(config, self._deliver_alerts).start()
+        
+    def build_message(self, subject, body_html, body_text=None, recipients=None, priority=None, attachments=None):
+        """MIME message with HTML and text versions, wrapped in multipart/mixed when there are attachments"""
+        body = MIMEMultipart('alternative')
+        
+        # Add text version if provided
+        if body_text:
+            text_part = MIMEText(body_text, 'plain', BODY_CHARSET)
+            body.attach(text_part)
+        
+        # Add HTML version
+        html_part = MIMEText(body_html, 'html', BODY_CHARSET)
+        body.attach(html_part)
+        
+        attachments = [attachment for attachment in (attachments or []) if attachment is not None]
+        if attachments:
+            msg = MIMEMultipart('mixed')
+            msg.attach(body)
+            for attachment in attachments:
+                msg.attach(attachment)
+        else:
+            msg = body
+        
+        msg['Subject'] = Header(subject, 'utf-8')
+        msg['From'] = self.email_config['from_email']
+        msg['To'] = ', '.join(recipients or self.email_config['to_emails'])
+        if priority:
+            msg['X-Priority'] = str(priority)
+        return msg
+    
+    def send_email(self, subject, body_html, body_text=None, recipients=None, priority=None, lane='warning', attachments=None, details=None):
+        """Publish a notification to every channel (email with HTML and text versions); lane orders delivery.
+        details are structured fields (host, service, severity...) for the webhook, file and syslog channels"""
+        notification = {
+            'subject': subject,
+            'html': body_html,
+            'text': body_text,
+            'recipients': recipients,
+            'priority': priority,
+            'lane': lane,
+            'attachments': attachments,
+            'details': details,
+            'created': time.time(),
+        }
+        spooled = self._spool_email(notification) if self.spool_email else False
+        if not self.channels.publish(notification) and not spooled:
+            self.logger.error(f"No notification channel accepted '{subject}'")
+            return False
+        return True
+    
+    def _build(self, notification):
+        return self.build_message(notification['subject'], notification['html'], notification['text'],
+                                  notification['recipients'], notification['priority'], notification['attachments'])
+    
+    def _spool_email(self, notification):
+        """Journal the email before returning; the spool's sender delivers it"""
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = Header(subject, 'utf-8')
-            msg['From'] = self.email_config['from_email']
-            msg['To'] = ', '.join(self.email_config['to_emails'])
-            
-            # Add text version if provided
-            if body_text:
-                text_part = MIMEText(body_text, 'plain', 'utf-8')
-                msg.attach(text_part)
-            
-            # Add HTML version
-            html_part = MIMEText(body_html, 'html', 'utf-8')
-            msg.attach(html_part)
-            
-            # Send email
-            with smtplib.SMTP(self.email_config['smtp_server'], self.email_config['smtp_port'], timeout=30) as server:
-                server.send_message(msg)
-            
-            self.logger.info(f"Email sent successfully: {subject}")
+            self.spool.enqueue(self._build(notification), lane=notification['lane'], subject=notification['subject'])
             return True
-            
         except Exception as e:
-            self.logger.error(f"Failed to send email '{subject}': {e}")
+            self.logger.error(f"Failed to spool email '{notification['subject']}': {e}")
             return False
     
-    def send_failure_alert(self, server_host, service_name, log_content, ai_analysis, restart_attempted, restart_attempts):
-        """Send detailed service failure alert"""
+    def _deliver_email(self, notification):
+        """SMTP channel (spool disabled): send over a pooled session; raises so the channel retries"""
+        self.transport.send(self._build(notification))
+        self.logger.info(f"Email sent successfully: {notification['subject']}")
+    
+    def close(self):
+        """Send held alerts, let every channel finish, deliver what the spool can within its drain timeout, then close SMTP sessions"""
+        self.coalescer.close()
+        self.channels.close()
+        self.spool.close()
+        self.transport.close()
+    
+    def send_failure_alert(self, server_host, service_name, log_content, ai_analysis, restart_attempted, restart_attempts, log_templates=None, exceptions=None, error_profile=None, evidence=None, early_warnings=None, gc_metrics=None):
+        """Send (or hold for the coalescing window) a service failure alert; ai_analysis is the analyzer's result dict"""
+        alert = dict(
+            server_host=server_host, service_name=service_name, log_content=log_content, ai_analysis=ai_analysis,
+            restart_attempted=restart_attempted, restart_attempts=restart_attempts, log_templates=log_templates,
+            exceptions=exceptions, error_profile=error_profile, evidence=evidence,
+            early_warnings=early_warnings, gc_metrics=gc_metrics,
+        )
+        if not self.coalescer.enabled:
+            return self._send_failure_alert(**alert)
+        # Same service, severity and leading exception = the same problem reported again
+        signature = f"{ai_analysis.get('severity')}|{exceptions[0]['fingerprint'] if exceptions else ''}"
+        return self.coalescer.add('failure', server_host, service_name, signature, alert)
+    
+    def _send_failure_alert(self, server_host, service_name, log_content, ai_analysis, restart_attempted, restart_attempts, log_templates=None, exceptions=None, error_profile=None, evidence=None, early_warnings=None, gc_metrics=None):
+        """Send detailed service failure alert; ai_analysis is the analyzer's result dict (text plus fields)"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        severity = ai_analysis.get('severity')
+        action = ai_analysis.get('action')
         
-        subject = f"🚨 ALERT: {service_name.upper()} Service Down on {server_host} - {timestamp}"
-        
-        # Create HTML email body
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }}
-                .status-value {{ font-size: 18px; font-weight: bold; margin: 5px 0; }}
-                .status-down {{ color: #d32f2f; }}
-                .status-attempted {{ color: #ff9800; }}
-                .status-failed {{ color: #d32f2f; }}
-                .ai-analysis {{ background: linear-gradient(135deg, #e8f5e8, #f1f8e9); border-left: 4px solid #4CAF50; padding: 15px; margin: 15px 0; border-radius: 6px; }}
-                .logs-section {{ background: #f5f5f5; border: 1px solid #ddd; border-radius: 6px; margin: 15px 0; }}
-                .logs-header {{ background: #333; color: white; padding: 10px 15px; font-family: monospace; font-size: 14px; }}
-                .logs-content {{ padding: 15px; max-height: 400px; overflow-y: auto; font-family: monospace; font-size: 12px; line-height: 1.4; white-space: pre-wrap; }}
-                .action-list {{ background: #fff3e0; padding: 15px; border-radius: 6px; border-left: 4px solid #ff9800; }}
-                .action-list ol {{ margin: 0; padding-left: 20px; }}
-                .action-list li {{ margin-bottom: 8px; }}
-                .footer {{ background: #f8f9fa; padding: 15px; text-align: center; color: #666; font-size: 12px; }}
-                .timestamp {{ color: #666; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <div class="alert-icon">⚠️</div>
-                    <h1>Service Failure Alert</h1>
-                    <div class="timestamp">Alert generated at {timestamp}</div>
-                </div>
-                
-                <div class="content">
-                    <div class="status-grid">
-                        <div class="status-card">
-                            <div>Service</div>
-                            <div class="status-value status-down">{service_name.upper()}</div>
-                        </div>
-                        <div class="status-card">
-                            <div>Server</div>
-                            <div class="status-value">{server_host}</div>
-                        </div>
-                        <div class="status-card">
-                            <div>Status</div>
-                            <div class="status-value status-down">DOWN ❌</div>
-                        </div>
-                        <div class="status-card">
-                            <div>Auto Restart</div>
-                            <div class="status-value {'status-attempted' if restart_attempted else 'status-failed'}">
-                                {'ATTEMPTED' if restart_attempted else 'FAILED'}
-                            </div>
-                        </div>
-                        <div class="status-card">
-                            <div>Restart Attempts</div>
-                            <div class="status-value">{restart_attempts}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="ai-analysis">
-                        <h3>🤖 AI Analysis & Recommendations</h3>
-                        <pre style="white-space: pre-wrap; font-family: Arial, sans-serif; margin: 0;">{ai_analysis}</pre>
-                    </div>
-                    
-                    <div class="section">
-                        <h3>📋 Actions Taken</h3>
-                        <ul>
-                            <li>✅ Service health check performed</li>
-                            <li>{'✅' if restart_attempted else '❌'} Automatic restart {'attempted' if restart_attempted else 'skipped'}</li>
-                            <li>✅ Log analysis completed</li>
-                            <li>✅ Team notification sent</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="action-list">
-                        <h3>🔧 Immediate Next Steps</h3>
-                        <ol>
-                            <li>SSH to <strong>{server_host}</strong> and check system resources</li>
-                            <li>Manual service restart: <code>sudo systemctl restart {service_name}</code></li>
-                            <li>Review full logs: <code>journalctl -u {service_name} -f</code></li>
-                            <li>Check dependencies (Zookeeper for Kafka)</li>
-                            <li>Verify configuration files</li>
-                        </ol>
-                    </div>
-                    
-                    <div class="logs-section">
-                        <div class="logs-header">
-                            📄 Recent Service Logs (Last 500 lines)
-                        </div>
-                        <div class="logs-content">{self._escape_html(log_content[:4000])}{'...\n[LOG TRUNCATED - CHECK SERVER FOR FULL LOGS]' if len(log_content) > 4000 else ''}</div>
-                    </div>
-                </div>
-                
-                <div class="footer">
-                    <p>This alert was automatically generated by the Kafka Monitor System</p>
-                    <p>Server: {server_host} | Monitor Version: 1.0</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Create text version for email clients that don't support HTML
-        text_body = f"""
-KAFKA/ZOOKEEPER SERVICE FAILURE ALERT
-=====================================
-
-Service: {service_name.upper()}
-Server: {server_host}
-Status: DOWN
-Timestamp: {timestamp}
-Auto Restart: {'ATTEMPTED' if restart_attempted else 'FAILED'}
-Restart Attempts: {restart_attempts}
-
-AI ANALYSIS:
-{ai_analysis}
-
-RECENT LOGS:
-{log_content[:2000]}{'...[TRUNCATED]' if len(log_content) > 2000 else ''}
-
-IMMEDIATE ACTIONS:
-1. SSH to {server_host} and check system resources
-2. Manual restart: sudo systemctl restart {service_name}
-3. Check logs: journalctl -u {service_name} -f
-4. Verify dependencies and configuration
-
-This alert was automatically generated by the Kafka Monitor System.
-        """
+        subject = f"🚨 ALERT{f' [{severity}]' if severity else ''}: {service_name.upper()} Service Down on {server_host} - {timestamp}"
+        
+        # Route by the analysis: escalations also go to the escalation list, urgent ones are flagged
+        recipients = list(self.email_config['to_emails'])
+        if action == 'escalate' or severity == 'Critical':
+            recipients += [r for r in self.email_config.get('escalation_emails', []) if r not in recipients]
+        priority = 1 if severity in ('Critical', 'High') else None
+        
+        # Weighted log templates (repeated messages collapsed with counts)
+        template_lines = [
+            f"{item['occurrences']:>5}x [{item['level']}] {item['template']}" for item in (log_templates or [])
+        ]
+        # Folded Java exceptions (one entry per fingerprint)
+        exception_lines = [
+            f"{item['count']:>4}x {item['type']}{': ' + item['message'][:160] if item['message'] else ''}"
+            f"{' <- ' + ' <- '.join(item['causes']) if item['causes'] else ''} [fp {item['fingerprint']}]"
+            for item in (exceptions or [])
+        ]
+        
+        # Whole captured window plus the unabridged error summary go out compressed; the body keeps a tail
+        stem = f"{server_host}_{service_name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        log_attachment = self.attachments.compress(f"{stem}.log", [log_content])
+        errors_attachment = self.attachments.compress(f"{stem}_errors.txt", self._error_summary(
+            ai_analysis, exceptions, template_lines, error_profile, early_warnings, gc_metrics, evidence,
+        ))
+        log_excerpt, log_lines_total = self.attachments.excerpt(log_content)
+        # With the full lists attached, the body only needs the top entries
+        inline_items = self.attachments.inline_items if errors_attachment else None
         
-        return self.send_email(subject, html_body, text_body)
+        html_body, text_body = self._render('failure', {
+            'timestamp': timestamp,
+            'server_host': server_host,
+            'service_name': service_name,
+            'restart_attempted': restart_attempted,
+            'restart_attempts': restart_attempts,
+            'severity': severity,
+            'action': action,
+            'analysis_html': self._analysis_html(ai_analysis),
+            'analysis_text': ai_analysis['text'],
+            'early_warnings': early_warnings,
+            'error_profile': error_profile,
+            'gc_metrics': gc_metrics,
+            # Time-ordered evidence from the service's other log files
+            'evidence_text': format_evidence(evidence or []),
+            'evidence_count': len(evidence or []),
+            'exceptions_text': '\n'.join(exception_lines[:inline_items]),
+            'exception_count': len(exception_lines),
+            'exceptions_shown': len(exception_lines[:inline_items]),
+            'patterns_text': '\n'.join(template_lines[:inline_items]),
+            'pattern_count': len(template_lines),
+            'patterns_shown': len(template_lines[:inline_items]),
+            'log_excerpt': log_excerpt,
+            'log_lines_shown': log_excerpt.count('\n') + 1 if log_excerpt else 0,
+            'log_lines_total': log_lines_total,
+            'log_attachment': log_attachment.get_filename() if log_attachment else None,
+            'errors_attachment': errors_attachment.get_filename() if errors_attachment else None,
+        })
+        
+        return self.send_email(subject, html_body, text_body, recipients=recipients, priority=priority, lane='critical',
+                               attachments=[log_attachment, errors_attachment],
+                               details={'event': 'failure', 'host': server_host, 'service': service_name,
+                                        'severity': severity, 'action': action, 'restart_attempts': restart_attempts})
     
     def send_recovery_notification(self, server_host, service_name, recovery_time):
+        """Send (or hold for the coalescing window) a service recovery notification"""
+        alert = dict(server_host=server_host, service_name=service_name, recovery_time=recovery_time)
+        if not self.coalescer.enabled:
+            return self._send_recovery_notification(**alert)
+        return self.coalescer.add('recovery', server_host, service_name, '', alert)
+    
+    def _send_recovery_notification(self, server_host, service_name, recovery_time):
         """Send service recovery notification"""
         timestamp = recovery_time.strftime("%Y-%m-%d %H:%M:%S")
         subject = f"✅ RECOVERY: {service_name.upper()} Service Restored on {server_host}"
         
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }}
-                .container {{ max-width: 600px; margin: 0 auto; background-color: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                .header {{ background: linear-gradient(135deg, #4CAF50, #66BB6A); color: white; padding: 20px; text-align: center; }}
-                .header h1 {{ margin: 0; font-size: 24px; }}
-                .success-icon {{ font-size: 48px; margin-bottom: 10px; }}
-                .content {{ padding: 20px; }}
-                .status-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 15px; margin-bottom: 20px; }}
-                .status-card {{ background: #e8f5e8; padding: 15px; border-radius: 6px; text-align: center; }}
-                .status-value {{ font-size: 18px; font-weight: bold; margin: 5px 0; color: #2e7d32; }}
-                .info-section {{ background: #f1f8e9; padding: 15px; border-radius: 6px; border-left: 4px solid #4CAF50; }}
-                .footer {{ background: #f8f9fa; padding: 15px; text-align: center; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <div class="success-icon">✅</div>
-                    <h1>Service Recovery Notification</h1>
-                    <div style="color: #e8f5e8; font-size: 14px;">Recovery confirmed at {timestamp}</div>
-                </div>
-                
-                <div class="content">
-                    <div class="status-grid">
-                        <div class="status-card">
-                            <div>Service</div>
-                            <div class="status-value">{service_name.upper()}</div>
-                        </div>
-                        <div class="status-card">
-                            <div>Server</div>
-                            <div class="status-value">{server_host}</div>
-                        </div>
-                        <div class="status-card">
-                            <div>Status</div>
-                            <div class="status-value">RESTORED ✅</div>
-                        </div>
-                    </div>
-                    
-                    <div class="info-section">
-                        <h3>Recovery Summary</h3>
-                        <ul>
-                            <li>✅ Service successfully restarted</li>
-                            <li>✅ Port connectivity confirmed</li>
-                            <li>✅ Service health verified</li>
-                            <li>✅ Monitoring resumed</li>
-                        </ul>
-                    </div>
-                    
-                    <div style="margin-top: 20px; padding: 15px; background: #fff3e0; border-radius: 6px;">
-                        <h3>Recommended Follow-up Actions</h3>
-                        <ol>
-                            <li>Monitor service stability over the next hour</li>
-                            <li>Review logs for any warning messages</li>
-                            <li>Check system resources to prevent recurrence</li>
-                            <li>Update runbooks if new patterns identified</li>
-                        </ol>
-                    </div>
-                </div>
-                
-                <div class="footer">
-                    <p>Service recovery automatically detected by Kafka Monitor System</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_body = f"""
-SERVICE RECOVERY NOTIFICATION
-============================
-
-Service: {service_name.upper()}
-Server: {server_host}
-Status: RESTORED
-Recovery Time: {timestamp}
-
-RECOVERY ACTIONS COMPLETED:
-- Service successfully restarted
-- Port connectivity confirmed
-- Service health verified
-- Monitoring resumed
-
-FOLLOW-UP RECOMMENDED:
-1. Monitor service stability
-2. Review logs for warnings
-3. Check system resources
-4. Update documentation
-
-This notification was automatically generated by the Kafka Monitor System.
-        """
+        html_body, text_body = self._render('recovery', {
+            'timestamp': timestamp,
+            'server_host': server_host,
+            'service_name': service_name,
+        })
+        
+        return self.send_email(subject, html_body, text_body, lane='recovery',
+                               details={'event': 'recovery', 'host': server_host, 'service': service_name})
+    
+    def _deliver_alerts(self, group):
+        """Coalescer callback: a lone alert keeps its full email, anything more becomes one digest"""
+        alerts = group['alerts']
+        if len(alerts) == 1 and not group['cluster_level']:
+            alert = next(iter(alerts.values()))
+            if group['kind'] == 'failure':
+                return self._send_failure_alert(**alert['payload'])
+            return self._send_recovery_notification(**alert['payload'])
+        return self.send_alert_digest(group)
+    
+    def send_alert_digest(self, group):
+        """One email for every failure or recovery in a cluster's coalescing window"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        failure = group['kind'] == 'failure'
+        alerts = list(group['alerts'].values())
+        cluster = group['cluster']
+        services = sorted({alert['service_key'] for alert in alerts})
+        
+        severities = [alert['payload']['ai_analysis'].get('severity') for alert in alerts] if failure else []
+        ranked = [level for level in ('Critical', 'High', 'Medium', 'Low') if level in severities]
+        severity = ranked[0] if ranked else None
+        
+        if failure and group['cluster_level']:
+            subject = f"🚨 CLUSTER ALERT{f' [{severity}]' if severity else ''}: {len(services)} services down in {cluster} - {timestamp}"
+        elif failure:
+            subject = f"🚨 ALERT{f' [{severity}]' if severity else ''}: {len(services)} service failures in {cluster} - {timestamp}"
+        else:
+            subject = f"✅ RECOVERY: {len(services)} services restored in {cluster}"
+        
+        # Routing follows the worst alert in the group
+        recipients = list(self.email_config['to_emails'])
+        if failure and (severity == 'Critical' or any(alert['payload']['ai_analysis'].get('action') == 'escalate' for alert in alerts)):
+            recipients += [r for r in self.email_config.get('escalation_emails', []) if r not in recipients]
+        priority = 1 if severity in ('Critical', 'High') else None
+        
+        rows = []
+        attachments = []
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        for alert in alerts:
+            payload = alert['payload']
+            repeats = alert['repeats'] + alert['suppressed']
+            row = {
+                'host': alert['host'],
+                'service': alert['service'],
+                'seen': datetime.fromtimestamp(alert['first_seen']).strftime("%H:%M:%S"),
+                'repeats': repeats or '-',
+                'repeat_note': f" (+{repeats} repeat{'s' if repeats != 1 else ''})" if repeats else '',
+            }
+            if failure:
+                analysis = payload['ai_analysis']
+                log_attachment = self.attachments.compress(f"{alert['host']}_{alert['service']}_{stamp}.log", [payload['log_content']])
+                attachments.append(log_attachment)
+                log_excerpt, log_lines_total = self.attachments.excerpt(payload['log_content'], lines=min(self.attachments.inline_lines, 20))
+                row.update(
+                    severity=analysis.get('severity') or '-',
+                    action=analysis.get('action') or 'unknown',
+                    restart_attempts=payload['restart_attempts'],
+                    analysis_html=self._analysis_html(analysis),
+                    analysis_text=analysis['text'],
+                    exceptions_text='\n'.join(
+                        f"{item['count']:>4}x {item['type']}{': ' + item['message'][:160] if item['message'] else ''} [fp {item['fingerprint']}]"
+                        for item in (payload.get('exceptions') or [])[:3]
+                    ),
+                    log_excerpt=log_excerpt,
+                    log_lines_shown=log_excerpt.count('\n') + 1 if log_excerpt else 0,
+                    log_lines_total=log_lines_total,
+                    log_attachment=log_attachment.get_filename() if log_attachment else None,
+                )
+            else:
+                row['restored'] = payload['recovery_time'].strftime('%H:%M:%S')
+            rows.append(row)
         
-        return self.send_email(subject, html_body, text_body)
+        if failure:
+            title = 'Cluster Failure Alert' if group['cluster_level'] else 'Service Failure Digest'
+            lead = (f"{len(services)} services failed in {cluster} within {self.coalescer.window}s "
+                    f"(cluster threshold {self.coalescer.cluster_threshold}). Automatic restarts did not bring them back.")
+        else:
+            title = 'Service Recovery Digest'
+            lead = f"{len(services)} services in {cluster} recovered within {self.coalescer.window}s."
+        
+        html_body, text_body = self._render('alert_digest', {
+            'timestamp': timestamp,
+            'failure': failure,
+            'title': title,
+            'cluster': cluster,
+            'lead': lead,
+            'alerts': rows,
+            'window': self.coalescer.window,
+            'quiet_minutes': f"{self.coalescer.quiet_period / 60:.0f}",
+        })
+        
+        return self.send_email(subject, html_body, text_body, recipients=recipients, priority=priority,
+                               lane='critical' if failure else 'recovery', attachments=attachments,
+                               details={'event': f"{group['kind']}_digest", 'cluster': cluster, 'cluster_level': group['cluster_level'],
+                                        'severity': severity, 'services': services})
+    
+    def send_early_warning(self, server_host, service_name, events, context):
+        """Send an early warning for log rate anomalies or GC heap pressure on a service that is still up"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        series = ', '.join(sorted({event['series'] for event in events}))
+        problem = 'heap pressure' if all(event['kind'] == 'gc' for event in events) else 'rate spike'
+        subject = f"⚠️ EARLY WARNING: {service_name.upper()} on {server_host} - {series} {problem}"
+        
+        html_body, text_body = self._render('early_warning', {
+            'timestamp': timestamp,
+            'server_host': server_host,
+            'service_name': service_name,
+            'problem': problem,
+            'heap_pressure': problem == 'heap pressure',
+            'event_count': len(events),
+            'context': context,
+        })
+        
+        return self.send_email(subject, html_body, text_body,
+                               details={'event': 'early_warning', 'host': server_host, 'service': service_name, 'problem': problem})
     
     def send_daily_report(self, service_status, health_recommendations):
         """Send daily cluster health report"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        total_services = len(service_status)
-        healthy_services = sum(1 for status in service_status.values() if status)
-        failed_services = total_services - healthy_services
+        summary = self.fleet_report.summarize(service_status)
+        failed_services = summary['failed']
         
-        health_color = "#4CAF50" if failed_services == 0 else "#ff9800" if failed_services < 3 else "#d32f2f"
-        health_status = "HEALTHY" if failed_services == 0 else "DEGRADED" if failed_services < 3 else "CRITICAL"
+        if not summary['total']:
+            health_color, health_status = "#757575", "NO SERVICES"
+        else:
+            health_color = "#4CAF50" if failed_services == 0 else "#ff9800" if failed_services < 3 else "#d32f2f"
+            health_status = "HEALTHY" if failed_services == 0 else "DEGRADED" if failed_services < 3 else "CRITICAL"
         
         subject = f"📊 Daily Kafka/Zookeeper Cluster Report - {datetime.now().strftime('%Y-%m-%d')}"
         
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }}
-                .container {{ max-width: 800px; margin: 0 auto; background-color: white; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                .header {{ background: linear-gradient(135deg, {health_color}, {health_color}cc); color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; }}
-                .metrics-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-bottom: 25px; }}
-                .metric-card {{ background: #f8f9fa; padding: 20px; border-radius: 8px; text-align: center; }}
-                .metric-value {{ font-size: 32px; font-weight: bold; margin: 10px 0; }}
-                .metric-label {{ color: #666; font-size: 14px; }}
-                .services-list {{ background: #f8f9fa; border-radius: 8px; padding: 15px; margin: 15px 0; }}
-                .service-item {{ display: flex; justify-content: space-between; padding: 8px 0; border-bottom: 1px solid #eee; }}
-                .service-status {{ font-weight: bold; }}
-                .status-up {{ color: #4CAF50; }}
-                .status-down {{ color: #d32f2f; }}
-                .recommendations {{ background: #e3f2fd; border-left: 4px solid #2196F3; padding: 15px; margin: 15px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>📊 Cluster Health Report</h1>
-                    <h2>Overall Status: {health_status}</h2>
-                    <div>Report generated: {timestamp}</div>
-                </div>
-                
-                <div class="content">
-                    <div class="metrics-grid">
-                        <div class="metric-card">
-                            <div class="metric-value" style="color: {health_color};">{total_services}</div>
-                            <div class="metric-label">Total Services</div>
-                        </div>
-                        <div class="metric-card">
-                            <div class="metric-value" style="color: #4CAF50;">{healthy_services}</div>
-                            <div class="metric-label">Healthy Services</div>
-                        </div>
-                        <div class="metric-card">
-                            <div class="metric-value" style="color: #d32f2f;">{failed_services}</div>
-                            <div class="metric-label">Failed Services</div>
-                        </div>
-                        <div class="metric-card">
-                            <div class="metric-value" style="color: #2196F3;">{int((healthy_services/total_services)*100)}%</div>
-                            <div class="metric-label">Availability</div>
-                        </div>
-                    </div>
-                    
-                    <h3>Service Status Details</h3>
-                    <div class="services-list">
-        """
-        
-        for service_key, status in service_status.items():
-            status_class = "status-up" if status else "status-down"
-            status_text = "UP ✅" if status else "DOWN ❌"
-            html_body += f"""
-                        <div class="service-item">
-                            <span>{service_key}</span>
-                            <span class="service-status {status_class}">{status_text}</span>
-                        </div>
-            """
-        
-        html_body += f"""
-                    </div>
-                    
-                    <div class="recommendations">
-                        <h3>🤖 AI Health Recommendations</h3>
-                        <pre style="white-space: pre-wrap; font-family: Arial, sans-serif;">{health_recommendations}</pre>
-                    </div>
-                    
-                    <div style="margin-top: 25px; padding: 15px; background: #fff3e0; border-radius: 8px;">
-                        <h3>📈 Monitoring Actions</h3>
-                        <ul>
-                            <li>Review system resource utilization</li>
-                            <li>Check disk space on all servers</li>
-                            <li>Verify backup completion status</li>
-                            <li>Update capacity planning metrics</li>
-                        </ul>
-                    </div>
-                </div>
-                
-                <div style="background: #f8f9fa; padding: 15px; text-align: center; color: #666; font-size: 12px;">
-                    <p>Daily report automatically generated by Kafka Monitor System</p>
-                    <p>Next report scheduled for tomorrow at the same time</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return self.send_email(subject, html_body)
+        html_body, text_body = self._render('daily_report', {
+            'timestamp': timestamp,
+            'health_color': health_color,
+            'health_status': health_status,
+            'total_services': summary['total'],
+            'healthy_services': summary['healthy'],
+            'failed_services': failed_services,
+            'availability': summary['availability'],
+            'cluster_count': len(summary['clusters']),
+            'services_html': self.fleet_report.render_html(summary),
+            'services_text': self.fleet_report.render_text(summary),
+            'recommendations': health_recommendations,
+        })
+        
+        return self.send_email(subject, html_body, text_body, lane='report',
+                               details={'event': 'daily_report', 'total_services': summary['total'],
+                                        'failed_services': failed_services, 'availability': summary['availability']})
+    
+    def _render(self, kind, context):
+        """(html, text) from the compiled templates; a plain field dump if a template is missing or broken"""
+        try:
+            return self.templates.render(kind, context)
+        except Exception as e:
+            self.logger.error(f"Error rendering {kind} template, sending a plain fallback: {e}")
+            text_body = '\n'.join(f"{key}: {value}" for key, value in context.items()
+                                  if not key.endswith('_html') and isinstance(value, (str, int, float)))
+            return f"<pre>{self._escape_html(text_body)}</pre>", text_body
+    
+    def _error_summary(self, analysis, exceptions, template_lines, error_profile, early_warnings, gc_metrics, evidence):
+        """Sections of the folded error summary attachment, unabridged (the email body keeps the short forms)"""
+        sections = [
+            ('AI ANALYSIS', analysis.get('text')),
+            ('JAVA EXCEPTIONS (folded)', format_exceptions(exceptions or [], limit=len(exceptions or []))),
+            ('TOP LOG PATTERNS', '\n'.join(template_lines)),
+            ('ERROR PROFILE (per minute)', error_profile),
+            ('EARLY WARNINGS BEFORE FAILURE', early_warnings),
+            ('JVM GC METRICS', gc_metrics),
+            ('RELATED LOG FILES', format_evidence(evidence or [], limit=len(evidence or []))),
+        ]
+        for title, body in sections:
+            if body:
+                yield f"{title}\n{'=' * len(title)}\n{body}\n\n"
+    
+    def _analysis_html(self, analysis):
+        """Structured analysis as HTML fields; free-text analyses as preformatted text"""
+        severity = analysis.get('severity')
+        badge = ''
+        if severity or analysis.get('action'):
+            badge = (f'<p><span class="severity severity-{(severity or "unknown").lower()}">{self._escape_html(severity or "Unknown")}</span>'
+                     f' &nbsp;Recommended action: <strong>{self._escape_html(analysis.get("action") or "investigate")}</strong></p>')
+        if not analysis.get('structured'):
+            return f'{badge}<pre style="white-space: pre-wrap; font-family: Arial, sans-serif; margin: 0;">{self._escape_html(analysis["text"])}</pre>'
+        
+        def items(values, tag):
+            return f"<{tag}>{''.join(f'<li>{self._escape_html(value)}</li>' for value in values)}</{tag}>" if values else '<p>-</p>'
+        
+        reason = f" - {self._escape_html(analysis['severity_reason'])}" if analysis.get('severity_reason') else ''
+        return f"""{badge}
+                        <p><strong>Problem:</strong> {self._escape_html(analysis['summary'])}</p>
+                        <p><strong>Root cause:</strong> {self._escape_html(analysis['root_cause'])}{reason}</p>
+                        <h4>Immediate actions</h4>{items(analysis.get('immediate_actions'), 'ol')}
+                        <h4>Solution steps</h4>{items(analysis.get('steps'), 'ol')}
+                        <h4>Prevention</h4>{items(analysis.get('prevention'), 'ul')}
+                        <p><strong>Related components:</strong> {self._escape_html(', '.join(analysis.get('related_components') or []) or '-')}</p>"""
     
     def _escape_html(self, text):
         """Escape HTML characters in text"""
@@ -400,13 +438,4 @@ This notification was automatically generated by the Kafka Monitor System.
                    .replace('<', '&lt;')
                    .replace('>', '&gt;')
                    .replace('"', '&quot;')
-                   .replace("'", '&#x27;'))container {{ max-width: 800px; margin: 0 auto; background-color: white; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                .header {{ background: linear-gradient(135deg, #d32f2f, #f44336); color: white; padding: 20px; text-align: center; }}
-                .header h1 {{ margin: 0; font-size: 24px; }}
-                .alert-icon {{ font-size: 48px; margin-bottom: 10px; }}
-                .content {{ padding: 20px; }}
-                .section {{ margin-bottom: 25px; border-left: 4px solid #2196F3; padding-left: 15px; }}
-                .section h3 {{ color: #1976D2; margin-top: 0; }}
-                .status-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px; margin-bottom: 20px; }}
-                .status-card {{ background: #f8f9fa; padding: 15px; border-radius: 6px; text-align: center; }}
-             
+                   .replace("'", '&#x27;'))
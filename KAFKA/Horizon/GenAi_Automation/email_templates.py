@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+email_templates.py
+Email templates from templates.directory rendered with Jinja2 (HTML auto-escaped, plain-text variants)
+The environment caches compiled templates and recompiles a file when its mtime changes; HTML is minified as it loads
+"""
+
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+
+from jinja2 import ChainableUndefined, Environment, FileSystemLoader, TemplateNotFound, select_autoescape
+
+# Templates shipped with the monitor; used when templates.directory does not have a file
+BUNDLED_DIRECTORY = Path(__file__).resolve().parent / 'templates'
+AUTOESCAPE_EXTENSIONS = ('html', 'htm', 'xml')
+
+STYLE_RE = re.compile(r'(<style[^>]*>)(.*?)(</style>)', re.S | re.I)
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE_RE = re.compile(r'\s*([{};:,>])\s*')
+# Whitespace containing a newline between markup/tags; text inside elements and <pre> lines is left alone
+BETWEEN_TAGS_RE = re.compile(r'(>|%}|#})\s*\n\s*(?=<|{%|{#)')
+
+
+def minify_css(css):
+    css = CSS_COMMENT_RE.sub('', css)
+    css = CSS_SPACE_RE.sub(r'\1', ' '.join(css.split()))
+    return css.replace(';}', '}')
+
+
+def minify_html(source):
+    """Compact <style> blocks and drop indentation between tags; template tags are kept intact"""
+    source = STYLE_RE.sub(lambda match: match.group(1) + minify_css(match.group(2)) + match.group(3), source)
+    return BETWEEN_TAGS_RE.sub(r'\1', source)
+
+
+class MinifyingLoader(FileSystemLoader):
+    """FileSystemLoader that minifies HTML sources and counts (re)loads; Jinja2 keeps the mtime check"""
+
+    def __init__(self, searchpath, minify=True):
+        super().__init__(searchpath)
+        self.logger = logging.getLogger(__name__)
+        self.minify = minify
+        self.loaded = set()
+        self.lock = threading.Lock()
+        self.metrics = {'compiles': 0, 'reloads': 0}
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if self.minify and filename.lower().endswith(tuple(f".{extension}" for extension in AUTOESCAPE_EXTENSIONS)):
+            source = minify_html(source)
+        with self.lock:
+            self.metrics['compiles'] += 1
+            if filename in self.loaded:
+                self.metrics['reloads'] += 1
+                self.logger.info(f"Template {filename} changed, recompiled")
+            else:
+                self.loaded.add(filename)
+                self.logger.debug(f"Compiled template {filename}")
+        return source, filename, uptodate
+
+
+def create_environment(directories, minify=True):
+    """Jinja2 environment over directories (first match wins); missing names render empty and test false"""
+    return Environment(
+        loader=MinifyingLoader([str(directory) for directory in directories], minify),
+        autoescape=select_autoescape(AUTOESCAPE_EXTENSIONS),
+        auto_reload=True,
+        undefined=ChainableUndefined,
+        keep_trailing_newline=True,
+    )
+
+
+class TemplateRenderer:
+    """Renders the configured templates; operator edits are picked up without a restart"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        templates_config = config.get('templates', {})
+        self.directory = Path(templates_config.get('directory', '/opt/kafka-monitor/templates'))
+        self.minify = templates_config.get('minify', True)
+        self.names = {
+            'failure': templates_config.get('failure_template', 'failure_alert.html'),
+            'recovery': templates_config.get('recovery_template', 'recovery_notification.html'),
+            'daily_report': templates_config.get('daily_report_template', 'daily_report.html'),
+            'early_warning': templates_config.get('early_warning_template', 'early_warning.html'),
+            'alert_digest': templates_config.get('alert_digest_template', 'alert_digest.html'),
+        }
+
+        self.environment = create_environment([self.directory, BUNDLED_DIRECTORY], self.minify)
+        self.lock = threading.Lock()
+        self.metrics = {'renders': 0, 'render_seconds': 0.0}
+
+    def render(self, kind, context):
+        """(html, text) for a template kind; text is None when there is no .txt variant"""
+        started = time.perf_counter()
+        html_name = self.names[kind]
+        html_body = self.template(html_name).render(context)
+        text_template = self.template(str(Path(html_name).with_suffix('.txt')), required=False)
+        text_body = text_template.render(context) if text_template else None
+        with self.lock:
+            self.metrics['renders'] += 1
+            self.metrics['render_seconds'] += time.perf_counter() - started
+        return html_body, text_body
+
+    def template(self, name, required=True):
+        """Compiled template for a file name (recompiled by Jinja2 after an edit)"""
+        try:
+            return self.environment.get_template(name)
+        except TemplateNotFound:
+            if required:
+                raise
+            return None
+
+    def stats(self):
+        with self.lock:
+            renders = self.metrics['renders']
+            return {
+                **self.metrics,
+                **self.environment.loader.metrics,
+                'render_seconds': round(self.metrics['render_seconds'], 4),
+                'avg_render_ms': round(self.metrics['render_seconds'] / renders * 1000, 3) if renders else 0.0,
+                'cached': len(self.environment.cache),
+            }
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+exception_folder.py
+Streaming folder for multi-line Java exceptions in Kafka/Zookeeper logs
+Collapses stack traces (with Caused by chains) into fingerprinted events
+"""
+
+import hashlib
+import logging
+import re
+
+from log_templates import parse_log_line
+
+EXCEPTION_HEADER = re.compile(r'^\s*(?:Exception in thread "[^"]*"\s+)?(?P<type>(?:[a-zA-Z_$][\w$]*\.)+[A-Z][\w$]*(?:Exception|Error|Throwable))(?::\s*(?P<message>.*))?$')
+CAUSED_BY = re.compile(r'^\s*Caused by:\s*(?P<type>[\w$.]+)(?::\s*(?P<message>.*))?$')
+STACK_FRAME = re.compile(r'^\s+at\s+(?P<frame>[^\s(]+)(?:\((?P<location>[^)]*)\))?')
+FRAME_ELISION = re.compile(r'^\s*\.\.\. \d+ (?:more|common frames omitted)')
+SUPPRESSED = re.compile(r'^\s*Suppressed:')
+
+# Frames from these packages are JDK/library plumbing, not application code
+DEFAULT_LIBRARY_PREFIXES = ('java.', 'javax.', 'jdk.', 'sun.', 'com.sun.', 'scala.', 'io.netty.', 'org.slf4j.', 'org.apache.log4j.')
+
+
+def frame_name(frame):
+    """Frame without the JDK 9+ module / class loader prefix ('java.base/java.lang.Thread.run', 'app//com.x.Y.z')"""
+    return frame.rpartition('/')[2]
+
+
+def strip_stack_frames(log_content):
+    """Drop frame and elision lines, keeping exception headers and Caused by lines"""
+    return '\n'.join(
+        line for line in log_content.splitlines()
+        if not (STACK_FRAME.match(line) or FRAME_ELISION.match(line))
+    )
+
+
+class ExceptionEvent:
+    """One folded exception with its cause chain and occurrence statistics"""
+
+    def __init__(self, exception_type, message, timestamp=None, level=None, context=None):
+        self.exception_type = exception_type
+        self.message = message or ''
+        self.causes = []
+        self.frames = []
+        self.level = level
+        self.context = context
+        self.fingerprint = None
+        self.count = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'type': self.exception_type,
+            'message': self.message,
+            'causes': [f"{t}: {m}" if m else t for t, m in self.causes],
+            'top_frames': self.frames,
+            'level': self.level,
+            'context': self.context,
+            'count': self.count,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+
+class ExceptionFolder:
+    """Line-at-a-time parser that folds stack traces and merges repeats by fingerprint"""
+
+    def __init__(self, config=None):
+        self.logger = logging.getLogger(__name__)
+
+        folder_config = (config or {}).get('exception_folding', {})
+        self.fingerprint_frames = folder_config.get('fingerprint_frames', 3)
+        self.library_prefixes = tuple(folder_config.get('library_packages', DEFAULT_LIBRARY_PREFIXES))
+
+        self.events = {}
+        self.current = None
+        self.current_frames = []
+        self.in_cause = False
+        self.last_record = (None, None, None)
+
+    def feed(self, line):
+        """Consume one raw log line"""
+        if not line.strip():
+            return
+
+        frame = STACK_FRAME.match(line)
+        if frame:
+            # Top frames come from the outermost exception only, not its causes or suppressed ones
+            if self.current is not None and not self.in_cause:
+                self.current_frames.append(frame_name(frame.group('frame')))
+            return
+
+        if FRAME_ELISION.match(line):
+            return
+        if SUPPRESSED.match(line):
+            self.in_cause = True
+            return
+
+        cause = CAUSED_BY.match(line)
+        if cause and self.current is not None:
+            self.current.causes.append((cause.group('type'), (cause.group('message') or '').strip()))
+            self.in_cause = True
+            return
+
+        header = EXCEPTION_HEADER.match(line)
+        if header:
+            self._finish()
+            timestamp, level, context = self.last_record
+            self.current = ExceptionEvent(header.group('type'), (header.group('message') or '').strip(), timestamp, level, context)
+            self.current_frames = []
+            self.in_cause = False
+            return
+
+        # An ordinary log record ends any open trace and becomes context for the next one
+        self._finish()
+        timestamp, level, message = parse_log_line(line.strip())
+        if timestamp:
+            self.last_record = (timestamp, level, message[:200])
+
+    def fold(self, log_content):
+        """Fold a block of log text; returns events sorted by count, then recency"""
+        for line in log_content.splitlines():
+            self.feed(line)
+        self._finish()
+        return self.results()
+
+    def results(self):
+        return sorted(self.events.values(), key=lambda e: (e.count, e.last_seen or ''), reverse=True)
+
+    def app_frames(self, frames):
+        return [frame for frame in frames if not frame.startswith(self.library_prefixes)]
+
+    def _finish(self):
+        event = self.current
+        if event is None:
+            return
+        self.current = None
+
+        app_frames = self.app_frames(self.current_frames)
+        top_frames = (app_frames or self.current_frames)[:self.fingerprint_frames]
+        key = '|'.join([event.exception_type] + [t for t, _ in event.causes] + top_frames)
+        event.fingerprint = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        event.frames = top_frames
+
+        existing = self.events.get(event.fingerprint)
+        if existing is None:
+            self.events[event.fingerprint] = event
+            return
+
+        existing.count += 1
+        if event.first_seen and (not existing.first_seen or event.first_seen < existing.first_seen):
+            existing.first_seen = event.first_seen
+        if event.last_seen and (not existing.last_seen or event.last_seen > existing.last_seen):
+            existing.last_seen = event.last_seen
+            existing.message = event.message or existing.message
+
+
+def format_exceptions(exceptions, limit=10):
+    """Compact one-to-two line rendering of folded exceptions for prompts and emails"""
+    lines = []
+    for item in exceptions[:limit]:
+        head = f"{item['count']:>4}x {item['type']}"
+        if item['message']:
+            head += f": {item['message'][:160]}"
+        lines.append(head)
+
+        details = []
+        if item['causes']:
+            details.append('caused by ' + ' <- '.join(cause[:120] for cause in item['causes']))
+        if item['top_frames']:
+            details.append('at ' + ', '.join(item['top_frames']))
+        seen = f"seen {item['first_seen'] or '?'} .. {item['last_seen'] or '?'}" if item['first_seen'] else ''
+        details.append(f"{seen} [fp {item['fingerprint']}]".strip())
+        lines.append('      ' + ' | '.join(details))
+    return '\n'.join(lines)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+fleet_report.py
+Service status section of the daily report, grouped by cluster and host
+Healthy hosts are summarized in one line per cluster; only degraded hosts are listed service by service
+"""
+
+import heapq
+import html
+import io
+import logging
+import time
+
+# Down service names kept per host; the rest are counted
+NAMES_PER_HOST = 10
+
+
+class FleetReport:
+    """One pass over service_status into per-cluster host counts; rendering writes into a buffer"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        report_config = config.get('daily_report', {})
+        self.max_degraded = report_config.get('max_degraded_services', 200)
+        self.max_healthy_hosts = report_config.get('max_healthy_hosts_listed', 50)
+
+        # Same host -> cluster mapping as alert coalescing (optional 'cluster' key on each server entry)
+        self.default_cluster = config.get('alert_coalescing', {}).get('cluster_name', 'kafka')
+        self.clusters = {server['host']: server.get('cluster', self.default_cluster) for server in config.get('servers', [])}
+
+    def summarize(self, service_status):
+        """Totals plus clusters with hosts -> [up, down, first NAMES_PER_HOST down service names] and the listable hosts"""
+        started = time.perf_counter()
+        hosts = {}
+        for service_key, up in service_status.items():
+            host, _, service = service_key.rpartition(':')
+            if not host:
+                host, service = service_key, ''
+            counts = hosts.get(host)
+            if counts is None:
+                counts = hosts[host] = [0, 0, []]
+            if up:
+                counts[0] += 1
+            else:
+                counts[1] += 1
+                if len(counts[2]) < NAMES_PER_HOST:
+                    counts[2].append(service or service_key)
+
+        # Per host from here on, not per service
+        clusters = {}
+        healthy = failed = 0
+        for host, counts in hosts.items():
+            cluster_name = self.clusters.get(host, self.default_cluster)
+            cluster = clusters.get(cluster_name)
+            if cluster is None:
+                cluster = clusters[cluster_name] = {'name': cluster_name, 'up': 0, 'down': 0, 'hosts': {}}
+            cluster['hosts'][host] = counts
+            cluster['up'] += counts[0]
+            cluster['down'] += counts[1]
+            healthy += counts[0]
+            failed += counts[1]
+        for cluster in clusters.values():
+            cluster.update(self._split(cluster['hosts']))
+
+        total = healthy + failed
+        summary = {
+            'total': total,
+            'healthy': healthy,
+            'failed': failed,
+            'availability': self.availability(healthy, total),
+            # Degraded clusters first, then by name
+            'clusters': sorted(clusters.values(), key=lambda cluster: (cluster['down'] == 0, cluster['name'])),
+        }
+        self.logger.debug(f"Summarized {total} services across {len(clusters)} clusters in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return summary
+
+    @staticmethod
+    def availability(healthy, total):
+        """Percentage with one decimal, rounded down so a fleet with any failure never shows 100.0%; n/a when empty"""
+        if not total:
+            return 'n/a'
+        return f"{healthy * 1000 // total / 10:.1f}%"
+
+    def render_html(self, summary):
+        out = io.StringIO()
+        write = out.write
+        if not summary['clusters']:
+            write('<p>No services are configured for monitoring.</p>')
+        listed = 0
+        for cluster in summary['clusters']:
+            write(f'<div class="cluster"><h4>{html.escape(cluster["name"])} &mdash; {cluster["up"]} of {cluster["up"] + cluster["down"]} services up on {len(cluster["hosts"])} hosts</h4>')
+            shown = 0
+            for host, (up, down, names) in cluster['degraded']:
+                if listed >= self.max_degraded:
+                    break
+                write(f'<div class="service-item"><span>{html.escape(host)}</span>'
+                      f'<span class="service-status status-down">DOWN ❌ {html.escape(self._down_list(down, names))}</span>'
+                      f'<span>{up} of {up + down} up</span></div>')
+                listed += len(names)
+                shown += 1
+            if shown < cluster['degraded_count']:
+                write(f'<div class="service-item"><span>&hellip; {cluster["degraded_count"] - shown} more degraded hosts not listed</span></div>')
+            if cluster['healthy_count']:
+                write(f'<div class="healthy-hosts"><span class="status-up">UP ✅</span> {cluster["healthy_count"]} hosts fully healthy '
+                      f'({cluster["healthy_services"]} services): {html.escape(self._host_list(cluster))}</div>')
+            write('</div>')
+        return out.getvalue()
+
+    def render_text(self, summary):
+        out = io.StringIO()
+        write = out.write
+        if not summary['clusters']:
+            write('  No services are configured for monitoring.\n')
+        listed = 0
+        for cluster in summary['clusters']:
+            write(f"{cluster['name']}: {cluster['up']} of {cluster['up'] + cluster['down']} services up on {len(cluster['hosts'])} hosts\n")
+            shown = 0
+            for host, (up, down, names) in cluster['degraded']:
+                if listed >= self.max_degraded:
+                    break
+                write(f"  DOWN  {host}: {self._down_list(down, names)} ({up} of {up + down} up)\n")
+                listed += len(names)
+                shown += 1
+            if shown < cluster['degraded_count']:
+                write(f"  ... {cluster['degraded_count'] - shown} more degraded hosts not listed\n")
+            if cluster['healthy_count']:
+                write(f"  UP    {cluster['healthy_count']} hosts fully healthy ({cluster['healthy_services']} services): {self._host_list(cluster)}\n")
+        return out.getvalue()
+
+    def _split(self, hosts):
+        """Listable hosts (most services down first; healthy by name) and counts; only as many as can be listed are ordered"""
+        degraded_count = healthy_count = healthy_services = 0
+        for up, down, _ in hosts.values():
+            if down:
+                degraded_count += 1
+            else:
+                healthy_count += 1
+                healthy_services += up
+        degraded = heapq.nsmallest(
+            self.max_degraded, ((host, counts) for host, counts in hosts.items() if counts[1]),
+            key=lambda item: (-item[1][1], item[0]),
+        )
+        healthy = heapq.nsmallest(self.max_healthy_hosts, (host for host, counts in hosts.items() if not counts[1]))
+        return {
+            'degraded': degraded, 'degraded_count': degraded_count,
+            'healthy': healthy, 'healthy_count': healthy_count, 'healthy_services': healthy_services,
+        }
+
+    def _down_list(self, down, names):
+        more = down - len(names)
+        return ', '.join(names) + (f" +{more} more" if more else '')
+
+    def _host_list(self, cluster):
+        names = ', '.join(cluster['healthy'])
+        if cluster['healthy_count'] > len(cluster['healthy']):
+            names += f", ... +{cluster['healthy_count'] - len(cluster['healthy'])} more"
+        return names
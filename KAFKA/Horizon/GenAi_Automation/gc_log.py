@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+gc_log.py
+Streaming parser for JDK 17 unified GC logs (kafkaServer-gc.log, zookeeper-gc.log)
+Tracks pause percentiles, allocation rate and post-GC heap occupancy; warns on heap pressure before an OOM
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+# [2024-01-15T10:23:45.123+0000][gc] GC(12) ... (optionally [12.345s], [info] and other decorations)
+GC_LINE = re.compile(r'^\[(?P<ts>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3})[^\]]*\](?:\[(?:[\d.]+m?s|\w+)\s*\])*?\[gc[\w,]*\s*\]\s*(?:GC\((?P<gc>\d+)\)\s+)?(?P<msg>.*)$')
+# Pause Young (Normal) (G1 Evacuation Pause) 512M->128M(1024M) 12.345ms
+PAUSE = re.compile(r'^Pause (?P<kind>\w+)(?P<detail>.*?)(?:\s(?P<before>\d+)(?P<bu>[KMG])->(?P<after>\d+)(?P<au>[KMG])\((?P<cap>\d+)(?P<cu>[KMG])\))?\s+(?P<ms>[\d.]+)ms$')
+PRESSURE = re.compile(r'To-space exhausted|Evacuation Failure|Allocation Stall|OutOfMemory', re.IGNORECASE)
+
+UNIT_MB = {'K': 1 / 1024, 'M': 1, 'G': 1024}
+
+
+class GcLogParser:
+    """Incremental parser for one GC log; keeps a sliding window of pause events"""
+
+    def __init__(self, window_seconds=1800, max_events=5000):
+        self.window_seconds = window_seconds
+        self.pauses = deque(maxlen=max_events)      # (time, kind, before_mb, after_mb, capacity_mb, pause_ms)
+        self.pressure = deque(maxlen=100)           # (time, message)
+        self.lines = 0
+
+    def feed(self, text):
+        """Consume appended GC log text (complete lines)"""
+        for line in text.splitlines():
+            self.feed_line(line)
+
+    def feed_line(self, line):
+        match = GC_LINE.match(line)
+        if not match:
+            return
+        self.lines += 1
+        message = match.group('msg').strip()
+
+        if message.startswith('Pause '):
+            pause = PAUSE.match(message)
+            if pause:
+                timestamp = self._timestamp(match.group('ts'))
+                before = after = capacity = None
+                if pause.group('before'):
+                    before = int(pause.group('before')) * UNIT_MB[pause.group('bu')]
+                    after = int(pause.group('after')) * UNIT_MB[pause.group('au')]
+                    capacity = int(pause.group('cap')) * UNIT_MB[pause.group('cu')]
+                self.pauses.append((timestamp, pause.group('kind'), before, after, capacity, float(pause.group('ms'))))
+                return
+
+        if PRESSURE.search(message):
+            self.pressure.append((self._timestamp(match.group('ts')), message[:200]))
+
+    def _timestamp(self, text):
+        # Naive local time, consistent with the log4j timestamps
+        return datetime.strptime(text, '%Y-%m-%dT%H:%M:%S.%f').timestamp()
+
+    def summary(self):
+        """Metrics over the window ending at the newest event; None without pauses"""
+        if not self.pauses:
+            return None
+
+        newest = self.pauses[-1][0]
+        start = newest - self.window_seconds
+        pauses = [p for p in self.pauses if p[0] >= start]
+        durations = np.array([p[5] for p in pauses])
+        span = max(newest - pauses[0][0], 1.0)
+
+        sized = [p for p in pauses if p[3] is not None]
+        result = {
+            'window_minutes': round(span / 60, 1),
+            'pauses': len(pauses),
+            'full_gcs': sum(1 for p in pauses if p[1] == 'Full'),
+            'pause_p50_ms': round(float(np.percentile(durations, 50)), 1),
+            'pause_p95_ms': round(float(np.percentile(durations, 95)), 1),
+            'pause_p99_ms': round(float(np.percentile(durations, 99)), 1),
+            'pause_max_ms': round(float(durations.max()), 1),
+            'gc_overhead_pct': round(float(durations.sum()) / 1000 / span * 100, 2) if len(pauses) > 1 else 0.0,
+            'pressure_events': [message for t, message in self.pressure if t >= start][-5:],
+            'last_event': datetime.fromtimestamp(newest).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+        if sized:
+            occupancy = np.array([p[3] / p[4] * 100 for p in sized])
+            result['heap_capacity_mb'] = round(sized[-1][4], 1)
+            result['heap_after_gc_pct'] = round(float(occupancy[-1]), 1)
+            result['heap_after_gc_avg_pct'] = round(float(occupancy[-5:].mean()), 1)
+
+            # Allocation between collections: heap before this GC minus heap after the previous one
+            allocated = sum(max(cur[2] - prev[3], 0) for prev, cur in zip(sized, sized[1:]))
+            elapsed = sized[-1][0] - sized[0][0]
+            result['allocation_rate_mb_s'] = round(allocated / elapsed, 2) if elapsed > 0 else None
+
+            # Post-GC occupancy trend (percentage points per minute) and projected time to a full heap
+            slope = None
+            if len(sized) >= 3 and elapsed > 0:
+                minutes = (np.array([p[0] for p in sized]) - sized[0][0]) / 60
+                slope = float(np.polyfit(minutes, occupancy, 1)[0])
+            result['heap_trend_pct_per_min'] = round(slope, 3) if slope is not None else None
+            result['minutes_to_full'] = round(max(100 - float(occupancy[-1]), 0) / slope, 1) if slope and slope > 0 else None
+        return result
+
+
+class GcMonitor:
+    """GC log parsers per service with heap-pressure warnings"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        gc_config = config.get('gc_monitoring', {})
+        self.enabled = gc_config.get('enabled', True)
+        self.window_seconds = gc_config.get('window_minutes', 30) * 60
+        self.occupancy_warn_pct = gc_config.get('heap_after_gc_warn_pct', 85)
+        self.exhaustion_warn_minutes = gc_config.get('exhaustion_warn_minutes', 60)
+        self.full_gc_warn_count = gc_config.get('full_gc_warn_count', 2)
+        self.overhead_warn_pct = gc_config.get('gc_overhead_warn_pct', 10)
+        self.pause_p99_warn_ms = gc_config.get('pause_p99_warn_ms', 1000)
+        self.cooldown = gc_config.get('alert_cooldown_minutes', 30) * 60
+
+        self.parsers = {}
+        self.last_alert = {}
+        self.lock = threading.Lock()
+
+    def observe(self, service_key, text, now=None):
+        """Feed appended GC log text; returns new heap-pressure warning events"""
+        if not self.enabled or not text:
+            return []
+
+        with self.lock:
+            parser = self.parsers.setdefault(service_key, GcLogParser(self.window_seconds))
+            parser.feed(text)
+            summary = parser.summary()
+        if summary is None:
+            return []
+
+        now = now or time.time()
+        events = []
+        for series, message in self.warnings(summary):
+            alert_key = (service_key, series)
+            if now - self.last_alert.get(alert_key, 0) < self.cooldown:
+                continue
+            self.last_alert[alert_key] = now
+            events.append({'service': service_key, 'kind': 'gc', 'series': series, 'time': summary['last_event'], 'message': message})
+
+        if events:
+            self.logger.warning(f"Heap pressure on {service_key}: " + '; '.join(e['message'] for e in events))
+        return events
+
+    def warnings(self, summary):
+        """[(series, message)] for every heap-pressure condition in a summary"""
+        found = []
+        occupancy = summary.get('heap_after_gc_avg_pct')
+        if occupancy is not None and occupancy >= self.occupancy_warn_pct:
+            found.append(('heap-occupancy', f"post-GC heap {occupancy}% of {summary['heap_capacity_mb']:.0f}MB (avg of last 5)"))
+        minutes_to_full = summary.get('minutes_to_full')
+        if minutes_to_full is not None and minutes_to_full <= self.exhaustion_warn_minutes and summary['heap_after_gc_pct'] >= 50:
+            found.append(('heap-trend', f"post-GC heap growing {summary['heap_trend_pct_per_min']}%/min, full in ~{minutes_to_full} min"))
+        if summary['full_gcs'] >= self.full_gc_warn_count:
+            found.append(('full-gc', f"{summary['full_gcs']} full GCs in {summary['window_minutes']} min"))
+        if summary['gc_overhead_pct'] >= self.overhead_warn_pct:
+            found.append(('gc-overhead', f"{summary['gc_overhead_pct']}% of wall time in GC pauses"))
+        if summary['pause_p99_ms'] >= self.pause_p99_warn_ms:
+            found.append(('pause-time', f"p99 GC pause {summary['pause_p99_ms']}ms (max {summary['pause_max_ms']}ms)"))
+        if summary['pressure_events']:
+            found.append(('evacuation-failure', summary['pressure_events'][-1]))
+        return found
+
+    def summary(self, service_key):
+        with self.lock:
+            parser = self.parsers.get(service_key)
+            return parser.summary() if parser else None
+
+    def format_summary(self, service_key):
+        """GC metrics block for prompts and warnings"""
+        summary = self.summary(service_key)
+        if summary is None:
+            return ''
+
+        lines = [
+            f"Last {summary['window_minutes']} min: {summary['pauses']} pauses ({summary['full_gcs']} full), "
+            f"p50/p95/p99/max {summary['pause_p50_ms']}/{summary['pause_p95_ms']}/{summary['pause_p99_ms']}/{summary['pause_max_ms']} ms, "
+            f"GC overhead {summary['gc_overhead_pct']}%"
+        ]
+        if summary.get('heap_after_gc_pct') is not None:
+            trend = summary['heap_trend_pct_per_min']
+            lines.append(
+                f"Heap after GC {summary['heap_after_gc_pct']}% of {summary['heap_capacity_mb']:.0f}MB "
+                f"(avg {summary['heap_after_gc_avg_pct']}%), trend {trend if trend is not None else '?'}%/min"
+                + (f", full in ~{summary['minutes_to_full']} min" if summary['minutes_to_full'] is not None else '')
+            )
+            if summary['allocation_rate_mb_s'] is not None:
+                lines.append(f"Allocation rate {summary['allocation_rate_mb_s']} MB/s")
+        for message in summary['pressure_events']:
+            lines.append(f"Pressure: {message}")
+        return '\n'.join(lines)
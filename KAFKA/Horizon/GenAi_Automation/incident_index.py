@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+incident_index.py
+On-disk vector index of past incidents for retrieval-augmented analysis
+Embeddings come from the Ollama embeddings API, with a hashing-vectorizer fallback
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+import numpy as np
+import requests
+
+TOKEN_PATTERN = re.compile(r'[a-z_][a-z0-9_]+')
+
+
+class HashingEmbedder:
+    """Signed feature hashing of unigrams and bigrams; deterministic across processes"""
+
+    name = 'hashing'
+
+    def __init__(self, dimensions=1024):
+        self.dimensions = dimensions
+
+    def embed(self, text):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in features:
+            h = zlib.crc32(feature.encode('utf-8'))
+            vector[h % self.dimensions] += 1.0 if (h >> 31) & 1 else -1.0
+        return normalize(vector)
+
+
+class OllamaEmbedder:
+    """Embeddings from the Ollama /api/embeddings endpoint"""
+
+    name = 'ollama'
+
+    def __init__(self, base_url, model, timeout=10, session=None):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def embed(self, text):
+        response = self.session.post(
+            f"{self.base_url}/api/embeddings",
+            json={'model': self.model, 'prompt': text},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        embedding = response.json().get('embedding')
+        if not embedding:
+            raise ValueError("Empty embedding returned")
+        return normalize(np.asarray(embedding, dtype=np.float32))
+
+
+def normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class IncidentIndex:
+    """Past incidents (templates, analysis, restart outcome) with per-embedder vector matrices
+
+    Matrices grow by doubling and each new incident is appended to a journal; the full
+    snapshot (incidents.json + vectors_<embedder>.npy) is only rewritten every compact_after entries.
+    """
+
+    def __init__(self, config, session=None, available=None):
+        self.logger = logging.getLogger(__name__)
+
+        index_config = config.get('incident_index', {})
+        self.enabled = index_config.get('enabled', True)
+        self.directory = Path(index_config.get('directory', '/opt/kafka-monitor/state/incidents'))
+        self.top_k = index_config.get('top_k', 3)
+        self.min_similarity = index_config.get('min_similarity', 0.6)
+        self.answer_threshold = index_config.get('answer_from_history_threshold', 0.97)
+        self.max_incidents = index_config.get('max_incidents', 5000)
+        self.compact_after = index_config.get('compact_after', 200)
+
+        self.hashing = HashingEmbedder(index_config.get('hashing_dimensions', 1024))
+        self.ollama = None
+        if index_config.get('use_ollama_embeddings', True):
+            self.ollama = OllamaEmbedder(
+                index_config.get('embeddings_url', config['ai']['ollama_url']),
+                index_config.get('embedding_model', 'nomic-embed-text'),
+                timeout=index_config.get('embedding_timeout_seconds', 10),
+                session=session
+            )
+        # Callable telling whether Ollama may be called now (the analyzer's circuit breaker)
+        self.available = available
+
+        self.incidents = []
+        # Embedder name -> float32 buffer; rows [:len(self.incidents)] are aligned with self.incidents (zero rows = missing)
+        self.buffers = {}
+        self.journal_entries = 0
+        self.lock = threading.Lock()
+
+        if self.enabled:
+            self.load()
+
+    def incident_text(self, service_name, log_templates):
+        """Text that is embedded for an incident: service plus its masked templates"""
+        return '\n'.join([f"service {service_name}"] + [item['template'] for item in log_templates])
+
+    def embed(self, text):
+        """Return {embedder name: vector}; the hashing vector is always present"""
+        vectors = {self.hashing.name: self.hashing.embed(text)}
+        if self.ollama is not None and (self.available is None or self.available()):
+            try:
+                vectors[self.ollama.name] = self.ollama.embed(text)
+            except Exception as e:
+                self.logger.debug(f"Ollama embeddings unavailable, using hashing vectorizer: {e}")
+        return vectors
+
+    def embed_incident(self, service_name, log_templates):
+        """Vectors for an incident, computed once and passed to search() and record()"""
+        if not self.enabled:
+            return None
+        return self.embed(self.incident_text(service_name, log_templates))
+
+    def search(self, service_name, log_templates, k=None, vectors=None):
+        """Top-k similar past incidents for the same service as [(similarity, incident)]"""
+        if not self.enabled or not self.incidents:
+            return []
+
+        k = k or self.top_k
+        query = vectors or self.embed_incident(service_name, log_templates)
+
+        with self.lock:
+            similarities = self._matrix(self.hashing.name) @ query[self.hashing.name]
+            # Prefer the semantic space per incident; rows recorded during an embeddings outage are zero
+            # there and keep their hashing similarity, so the outage does not hide them
+            semantic = self._matrix(self.ollama.name) if self.ollama and self.ollama.name in query else None
+            if semantic is not None and semantic.shape[1] == query[self.ollama.name].shape[0]:
+                embedded = np.any(semantic, axis=1)
+                if embedded.any():
+                    similarities = np.where(embedded, semantic @ query[self.ollama.name], similarities)
+            services = np.array([incident['service'] == service_name for incident in self.incidents])
+            similarities = np.where(services, similarities, -1.0)
+
+            count = min(k, len(similarities))
+            top = np.argpartition(-similarities, count - 1)[:count]
+            top = top[np.argsort(-similarities[top])]
+
+            return [
+                (float(similarities[i]), dict(self.incidents[i]))
+                for i in top if similarities[i] >= self.min_similarity
+            ]
+
+    def record(self, service_name, server_host, log_templates, analysis, from_ai=True, restart_success=None, vectors=None):
+        """Add an incident and journal it; returns the incident id"""
+        if not self.enabled:
+            return None
+
+        vectors = vectors or self.embed_incident(service_name, log_templates)
+        incident = {
+            'id': uuid.uuid4().hex,
+            'timestamp': time.time(),
+            'service': service_name,
+            'host': server_host,
+            'templates': [item['template'] for item in log_templates],
+            'analysis': analysis,
+            'from_ai': from_ai,
+            'restart_success': restart_success,
+        }
+
+        entry = {
+            'op': 'add', 'incident': incident,
+            'vectors': {name: base64.b64encode(vector.astype(np.float32).tobytes()).decode('ascii') for name, vector in vectors.items()},
+        }
+        with self.lock:
+            self._add(incident, vectors)
+            compact = self._append(entry)
+        if compact:
+            self.save()
+        return incident['id']
+
+    def update_outcome(self, incident_id, restart_success):
+        """Record whether a restart fixed the incident"""
+        with self.lock:
+            for incident in reversed(self.incidents):
+                if incident['id'] == incident_id:
+                    incident['restart_success'] = restart_success
+                    break
+            else:
+                return
+            compact = self._append({'op': 'outcome', 'id': incident_id, 'restart_success': restart_success})
+        if compact:
+            self.save()
+
+    def format_context(self, results):
+        """Compact similar-incident summary for AI prompts"""
+        lines = []
+        for similarity, incident in results:
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(incident['timestamp']))
+            outcome = {True: 'restart fixed it', False: 'restart did NOT fix it'}.get(incident['restart_success'], 'outcome unknown')
+            summary = self._summary(incident['analysis'])
+            lines.append(f"- {when} on {incident['host']} (similarity {similarity:.2f}, {outcome}): {summary}")
+        return '\n'.join(lines)
+
+    def load(self):
+        """Load the snapshot, then replay the journal written since"""
+        metadata_file = self.directory / 'incidents.json'
+        try:
+            incidents, buffers = [], {}
+            if metadata_file.exists():
+                with open(metadata_file, 'r') as f:
+                    metadata = json.load(f)
+                incidents = metadata.get('incidents', [])
+                for name in metadata.get('embedders', []):
+                    matrix = np.load(self.directory / f"vectors_{name}.npy")
+                    if matrix.shape[0] == len(incidents):
+                        buffers[name] = matrix.astype(np.float32)
+
+            if self.hashing.name not in buffers and incidents:
+                buffers[self.hashing.name] = np.vstack([
+                    self.hashing.embed(self.incident_text(i['service'], [{'template': t} for t in i['templates']]))
+                    for i in incidents
+                ])
+
+            with self.lock:
+                self.incidents, self.buffers = incidents, buffers
+                self.journal_entries = self._replay()
+            if self.incidents:
+                self.logger.info(f"Loaded {len(self.incidents)} past incidents from {self.directory}")
+        except Exception as e:
+            self.logger.error(f"Error loading incident index from {self.directory}: {e}")
+            self.incidents, self.buffers = [], {}
+
+    def save(self):
+        """Write the full snapshot (write-then-rename) and start a new journal"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self.lock:
+                incidents = list(self.incidents)
+                vectors = {name: self._matrix(name).copy() for name in self.buffers}
+                self.journal_entries = 0
+
+                for name, matrix in vectors.items():
+                    tmp_path = self.directory / f"vectors_{name}.tmp.npy"
+                    np.save(tmp_path, matrix)
+                    os.replace(tmp_path, self.directory / f"vectors_{name}.npy")
+
+                tmp_path = self.directory / 'incidents.json.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump({'embedders': list(vectors), 'incidents': incidents}, f)
+                os.replace(tmp_path, self.directory / 'incidents.json')
+                # Everything journalled so far is in the snapshot
+                (self.directory / 'journal.jsonl').unlink(missing_ok=True)
+        except Exception as e:
+            self.logger.error(f"Error saving incident index to {self.directory}: {e}")
+
+    def _add(self, incident, vectors):
+        """Append one row per embedder (buffers double when full; missing embedders get a zero row)"""
+        row = len(self.incidents)
+        self.incidents.append(incident)
+        for name, vector in vectors.items():
+            buffer = self.buffers.get(name)
+            if buffer is None or buffer.shape[1] != vector.shape[0]:
+                buffer = self.buffers[name] = np.zeros((max(row + 1, 64), vector.shape[0]), dtype=np.float32)
+        for name, buffer in self.buffers.items():
+            if row >= buffer.shape[0]:
+                buffer = self.buffers[name] = np.concatenate([buffer, np.zeros_like(buffer)])
+            buffer[row] = vectors[name] if name in vectors else 0.0
+
+        if len(self.incidents) > self.max_incidents:
+            # Drop the oldest tenth at once so trimming is not a full copy per incident
+            drop = len(self.incidents) - self.max_incidents + self.max_incidents // 10
+            self.incidents = self.incidents[drop:]
+            self.buffers = {name: buffer[drop:].copy() for name, buffer in self.buffers.items()}
+
+    def _append(self, entry):
+        """Append one journal entry (lock held, in the same section as the in-memory change); True when a snapshot is due"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / 'journal.jsonl', 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except Exception as e:
+            self.logger.error(f"Error journalling incident to {self.directory}: {e}")
+            return False
+        self.journal_entries += 1
+        return self.journal_entries >= self.compact_after
+
+    def _replay(self):
+        """Apply journal entries written after the snapshot; returns how many there were"""
+        journal_file = self.directory / 'journal.jsonl'
+        if not journal_file.exists():
+            return 0
+        with open(journal_file, 'rb') as f:
+            data = f.read()
+        if data and not data.endswith(b'\n'):
+            # Torn final line from a crash mid-append; cut it so the next append starts a clean line
+            data = data[:data.rfind(b'\n') + 1]
+            with open(journal_file, 'r+b') as f:
+                f.truncate(len(data))
+
+        count = 0
+        for line in data.decode('utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            count += 1
+            if entry['op'] == 'add':
+                vectors = {name: np.frombuffer(base64.b64decode(encoded), dtype=np.float32) for name, encoded in entry['vectors'].items()}
+                self._add(entry['incident'], vectors)
+            elif entry['op'] == 'outcome':
+                for incident in reversed(self.incidents):
+                    if incident['id'] == entry['id']:
+                        incident['restart_success'] = entry['restart_success']
+                        break
+        return count
+
+    def _matrix(self, name):
+        buffer = self.buffers.get(name)
+        return None if buffer is None else buffer[:len(self.incidents)]
+
+    def _summary(self, analysis):
+        """First line of the PROBLEM SUMMARY section, or the first non-empty line"""
+        lines = [line.strip() for line in analysis.splitlines() if line.strip()]
+        for index, line in enumerate(lines):
+            if line.upper().startswith('PROBLEM SUMMARY') and index + 1 < len(lines):
+                return lines[index + 1][:200]
+        return lines[0][:200] if lines else ''
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+llm_backend.py
+Text-generation backend interface for LogAnalyzer
+Ollama over HTTP (ollama_client.py) or llama-cpp-python in process, selected by ai.backend
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a stream when the caller cancelled the generation"""
+
+
+class ModelBusy(Exception):
+    """Raised when another generation held the in-process model for the whole deadline"""
+
+
+class GenerationResult:
+    """Outcome of a streamed generation, including partial output"""
+
+    def __init__(self):
+        self.text = ''
+        self.stop_reason = None      # complete, early_stop, deadline, first_token_timeout, cancelled, busy, error
+        self.error = None
+        self.time_to_first_token = None
+        self.duration = 0.0
+        self.chunks = 0
+        self.eval_count = None
+        self.prompt_eval_count = None
+        self.prompt_eval_duration = None
+        self.context = None
+
+    @property
+    def ok(self):
+        """True when the text is usable (full, early-stopped, or a non-empty partial)"""
+        if self.stop_reason in ('complete', 'early_stop'):
+            return True
+        return self.stop_reason == 'deadline' and bool(self.text.strip())
+
+    @property
+    def truncated(self):
+        return self.stop_reason == 'deadline'
+
+
+class CancelToken:
+    """Cancellation handle shared between the caller and a running stream"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+
+    def cancel(self):
+        self.event.set()
+        response = self.response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+
+class PromptPrefix:
+    """An evaluated prompt prefix: Ollama context tokens or a llama.cpp KV-cache state"""
+
+    def __init__(self, text, handle, tokens, eval_seconds, model_id):
+        self.text = text
+        self.handle = handle
+        self.tokens = tokens
+        self.eval_seconds = eval_seconds
+        self.model_id = model_id
+        self.created = time.time()
+
+
+class LLMBackend:
+    """Interface shared by the analysis backends
+
+    generate() streams one completion into a GenerationResult, honouring the deadlines,
+    cancellation and early stop; options use Ollama names (temperature, top_p, num_predict) and
+    format is a JSON schema or 'json'. probe() is the circuit breaker's cheap health check.
+    prime() evaluates a fixed prompt prefix once; generate(prompt, prefix=...) then sends only
+    the suffix (prompt) on top of it.
+    """
+
+    name = None
+
+    def generate(self, prompt, options=None, required_sections=None, cancel_token=None,
+                 first_token_timeout=None, total_timeout=None, prefix=None, **extra):
+        raise NotImplementedError
+
+    def probe(self):
+        raise NotImplementedError
+
+    def prime(self, text):
+        """PromptPrefix for text, or None when the backend cannot reuse an evaluated prefix"""
+        return None
+
+    def model_id(self):
+        """Identity of the loaded weights; an evaluated prefix is only valid for the same id"""
+        return self.model
+
+    def close(self):
+        """Release held resources (the Ollama client's HTTP session)"""
+
+    def _sections_complete(self, text, required_sections):
+        """All headers present and the last one followed by a finished paragraph"""
+        upper = text.upper()
+        positions = [upper.find(section.upper()) for section in required_sections]
+        if min(positions) < 0:
+            return False
+
+        last = max(positions)
+        tail = text[last:].split('\n', 1)
+        return len(tail) > 1 and '\n\n' in tail[1].lstrip('\n')
+
+
+# One llama.cpp model per (path, parameters) in the process: {key: (Llama, generation lock)}
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def shared_model(model_path, **params):
+    """Load a GGUF model on first use (mmap'd) and hand out the same instance afterwards"""
+    key = (model_path, tuple(sorted(params.items())))
+    with _MODELS_LOCK:
+        entry = _MODELS.get(key)
+        if entry is None:
+            from llama_cpp import Llama
+
+            started = time.monotonic()
+            entry = (Llama(model_path=model_path, verbose=False, **params), threading.Lock())
+            _MODELS[key] = entry
+            logging.getLogger(__name__).info(f"Loaded {model_path} in {time.monotonic() - started:.1f}s ({params})")
+    return entry
+
+
+class LlamaCppBackend(LLMBackend):
+    """In-process llama-cpp-python backend; the model is loaded lazily and shared"""
+
+    name = 'llama_cpp'
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        ai_config = config['ai']
+        llama_config = config.get('llama_cpp', {})
+        self.model_path = llama_config.get('model_path', '/opt/kafka-monitor/models/model.gguf')
+        self.model = os.path.basename(self.model_path)
+        self.total_timeout = ai_config.get('analysis_timeout_seconds', 120)
+        self.first_token_timeout = ai_config.get('first_token_timeout_seconds', 30)
+        self.params = {
+            'n_ctx': llama_config.get('n_ctx', config.get('prompt', {}).get('context_window_tokens', 8192)),
+            'n_threads': llama_config.get('n_threads') or max(1, (os.cpu_count() or 2) // 2),
+            'n_batch': llama_config.get('n_batch', 512),
+            'n_gpu_layers': llama_config.get('n_gpu_layers', 0),
+            'use_mmap': llama_config.get('use_mmap', True),
+            'use_mlock': llama_config.get('use_mlock', False),
+        }
+        self.grammars = {}
+
+    def ensure_ready(self):
+        """Check the dependency and model file without loading the model"""
+        if importlib.util.find_spec('llama_cpp') is None:
+            self.logger.error("llama-cpp-python is not installed (pip3 install llama-cpp-python)")
+        elif not os.path.isfile(self.model_path):
+            self.logger.error(f"llama.cpp model not found: {self.model_path}")
+        else:
+            self.logger.info(f"llama.cpp backend ready: {self.model_path} (loaded on first use, {self.params['n_threads']} threads)")
+
+    def probe(self):
+        if not os.path.isfile(self.model_path):
+            raise FileNotFoundError(self.model_path)
+        return True
+
+    def model_id(self):
+        stat = os.stat(self.model_path)
+        return f"{self.model_path}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def prime(self, text):
+        """Evaluate text into the KV cache and save the state for later generations"""
+        model, lock = shared_model(self.model_path, **self.params)
+        with lock:
+            tokens = model.tokenize(text.encode('utf-8'))
+            started = time.monotonic()
+            model.reset()
+            model.eval(tokens)
+            eval_seconds = time.monotonic() - started
+            state = model.save_state()
+        return PromptPrefix(text, state, len(tokens), eval_seconds, self.model_id())
+
+    def grammar(self, format):
+        """Compiled grammar for a JSON schema (dict) or plain JSON ('json'), cached"""
+        key = json.dumps(format, sort_keys=True)
+        grammar = self.grammars.get(key)
+        if grammar is None:
+            from llama_cpp import LlamaGrammar
+            from llama_cpp.llama_grammar import JSON_GBNF
+
+            grammar = LlamaGrammar.from_json_schema(json.dumps(format), verbose=False) if isinstance(format, dict) else LlamaGrammar.from_string(JSON_GBNF, verbose=False)
+            self.grammars[key] = grammar
+        return grammar
+
+    def generate(self, prompt, options=None, required_sections=None, cancel_token=None,
+                 first_token_timeout=None, total_timeout=None, prefix=None, format=None, **extra):
+        """Stream a completion from the shared in-process model"""
+        result = GenerationResult()
+        options = options or {}
+        first_token_timeout = first_token_timeout or self.first_token_timeout
+        total_timeout = total_timeout or self.total_timeout
+        cancel_token = cancel_token or CancelToken()
+
+        start = time.monotonic()
+        deadline = start + total_timeout
+        parts = []
+
+        try:
+            model, lock = shared_model(self.model_path, **self.params)
+            kwargs = {
+                'max_tokens': options.get('num_predict', 256),
+                'temperature': options.get('temperature', 0.2),
+                'top_p': options.get('top_p', 0.9),
+                'stream': True,
+            }
+            if format:
+                kwargs['grammar'] = self.grammar(format)
+
+            # One evaluation at a time per model; time spent waiting counts against the deadline
+            if not lock.acquire(timeout=total_timeout):
+                raise ModelBusy(f"model busy for {total_timeout}s")
+            try:
+                if prefix is not None:
+                    # Restored KV state matches the prefix tokens, so only the suffix is evaluated
+                    model.load_state(prefix.handle)
+                    prompt = prefix.text + prompt
+
+                # Prompt evaluation cannot be interrupted; the first-token deadline is checked when it ends
+                for chunk in model.create_completion(prompt, **kwargs):
+                    if cancel_token.cancelled:
+                        raise GenerationCancelled()
+
+                    choice = chunk['choices'][0]
+                    token = choice.get('text', '')
+                    if token:
+                        if result.time_to_first_token is None:
+                            result.time_to_first_token = time.monotonic() - start
+                            if result.time_to_first_token > first_token_timeout:
+                                result.stop_reason = 'first_token_timeout'
+                                break
+                        parts.append(token)
+                        result.chunks += 1
+
+                    if choice.get('finish_reason'):
+                        result.stop_reason = 'complete'
+                        break
+
+                    if required_sections and token and self._sections_complete(''.join(parts), required_sections):
+                        result.stop_reason = 'early_stop'
+                        break
+
+                    if time.monotonic() > deadline:
+                        result.stop_reason = 'deadline'
+                        break
+                else:
+                    result.stop_reason = 'complete'
+            finally:
+                lock.release()
+
+        except GenerationCancelled:
+            result.stop_reason = 'cancelled'
+        except ModelBusy as e:
+            # Queued behind another generation: says nothing about the backend's health
+            result.stop_reason = 'busy'
+            result.error = e
+        except Exception as e:
+            result.stop_reason = 'error'
+            result.error = e
+
+        result.text = ''.join(parts)
+        result.duration = time.monotonic() - start
+        result.eval_count = result.chunks
+        if result.time_to_first_token is not None:
+            # Time to first token is dominated by prompt evaluation
+            result.prompt_eval_duration = int(result.time_to_first_token * 1e9)
+        self.logger.debug(
+            f"llama.cpp generation {result.stop_reason}: {result.chunks} tokens, "
+            f"ttft={result.time_to_first_token}, duration={result.duration:.2f}s"
+        )
+        return result
+
+
+def create_backend(config):
+    """Backend selected by ai.backend ('ollama' or 'llama_cpp')"""
+    backend = config['ai'].get('backend', 'ollama')
+    if backend == 'llama_cpp':
+        return LlamaCppBackend(config)
+    if backend != 'ollama':
+        raise ValueError(f"Unknown ai.backend '{backend}'")
+
+    from ollama_client import OllamaClient
+    return OllamaClient(config)
@@ -13,6 +13,78 @@ import subprocess
 import time
 from datetime import datetime
 
+from analysis_cache import AnalysisCache, fingerprint
+from analysis_schema import ANALYSIS_SCHEMA, JSON_INSTRUCTIONS, extract_fields, parse_analysis, render_analysis
+from anomaly_detector import RateAnomalyDetector
+from circuit_breaker import CircuitBreaker, HealthPoller
+from exception_folder import ExceptionFolder, format_exceptions, strip_stack_frames
+from gc_log import GcMonitor
+from incident_index import IncidentIndex
+from log_columns import FailureWindow
+from log_sources import LogSourceAnalyzer, format_evidence
+from llm_backend import GenerationCancelled, create_backend
+from log_templates import LogTemplateMiner
+from prompt_builder import PromptBuilder
+from prompt_prefix import PromptPrefixCache
+from rule_engine import RuleEngine
+
+RULE_BASED_HEADER = "AI ANALYSIS UNAVAILABLE - USING RULE-BASED FALLBACK"
+
+# Section headers requested from the model; generation stops once all are complete
+ANALYSIS_SECTIONS = [
+    "PROBLEM SUMMARY:",
+    "ROOT CAUSE:",
+    "SEVERITY LEVEL:",
+    "RECOMMENDED ACTION:",
+    "IMMEDIATE ACTIONS:",
+    "SOLUTION STEPS:",
+    "PREVENTION MEASURES:",
+    "RELATED COMPONENTS:",
+]
+
+# Fixed head of every analysis prompt: evaluated once per model and reused (prompt_prefix.py)
+ANALYSIS_PREAMBLE = """You are an expert system administrator specializing in Apache Kafka and Zookeeper.
+Each request is a failure report for one service: rule engine triage, similar past incidents, early warnings,
+JVM GC metrics, related log files, folded Java exceptions, log message templates and ranked log events.
+
+"""
+
+TEXT_INSTRUCTIONS = """Analyze the failure and provide:
+
+PROBLEM SUMMARY:
+[Brief description of the main issue in 2-3 sentences]
+
+ROOT CAUSE:
+[Detailed technical explanation of what went wrong]
+
+SEVERITY LEVEL:
+[Critical/High/Medium/Low] - [Reason for this severity level]
+
+RECOMMENDED ACTION:
+[escalate/restart/investigate/no-action]
+
+IMMEDIATE ACTIONS:
+1. [Most urgent action to take right now]
+2. [Second priority action]
+3. [Third priority action]
+
+SOLUTION STEPS:
+1. [Step-by-step solution to fix the issue]
+2. [Continue with detailed steps]
+3. [Include any configuration changes needed]
+
+PREVENTION MEASURES:
+- [How to prevent this issue in the future]
+- [Monitoring improvements needed]
+- [Configuration recommendations]
+
+RELATED COMPONENTS:
+[What other services/components might be affected]
+"""
+
+STRUCTURED_PREFIX = ANALYSIS_PREAMBLE + JSON_INSTRUCTIONS + "\n"
+TEXT_PREFIX = ANALYSIS_PREAMBLE + TEXT_INSTRUCTIONS + "\n"
+
 class LogAnalyzer:
     def __init__(self, config):
         self.config = config
@@ -21,9 +93,67 @@ class LogAnalyzer:
         # Ollama configuration
         self.ollama_url = config['ai']['ollama_url']
         self.model = config['ai']['model']
+        self.num_predict = config['ai'].get('num_predict', 1000)
+        self.retry_delay = config['ai'].get('retry_delay_seconds', 5)
+        # Sent as num_ctx so Ollama's context matches what the prompt builder budgets for
+        self.context_window = config.get('prompt', {}).get('context_window_tokens', 8192)
+        
+        # Compact JSON analysis through Ollama's `format` option, free text as fallback
+        self.structured_output = config['ai'].get('structured_output', True)
+        self.structured_num_predict = config['ai'].get('structured_num_predict', 400)
+        self.structured_format = ANALYSIS_SCHEMA if config['ai'].get('structured_format', 'schema') == 'schema' else 'json'
+        
+        # Generation backend (ai.backend): pooled Ollama HTTP client or in-process llama.cpp
+        self.client = create_backend(config)
+        
+        # Evaluated instruction prefixes, so each analysis only sends the incident-specific suffix
+        self.prompt_prefixes = PromptPrefixCache(config, self.client)
+        
+        # Token-budget-aware selection of log content for prompts
+        self.prompt_builder = PromptBuilder(config)
         
-        # Test Ollama connection
-        self.ensure_ollama_ready()
+        # Config-driven rule engine: triage tier and AI fallback
+        self.rule_engine = RuleEngine(config)
+        
+        # Past incidents for retrieval-augmented analysis
+        # Embedding calls go to Ollama only while the circuit breaker (created below) is closed
+        self.incident_index = IncidentIndex(
+            config, session=getattr(self.client, 'session', None), available=lambda: self.breaker.is_closed
+        )
+        self.last_incident_ids = {}
+        
+        # Online template miner, persisted across runs
+        self.template_miner = LogTemplateMiner(config)
+        self.failure_window = FailureWindow(config)
+        mining_config = config.get('log_mining', {})
+        self.max_prompt_templates = mining_config.get('max_templates_in_prompt', 15)
+        self.ignore_template_levels = set(mining_config.get('ignore_levels', ['DEBUG', 'TRACE', 'INFO']))
+        self.max_prompt_exceptions = config.get('exception_folding', {}).get('max_exceptions_in_prompt', 10)
+        
+        # Additional log files (controller.log, state-change.log, GC logs) analyzed in worker processes
+        self.source_analyzer = LogSourceAnalyzer(config)
+        
+        # Streaming per-template/per-level rate baselines for early warnings
+        self.anomaly_detector = RateAnomalyDetector(config)
+        self.early_warning_window = config.get('anomaly_detection', {}).get('context_minutes', 60) * 60
+        
+        # Incremental JDK unified GC log metrics and heap-pressure warnings
+        self.gc_monitor = GcMonitor(config)
+        
+        # Cache of AI results keyed by error fingerprint / status vector
+        self.analysis_cache = AnalysisCache(config)
+        self.recommendations_ttl = config.get('analysis_cache', {}).get('recommendations_ttl_hours', 24) * 3600
+        
+        # Test Ollama connection (the llama.cpp backend only checks its model file)
+        if self.client.name == 'ollama':
+            self.ensure_ollama_ready()
+        else:
+            self.client.ensure_ready()
+        
+        # Skip a known-bad backend and probe for recovery in the background
+        self.breaker = CircuitBreaker(config)
+        recover = self.start_ollama if self.client.name == 'ollama' else None
+        self.health_poller = HealthPoller(config, self.breaker, probe=self.probe_ollama, recover=recover).start()
         
     def ensure_ollama_ready(self):
         """Ensure Ollama is running and model is available"""
@@ -87,106 +217,345 @@ class LogAnalyzer:
         except Exception as e:
             self.logger.error(f"Error pulling model: {e}")
     
-    def call_ollama(self, prompt, max_retries=3):
-        """Call Ollama API with retry logic"""
+    def probe_ollama(self):
+        """Cheap health probe used by the background poller"""
+        self.client.probe()
+        return True
+    
+    def call_ollama(self, prompt, max_retries=3, required_sections=None, fallback=None, cancel_token=None, prefix=None):
+        """Call Ollama through the streaming client with retry logic; prefix is a fixed instruction head"""
         for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    f"{self.ollama_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.2,
-                            "top_p": 0.9,
-                            "num_predict": 1000
-                        }
-                    },
-                    timeout=120
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get('response', 'No response generated')
-                else:
-                    self.logger.error(f"Ollama API error: {response.status_code}")
-                    
-            except requests.exceptions.Timeout:
-                self.logger.warning(f"Ollama timeout (attempt {attempt + 1}/{max_retries})")
-            except requests.exceptions.ConnectionError:
+            if not self.breaker.allow_request():
+                self.logger.info(f"Ollama circuit {self.breaker.state}, skipping straight to rule-based analysis")
+                break
+            
+            cached_prefix = self.prompt_prefixes.get(prefix) if prefix else None
+            result = self.client.generate(
+                prompt if cached_prefix else (prefix or '') + prompt,
+                options={
+                    "temperature": 0.2,
+                    "top_p": 0.9,
+                    "num_predict": self.num_predict,
+                    "num_ctx": self.context_window
+                },
+                required_sections=required_sections,
+                cancel_token=cancel_token,
+                prefix=cached_prefix
+            )
+            if prefix:
+                self.prompt_prefixes.record(prefix, cached_prefix, result, self.prompt_builder.estimate_tokens(prompt))
+            
+            if result.ok:
+                self.breaker.record_success()
+                if result.truncated:
+                    self.logger.warning(f"Ollama deadline reached after {result.duration:.1f}s, using partial analysis")
+                    return f"{result.text}\n\n[ANALYSIS TRUNCATED - generation deadline reached]"
+                return result.text or 'No response generated'
+            
+            if result.stop_reason == 'cancelled':
+                self.breaker.release()
+                self.logger.info("Ollama generation cancelled")
+                break
+            if result.stop_reason == 'busy':
+                # Waited behind another analysis: not a backend failure, and a retry would wait again
+                self.breaker.release()
+                self.logger.warning(f"Model busy for {result.duration:.1f}s, using rule-based analysis")
+                break
+            
+            self.breaker.record_failure()
+            
+            if result.stop_reason in ('first_token_timeout', 'deadline'):
+                # A slow model will not get faster on retry - degrade to rules immediately
+                self.logger.warning(f"Ollama {result.stop_reason} after {result.duration:.1f}s (attempt {attempt + 1}/{max_retries})")
+                break
+            if isinstance(result.error, requests.exceptions.ConnectionError):
+                # Backend is down; the health poller restarts it and probes for recovery
                 self.logger.error("Ollama connection failed")
-                if attempt == 0:  # Try to restart on first failure
-                    self.start_ollama()
-            except Exception as e:
-                self.logger.error(f"Error calling Ollama: {e}")
+                break
             
+            self.logger.error(f"Error calling Ollama: {result.error}")
             if attempt < max_retries - 1:
-                time.sleep(5)
+                time.sleep(self.retry_delay)
         
         # Fallback to rule-based analysis
-        return self.rule_based_analysis(prompt)
+        if fallback is not None:
+            return fallback()
+        return self.rule_based_analysis((prefix or '') + prompt)
+    
+    def call_structured(self, prompt, cancel_token=None, prefix=None):
+        """JSON-constrained generation; returns (fields or None, whether a free-text retry is worthwhile)"""
+        if not self.breaker.allow_request():
+            self.logger.info(f"Ollama circuit {self.breaker.state}, skipping structured analysis")
+            return None, False
+        
+        cached_prefix = self.prompt_prefixes.get(prefix) if prefix else None
+        result = self.client.generate(
+            prompt if cached_prefix else (prefix or '') + prompt,
+            options={
+                "temperature": 0.1,
+                "top_p": 0.9,
+                "num_predict": self.structured_num_predict,
+                "num_ctx": self.context_window
+            },
+            format=self.structured_format,
+            cancel_token=cancel_token,
+            prefix=cached_prefix
+        )
+        if prefix:
+            self.prompt_prefixes.record(prefix, cached_prefix, result, self.prompt_builder.estimate_tokens(prompt))
+        
+        if result.stop_reason in ('cancelled', 'busy'):
+            # Neither says anything about the backend's health
+            self.breaker.release()
+            return None, False
+        if not result.ok:
+            # Backend trouble: a second, longer generation would only fail slower
+            self.breaker.record_failure()
+            self.logger.warning(f"Structured analysis {result.stop_reason} after {result.duration:.1f}s: {result.error}")
+            return None, False
+        
+        self.breaker.record_success()
+        try:
+            fields = parse_analysis(result.text)
+        except ValueError as e:
+            # A reply cut off by the deadline would be cut off again as free text
+            self.logger.warning(f"Structured analysis rejected ({e})")
+            return None, not result.truncated
+        
+        self.logger.info(f"Structured analysis in {result.duration:.1f}s ({result.eval_count} tokens)")
+        return fields, True
+    
+    def analysis_result(self, text, fields=None, source='ai', default_severity=None, default_action=None):
+        """Analysis text plus the fields used for routing, caching and email"""
+        result = extract_fields(text, default_severity, default_action)
+        if fields:
+            result.update(fields)
+        result.update({'text': text, 'source': source, 'structured': bool(fields)})
+        return result
+    
+    def summarize_log_templates(self, log_content):
+        """Collapse log content into weighted templates and persist the template tree"""
+        summary = self.template_miner.summarize(
+            strip_stack_frames(log_content),
+            limit=self.max_prompt_templates,
+            ignore_levels=self.ignore_template_levels
+        )
+        self.template_miner.save()
+        return summary
+    
+    def slice_failure_window(self, log_content, failure_time):
+        """Restrict log content to the window around failure_time; also returns a per-minute error profile"""
+        try:
+            return self.failure_window.slice(log_content, failure_time)
+        except Exception as e:
+            self.logger.error(f"Error slicing failure window: {e}")
+            return log_content, ''
+    
+    def observe_log_rates(self, server_host, service_name, log_content):
+        """Feed newly appended log lines into the rate detector; returns early-warning events"""
+        try:
+            return self.anomaly_detector.observe(
+                f"{server_host}:{service_name}", log_content, template_lookup=self.template_miner.template_id
+            )
+        except Exception as e:
+            self.logger.error(f"Error updating log rate baselines for {service_name} on {server_host}: {e}")
+            return []
+    
+    def early_warning_context(self, server_host, service_name, events=None):
+        """Rate anomalies seen on a service (recent ones unless events are given)"""
+        if events is None:
+            events = self.anomaly_detector.recent_events(f"{server_host}:{service_name}", self.early_warning_window)
+        return self.anomaly_detector.format_context(events, describe_template=self.describe_template)
+    
+    def observe_gc_log(self, server_host, service_name, gc_content):
+        """Feed newly appended GC log lines; returns heap-pressure warning events"""
+        try:
+            return self.gc_monitor.observe(f"{server_host}:{service_name}", gc_content)
+        except Exception as e:
+            self.logger.error(f"Error parsing GC log for {service_name} on {server_host}: {e}")
+            return []
     
-    def analyze_service_logs(self, service_name, log_content, server_host):
-        """Analyze service logs using AI"""
+    def gc_context(self, server_host, service_name, events=None):
+        """GC metrics summary for a service, preceded by any heap-pressure warnings given"""
+        lines = [f"{event['series']}: {event['message']}" for event in events or []]
+        summary = self.gc_monitor.format_summary(f"{server_host}:{service_name}")
+        return '\n'.join(lines + ([summary] if summary else []))
+    
+    def describe_template(self, template_id):
+        template = self.template_miner.templates.get(template_id)
+        return f"#{template_id} '{template.template[:120]}'" if template else f"#{template_id}"
+    
+    def analyze_log_sources(self, log_sources, failure_time=None):
+        """Time-ordered evidence merged from several log files of one service"""
+        return self.source_analyzer.analyze(log_sources, *self.failure_window.bounds(failure_time))
+    
+    def fold_exceptions(self, log_content):
+        """Fold multi-line Java exceptions into fingerprinted events"""
+        events = ExceptionFolder(self.config).fold(log_content)
+        return [event.to_dict() for event in events[:self.max_prompt_exceptions]]
+    
+    def analyze_service_logs(self, service_name, log_content, server_host, log_templates=None, exceptions=None, evidence=None, cancel_token=None):
+        """Analyze service logs using AI; raises GenerationCancelled if cancel_token fires first"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Extract key error patterns first
-        key_errors = self.extract_error_patterns(log_content)
+        # Collapse repeated messages into templates instead of pasting raw error lines
+        if log_templates is None:
+            log_templates = self.summarize_log_templates(log_content)
+        if exceptions is None:
+            exceptions = self.fold_exceptions(log_content)
         
-        prompt = f"""You are an expert system administrator specializing in Apache Kafka and Zookeeper.
-
-ANALYSIS REQUEST:
+        # Identical error signature already analysed? Skip the LLM entirely
+        severity = self.estimate_severity(service_name, log_templates)
+        cache_key = self.analysis_fingerprint(service_name, severity, log_templates, exceptions)
+        cached = self.analysis_cache.get(cache_key)
+        if cached:
+            cached_at = datetime.fromtimestamp(cached['stored_at']).strftime("%Y-%m-%d %H:%M:%S")
+            self.logger.info(f"Using cached analysis for {service_name} on {server_host} (fingerprint {cache_key[:12]})")
+            return self.analysis_result(
+                f"[Cached analysis from {cached_at} for identical error signature {cache_key[:12]}]\n\n{cached['value']}",
+                cached.get('fields'), source='cache', default_severity=cached.get('severity'), default_action=cached.get('action')
+            )
+        
+        # Fast rule triage on the extracted error lines (never on the prompt text)
+        triage = self.rule_engine.evaluate(service_name, self.extract_error_patterns(log_content))
+        
+        # Near-identical past incident analysed by the AI? Answer straight from history
+        incident_vectors = self.incident_index.embed_incident(service_name, log_templates)
+        similar_incidents = self.incident_index.search(service_name, log_templates, vectors=incident_vectors)
+        if similar_incidents:
+            similarity, incident = similar_incidents[0]
+            if similarity >= self.incident_index.answer_threshold and incident['from_ai']:
+                self.logger.info(f"Answering {service_name} on {server_host} from incident history (similarity {similarity:.3f})")
+                # Not recorded again: the restart outcome updates the matched incident
+                self.last_incident_ids[(server_host, service_name)] = incident['id']
+                when = datetime.fromtimestamp(incident['timestamp']).strftime("%Y-%m-%d %H:%M:%S")
+                return self.analysis_result(
+                    f"[Analysis from a matching incident on {incident['host']} at {when}, similarity {similarity:.2f}]\n\n{incident['analysis']}",
+                    source='incident', default_severity=severity, default_action=triage['action']
+                )
+        
+        prompt_template = f"""ANALYSIS REQUEST:
 - Service: {service_name}
 - Server: {server_host}
 - Timestamp: {timestamp}
 - Log lines analyzed: {len(log_content.splitlines())}
 
-KEY ERROR PATTERNS FOUND:
-{chr(10).join(key_errors[-20:])}
+RULE ENGINE TRIAGE:
+{self.rule_engine.format_triage(triage)}
 
-RECENT LOG CONTENT:
-{log_content[-2000:]}
+SIMILAR PAST INCIDENTS:
+{self.incident_index.format_context(similar_incidents) or 'None found'}
 
-Please analyze this {service_name} failure and provide:
+EARLY WARNINGS (log rate anomalies vs. EWMA baseline before the failure):
+{self.early_warning_context(server_host, service_name) or 'None raised'}
 
-PROBLEM SUMMARY:
-[Brief description of the main issue in 2-3 sentences]
+JVM GC METRICS (from the unified GC log; pauses, allocation rate, post-GC heap trend):
+{self.gc_context(server_host, service_name) or 'Not collected'}
 
-ROOT CAUSE:
-[Detailed technical explanation of what went wrong]
+RELATED LOG FILES (time-ordered evidence from controller, state-change, GC and other logs):
+{format_evidence(evidence or []) or 'None collected'}
 
-SEVERITY LEVEL:
-[Critical/High/Medium/Low] - [Reason for this severity level]
-
-IMMEDIATE ACTIONS:
-1. [Most urgent action to take right now]
-2. [Second priority action]
-3. [Third priority action]
+JAVA EXCEPTIONS (stack traces folded; count, cause chain, top application frames):
+{format_exceptions(exceptions) or 'None found'}
 
-SOLUTION STEPS:
-1. [Step-by-step solution to fix the issue]
-2. [Continue with detailed steps]
-3. [Include any configuration changes needed]
+LOG MESSAGE TEMPLATES (occurrences x [level] template, <*> = variable field):
+{self.template_miner.format_summary(log_templates)}
 
-PREVENTION MEASURES:
-- [How to prevent this issue in the future]
-- [Monitoring improvements needed]
-- [Configuration recommendations]
+RELEVANT LOG EVENTS (ranked by severity, recency and novelty; repeats counted, package names shortened):
+{{log_excerpt}}
 
-RELATED COMPONENTS:
-[What other services/components might be affected]
+Analyze this {service_name} failure in the format given above.
 """
-
-        analysis = self.call_ollama(prompt)
-        self.logger.info(f"Generated AI analysis for {service_name} on {server_host}")
+        
+        # Fill whatever the context window has left with the most informative log events
+        token_budget = self.prompt_builder.available_tokens(TEXT_PREFIX + prompt_template)
+        log_excerpt = self.prompt_builder.build_log_excerpt(log_content, token_budget)
+        prompt = prompt_template.replace('{log_excerpt}', log_excerpt)
+        
+        fields, try_text = None, True
+        if self.structured_output:
+            fields, try_text = self.call_structured(prompt, cancel_token=cancel_token, prefix=STRUCTURED_PREFIX)
+            if cancel_token is not None and cancel_token.cancelled:
+                raise GenerationCancelled()
+        
+        if fields:
+            analysis = self.analysis_result(render_analysis(fields), fields)
+        else:
+            if try_text:
+                text = self.call_ollama(
+                    prompt,
+                    required_sections=ANALYSIS_SECTIONS,
+                    fallback=lambda: self.rule_based_analysis(triage=triage),
+                    cancel_token=cancel_token,
+                    prefix=TEXT_PREFIX
+                )
+            else:
+                text = self.rule_based_analysis(triage=triage)
+            analysis = self.analysis_result(
+                text, source='ai' if not text.startswith(RULE_BASED_HEADER) else 'rules',
+                default_severity=triage['severity'], default_action=triage['action']
+            )
+        
+        # A cancelled speculative analysis is neither cached nor recorded
+        if cancel_token is not None and cancel_token.cancelled:
+            raise GenerationCancelled()
+        
+        from_ai = analysis['source'] == 'ai'
+        if from_ai:
+            self.analysis_cache.put(
+                cache_key, analysis['text'], kind='service', service=service_name,
+                severity=analysis['severity'], action=analysis['action'],
+                fields=fields
+            )
+        self.last_incident_ids[(server_host, service_name)] = self.incident_index.record(
+            service_name, server_host, log_templates, analysis['text'], from_ai=from_ai, vectors=incident_vectors
+        )
+        self.logger.info(
+            f"Generated {'structured' if fields else 'free-text'} analysis for {service_name} on {server_host} "
+            f"({analysis['severity']}, action {analysis['action']})"
+        )
         return analysis
     
+    def record_outcome(self, server_host, service_name, restart_success):
+        """Attach the restart outcome to the latest incident for this service"""
+        incident_id = self.last_incident_ids.get((server_host, service_name))
+        if incident_id:
+            self.incident_index.update_outcome(incident_id, restart_success)
+    
+    def estimate_severity(self, service_name, log_templates):
+        """Pre-LLM severity bucket used to key the analysis cache"""
+        service_config = self.config.get('service_settings', {}).get(service_name, {})
+        critical_keywords = [k.lower() for k in service_config.get('critical_keywords', [])]
+        
+        templates_text = ' '.join(item['template'] for item in log_templates).lower()
+        levels = {item['level'] for item in log_templates}
+        
+        if any(keyword in templates_text for keyword in critical_keywords) or 'FATAL' in levels:
+            return 'Critical'
+        if 'ERROR' in levels:
+            return 'High'
+        if 'WARN' in levels:
+            return 'Medium'
+        return 'Low'
+    
+    def analysis_fingerprint(self, service_name, severity, log_templates, exceptions=None):
+        """Normalized fingerprint of the error signature (template set and exception fingerprints, not counts or timestamps)"""
+        signature = sorted({item['template'] for item in log_templates})
+        exception_signature = sorted({item['fingerprint'] for item in exceptions or []})
+        return fingerprint('service', service_name, severity, signature, exception_signature)
+    
     def generate_health_recommendations(self, service_status):
         """Generate cluster health recommendations"""
         failed_services = [k for k, v in service_status.items() if not v]
         healthy_services = [k for k, v in service_status.items() if v]
         
+        # Same status vector as a recent report? Reuse its recommendations
+        cache_key = fingerprint('recommendations', sorted((k, bool(v)) for k, v in service_status.items()))
+        cached = self.analysis_cache.get(cache_key, ttl_seconds=self.recommendations_ttl)
+        if cached:
+            self.logger.info("Using cached cluster health recommendations")
+            return cached['value']
+        
         prompt = f"""You are a Kafka/Zookeeper cluster expert. Analyze this cluster status:
 
 CLUSTER STATUS:
@@ -227,7 +596,9 @@ OPERATIONAL IMPROVEMENTS:
 """
 
         recommendations = self.call_ollama(prompt)
-        self.logger.info("Generated cluster health recommendations")
+        if not recommendations.startswith(RULE_BASED_HEADER):
+            self.analysis_cache.put(cache_key, recommendations, kind='recommendations')
+        self.logger.info(f"Generated cluster health recommendations (cache: {self.analysis_cache.stats()})")
         return recommendations
     
     def extract_error_patterns(self, log_content):
@@ -251,7 +622,8 @@ OPERATIONAL IMPROVEMENTS:
         ]
         
         found_errors = []
-        lines = log_content.split('\n')
+        # Stack frames are folded away so one trace cannot flood the window
+        lines = strip_stack_frames(log_content).split('\n')
         
         for line in lines[-500:]:  # Check last 500 lines
             line = line.strip()
@@ -265,102 +637,19 @@ OPERATIONAL IMPROVEMENTS:
         
         return found_errors
     
-    def rule_based_analysis(self, prompt):
+    def rule_based_analysis(self, prompt=None, triage=None):
         """Fallback rule-based analysis when AI is unavailable"""
         self.logger.warning("Using rule-based analysis - AI unavailable")
         
-        analysis = "AI ANALYSIS UNAVAILABLE - USING RULE-BASED FALLBACK\n\n"
+        analysis = f"{RULE_BASED_HEADER}\n\n"
         
-        if "kafka" in prompt.lower():
-            analysis += self.kafka_rule_analysis(prompt)
-        elif "zookeeper" in prompt.lower():
-            analysis += self.zookeeper_rule_analysis(prompt)
+        if triage is not None:
+            analysis += self.rule_engine.format_analysis(triage)
         else:
             analysis += self.generic_rule_analysis(prompt)
         
         return analysis
     
-    def kafka_rule_analysis(self, prompt):
-        """Rule-based Kafka analysis"""
-        issues = []
-        solutions = []
-        
-        if "OutOfMemoryError" in prompt:
-            issues.append("JVM heap memory exhaustion")
-            solutions.append("Increase heap size in KAFKA_HEAP_OPTS")
-            solutions.append("Check for memory leaks in producers/consumers")
-        
-        if "BindException" in prompt or "Address already in use" in prompt:
-            issues.append("Port conflict or service already running")
-            solutions.append("Check if another Kafka instance is running")
-            solutions.append("Verify port configuration in server.properties")
-        
-        if "Connection refused" in prompt:
-            issues.append("Network connectivity issues")
-            solutions.append("Check if Zookeeper is running")
-            solutions.append("Verify network configuration and firewall rules")
-        
-        if "zookeeper" in prompt.lower():
-            issues.append("Zookeeper connectivity problems")
-            solutions.append("Restart Zookeeper service")
-            solutions.append("Check Zookeeper configuration")
-        
-        return f"""
-PROBLEM SUMMARY:
-Kafka service failure detected. Issues found: {', '.join(issues) if issues else 'Unknown issue'}
-
-ROOT CAUSE:
-Based on log patterns, this appears to be related to {issues[0] if issues else 'service startup failure'}
-
-SEVERITY LEVEL:
-High - Kafka service disruption affects message processing
-
-IMMEDIATE ACTIONS:
-1. Check system resources (memory, disk, CPU)
-2. Verify Zookeeper connectivity
-3. Review Kafka configuration files
-
-SOLUTION STEPS:
-{chr(10).join([f"{i+1}. {sol}" for i, sol in enumerate(solutions[:5])])}
-
-PREVENTION MEASURES:
-- Monitor JVM heap usage
-- Set up resource monitoring alerts
-- Regular log rotation and cleanup
-- Network connectivity monitoring
-"""
-    
-    def zookeeper_rule_analysis(self, prompt):
-        """Rule-based Zookeeper analysis"""
-        return """
-PROBLEM SUMMARY:
-Zookeeper service failure detected. This is critical as it affects the entire Kafka cluster.
-
-ROOT CAUSE:
-Zookeeper service failure - common causes include resource exhaustion, configuration issues, or network problems.
-
-SEVERITY LEVEL:
-Critical - Zookeeper failure impacts all Kafka brokers
-
-IMMEDIATE ACTIONS:
-1. Check Zookeeper process status
-2. Verify available disk space in Zookeeper data directory
-3. Check network connectivity between Zookeeper nodes
-
-SOLUTION STEPS:
-1. Restart Zookeeper service: sudo systemctl restart zookeeper
-2. Check Zookeeper logs for specific error messages
-3. Verify Zookeeper configuration in zookeeper.properties
-4. Ensure proper file permissions on data directories
-5. Check system resources (memory, disk space)
-
-PREVENTION MEASURES:
-- Monitor Zookeeper ensemble health
-- Set up disk space monitoring
-- Regular backup of Zookeeper data
-- Network connectivity monitoring between nodes
-"""
-    
     def generic_rule_analysis(self, prompt):
         """Generic rule-based analysis"""
         return """
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+log_attachments.py
+Compressed log attachments for alert emails (zstd when the zstandard package is installed, else gzip)
+Text is encoded and compressed chunk by chunk straight from the captured log, never copied whole into bytes
+"""
+
+import gzip
+import importlib
+import importlib.util
+import io
+import logging
+import threading
+import time
+from email.mime.application import MIMEApplication
+
+CHUNK_CHARS = 256 * 1024
+CODECS = {
+    'gzip': {'suffix': '.gz', 'subtype': 'gzip', 'level': 9},
+    'zstd': {'suffix': '.zst', 'subtype': 'zstd', 'level': 10},
+}
+
+
+class LogAttachments:
+    """Builds compressed attachments and short inline excerpts for alert emails"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        attachment_config = config.get('log_attachments', {})
+        self.enabled = attachment_config.get('enabled', True)
+        self.inline_lines = attachment_config.get('inline_log_lines', 15)
+        self.inline_chars = attachment_config.get('inline_log_chars', 1500)
+        self.inline_items = attachment_config.get('inline_top_items', 5)
+        self.max_bytes = attachment_config.get('max_attachment_mb', 8) * 1024 * 1024
+
+        codec = attachment_config.get('codec', 'auto')
+        zstd_available = importlib.util.find_spec('zstandard') is not None
+        if codec == 'zstd' and not zstd_available:
+            self.logger.warning("zstandard is not installed (pip3 install zstandard), compressing attachments with gzip")
+        self.codec = 'zstd' if codec in ('auto', 'zstd') and zstd_available else 'gzip'
+        self.level = attachment_config.get('level', CODECS[self.codec]['level'])
+
+        self.lock = threading.Lock()
+        self.metrics = {'attachments': 0, 'raw_bytes': 0, 'compressed_bytes': 0, 'oversized': 0, 'seconds': 0.0}
+
+    def compress(self, filename, parts):
+        """MIME attachment holding the text parts compressed as one file, or None if disabled or too large"""
+        if not self.enabled:
+            return None
+
+        started = time.perf_counter()
+        codec = CODECS[self.codec]
+        buffer = io.BytesIO()
+        raw_bytes = 0
+        try:
+            if self.codec == 'zstd':
+                zstandard = importlib.import_module('zstandard')
+                writer = zstandard.ZstdCompressor(level=self.level).stream_writer(buffer, closefd=False)
+            else:
+                writer = gzip.GzipFile(filename=filename, mode='wb', compresslevel=self.level, fileobj=buffer, mtime=0)
+            with writer:
+                for part in parts:
+                    for start in range(0, len(part), CHUNK_CHARS):
+                        chunk = part[start:start + CHUNK_CHARS].encode('utf-8', 'replace')
+                        raw_bytes += len(chunk)
+                        writer.write(chunk)
+        except Exception as e:
+            self.logger.error(f"Error compressing attachment {filename}, sending without it: {e}")
+            return None
+
+        data = buffer.getvalue()
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.metrics['seconds'] += elapsed
+            if len(data) > self.max_bytes:
+                self.metrics['oversized'] += 1
+            else:
+                self.metrics['attachments'] += 1
+                self.metrics['raw_bytes'] += raw_bytes
+                self.metrics['compressed_bytes'] += len(data)
+        if len(data) > self.max_bytes:
+            self.logger.warning(f"Attachment {filename} is {len(data) / 1024 / 1024:.1f} MB compressed, not attached")
+            return None
+
+        name = filename + codec['suffix']
+        attachment = MIMEApplication(data, _subtype=codec['subtype'], Name=name)
+        attachment['Content-Disposition'] = f'attachment; filename="{name}"'
+        self.logger.debug(f"Compressed {filename}: {raw_bytes} -> {len(data)} bytes ({self.codec}) in {elapsed * 1000:.1f} ms")
+        return attachment
+
+    def excerpt(self, log_content, lines=None, chars=None):
+        """(last whole lines of the log within the line and character caps, total line count), without splitting the log"""
+        lines = self.inline_lines if lines is None else lines
+        chars = self.inline_chars if chars is None else chars
+        total = log_content.count('\n') + (0 if not log_content or log_content.endswith('\n') else 1)
+        end = len(log_content.rstrip('\n'))
+        start = end
+        for _ in range(lines):
+            previous = log_content.rfind('\n', 0, start)
+            if end - previous - 1 > chars:
+                break
+            start = previous
+            if start < 0:
+                break
+        if start == end and end:
+            # A single line longer than the cap: keep its tail
+            return log_content[max(end - chars, 0):end], total
+        return log_content[start + 1:end], total
+
+    def stats(self):
+        with self.lock:
+            raw = self.metrics['raw_bytes']
+            return {
+                **self.metrics,
+                'codec': self.codec,
+                'seconds': round(self.metrics['seconds'], 4),
+                'ratio': round(raw / self.metrics['compressed_bytes'], 1) if self.metrics['compressed_bytes'] else 0.0,
+            }
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+log_columns.py
+Columnar parser for Kafka (server.log) and Zookeeper (zookeeper.out) log4j layouts and JVM unified (GC) logs
+Turns log text into NumPy columns for time-window slicing, level filtering and histograms
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+LEVELS = ['TRACE', 'DEBUG', 'INFO', 'WARN', 'ERROR', 'FATAL']
+LEVEL_CODES = {name: code for code, name in enumerate(LEVELS)}
+LEVEL_CODES['WARNING'] = LEVEL_CODES['WARN']
+UNKNOWN_LEVEL = -1
+
+# One pattern per layout; each captures timestamp, level and logger
+KAFKA_LINE = re.compile(rb'^\[(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2}:\d{2})[,.](\d{3})\] ([A-Z]+) .*?(?:\(([\w.$]+)\))?\s*$')
+ZOOKEEPER_LINE = re.compile(rb'^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})[,.](\d{3}) (?:\[myid:\d*\] - )?([A-Z]+)\s+(?:\[.*?:([\w$.]+)@\d+\])?')
+# -Xlog decorations, e.g. [2024-01-15T10:23:45.123+0000][gc,heap] or [...][12.345s][info][gc]; tags act as the logger
+UNIFIED_LINE = re.compile(rb'^\[(\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}:\d{2})\.(\d{3})[^\]]*\](?:\[[\d.]+m?s\])*(?:\[(trace|debug|info|warning|error)\s*\])?\[([\w,]+)\s*\]')
+
+
+class ColumnarLog:
+    """Log records as parallel arrays: timestamp, level, logger id, template id and byte offsets"""
+
+    def __init__(self, buffer, timestamps, levels, loggers, templates, starts, ends, logger_names):
+        self.buffer = buffer
+        self.timestamps = timestamps        # datetime64[ms]
+        self.levels = levels                # int8 level codes
+        self.loggers = loggers              # int32 index into logger_names
+        self.templates = templates          # int32 template id, -1 if unknown
+        self.starts = starts                # int64 byte offset of the record
+        self.ends = ends                    # int64 end offset (includes continuation lines)
+        self.logger_names = logger_names
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def parse(cls, log_content, template_lookup=None):
+        """Parse log text or bytes; continuation lines (stack traces) extend the preceding record"""
+        buffer = log_content.encode('utf-8', 'replace') if isinstance(log_content, str) else bytes(log_content)
+
+        stamps, levels, loggers, templates, starts, ends = [], [], [], [], [], []
+        logger_ids = {}
+        offset = 0
+
+        for raw_line in buffer.splitlines(keepends=True):
+            line = raw_line.rstrip(b'\r\n')
+            match = KAFKA_LINE.match(line) or ZOOKEEPER_LINE.match(line) or UNIFIED_LINE.match(line)
+            if match:
+                date, clock, millis, level, logger_name = match.groups()
+                stamps.append(b'%sT%s.%s' % (date, clock, millis))
+                levels.append(LEVEL_CODES.get((level or b'INFO').decode('ascii').upper(), UNKNOWN_LEVEL))
+                name = (logger_name or b'').decode('utf-8', 'replace')
+                loggers.append(logger_ids.setdefault(name, len(logger_ids)))
+                templates.append(template_lookup(line.decode('utf-8', 'replace')) if template_lookup else -1)
+                starts.append(offset)
+                ends.append(offset + len(raw_line))
+            elif ends:
+                ends[-1] = offset + len(raw_line)
+            offset += len(raw_line)
+
+        return cls(
+            buffer,
+            np.array([s.decode('ascii') for s in stamps], dtype='datetime64[ms]'),
+            np.array(levels, dtype=np.int8),
+            np.array(loggers, dtype=np.int32),
+            np.array(templates, dtype=np.int32),
+            np.array(starts, dtype=np.int64),
+            np.array(ends, dtype=np.int64),
+            list(logger_ids),
+        )
+
+    def mask(self, start=None, end=None, min_level=None, levels=None, logger=None):
+        """Boolean selection over records; all conditions are vectorized"""
+        selected = np.ones(len(self), dtype=bool)
+        if start is not None:
+            selected &= self.timestamps >= np.datetime64(start, 'ms')
+        if end is not None:
+            selected &= self.timestamps <= np.datetime64(end, 'ms')
+        if min_level is not None:
+            selected &= self.levels >= LEVEL_CODES[min_level]
+        if levels is not None:
+            selected &= np.isin(self.levels, [LEVEL_CODES[name] for name in levels])
+        if logger is not None:
+            ids = [i for i, name in enumerate(self.logger_names) if name == logger or name.endswith('.' + logger)]
+            selected &= np.isin(self.loggers, ids)
+        return selected
+
+    def select(self, selected):
+        """New ColumnarLog over the selected records, sharing the raw buffer"""
+        return ColumnarLog(
+            self.buffer,
+            self.timestamps[selected],
+            self.levels[selected],
+            self.loggers[selected],
+            self.templates[selected],
+            self.starts[selected],
+            self.ends[selected],
+            self.logger_names,
+        )
+
+    def window(self, start, end=None):
+        return self.select(self.mask(start=start, end=end))
+
+    def text(self):
+        """Raw text of the records (with their stack traces), contiguous spans merged"""
+        if not len(self):
+            return ''
+        spans = []
+        span_start, span_end = int(self.starts[0]), int(self.ends[0])
+        for start, end in zip(self.starts[1:].tolist(), self.ends[1:].tolist()):
+            if start == span_end:
+                span_end = end
+            else:
+                spans.append(self.buffer[span_start:span_end])
+                span_start, span_end = start, end
+        spans.append(self.buffer[span_start:span_end])
+        return b''.join(spans).decode('utf-8', 'replace')
+
+    def histogram(self, bin_seconds=60, levels=('ERROR', 'WARN')):
+        """Per-bin counts for each level: (bin_start datetimes, {level: counts array})"""
+        if not len(self):
+            return np.array([], dtype='datetime64[ms]'), {level: np.array([], dtype=np.int64) for level in levels}
+
+        step = np.timedelta64(bin_seconds * 1000, 'ms')
+        origin = self.timestamps.min().astype('datetime64[m]').astype('datetime64[ms]')
+        bins = ((self.timestamps - origin) // step).astype(np.int64)
+        bin_count = int(bins.max()) + 1
+
+        counts = {}
+        for level in levels:
+            selected = self.levels == LEVEL_CODES[level]
+            counts[level] = np.bincount(bins[selected], minlength=bin_count)
+        return origin + step * np.arange(bin_count), counts
+
+
+def error_profile(columns, bin_seconds=60, levels=('ERROR', 'WARN'), max_bins=30, width=30):
+    """Text per-minute (per-bin) error profile for alerts"""
+    bin_starts, counts = columns.histogram(bin_seconds, levels)
+    if not len(bin_starts):
+        return ''
+
+    bin_starts = bin_starts[-max_bins:]
+    counts = {level: values[-max_bins:] for level, values in counts.items()}
+    peak = int(counts[levels[0]].max()) or 1
+
+    lines = []
+    for index, start in enumerate(bin_starts):
+        stamp = start.astype(datetime).strftime('%H:%M')
+        row = '  '.join(f"{level} {int(counts[level][index]):>4}" for level in levels)
+        bar = '#' * int(round(width * int(counts[levels[0]][index]) / peak))
+        lines.append(f"{stamp}  {row}  {bar}")
+    return '\n'.join(lines)
+
+
+class FailureWindow:
+    """Slices a log capture to the window around a detected failure"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        window_config = config.get('log_window', {})
+        self.pre_failure = timedelta(minutes=window_config.get('pre_failure_minutes', 2))
+        self.post_failure = timedelta(minutes=window_config.get('post_failure_minutes', 10))
+        self.bin_seconds = window_config.get('histogram_bin_seconds', 60)
+        self.min_records = window_config.get('min_records', 20)
+
+    def bounds(self, failure_time):
+        """(start, end) of the failure window, or (None, None) without a failure time"""
+        if failure_time is None:
+            return None, None
+        return failure_time - self.pre_failure, failure_time + self.post_failure
+
+    def slice(self, log_content, failure_time):
+        """Return (log text for the failure window, per-minute error profile)"""
+        columns = ColumnarLog.parse(log_content)
+        if not len(columns) or failure_time is None:
+            return log_content, error_profile(columns, self.bin_seconds)
+
+        windowed = columns.window(*self.bounds(failure_time))
+        profile = error_profile(columns, self.bin_seconds)
+
+        if len(windowed) < self.min_records:
+            # Too little inside the window (clock skew, quiet service): keep the full capture
+            self.logger.debug(f"Failure window has {len(windowed)} records, using full capture")
+            return log_content, profile
+
+        self.logger.info(f"Analyzing {len(windowed)}/{len(columns)} records around failure at {failure_time}")
+        return windowed.text(), profile
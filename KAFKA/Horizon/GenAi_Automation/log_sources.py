@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+log_sources.py
+Multi-file log collection for a service (server.log, controller.log, state-change.log, GC logs, ...)
+All files are fetched in one remote round trip and analyzed in parallel into time-ordered evidence
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import shlex
+import socket
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from exception_folder import STACK_FRAME, FRAME_ELISION
+from log_columns import LEVEL_CODES, LEVELS, ColumnarLog
+from log_templates import mask_message
+
+# Records worth reporting even when logged below WARN (GC and controller logs rarely use WARN)
+EVIDENCE_KEYWORDS = re.compile(
+    r'Pause Full|to-space exhausted|Evacuation Failure|Allocation Stall|OutOfMemory|'
+    r'Controller moved|Shutting down|Resigned|Fenced|Offline partition|LeaderAndIsr request .* failed|'
+    r'Failed|Error|Exception',
+    re.IGNORECASE
+)
+LINE_HEADER = re.compile(r'^(?:(?:\[[^\]]*\])+|\d{4}-\d{2}-\d{2}[ T][\d:,.]+(?:\s+\[myid:\d*\]\s+-)?)\s*(?:(?:TRACE|DEBUG|INFO|WARN|ERROR|FATAL)\s+)?')
+
+
+def analyze_log_source(source, log_content, window_start=None, window_end=None, max_evidence=50):
+    """Evidence from one log file; top-level so it can run in a worker process"""
+    columns = ColumnarLog.parse(log_content)
+    if not len(columns):
+        return []
+
+    selected = columns.mask(start=window_start, end=window_end)
+    if not selected.any():
+        # Quiet file or clock skew: the tail of the file is still the best evidence
+        selected = np.ones(len(columns), dtype=bool)
+    columns = columns.select(selected)
+
+    evidence = {}
+    warn = LEVEL_CODES['WARN']
+    for index in range(len(columns)):
+        record = columns.buffer[int(columns.starts[index]):int(columns.ends[index])].decode('utf-8', 'replace')
+        lines = record.splitlines() or ['']
+        first = lines[0].strip()
+        if columns.levels[index] < warn and not EVIDENCE_KEYWORDS.search(first):
+            continue
+
+        message = LINE_HEADER.sub('', first)
+        key = mask_message(message)
+        timestamp = str(columns.timestamps[index])
+        item = evidence.get(key)
+        if item is None:
+            detail = [line.strip()[:200] for line in lines[1:] if line.strip() and not (STACK_FRAME.match(line) or FRAME_ELISION.match(line))]
+            evidence[key] = {
+                'source': source,
+                'time': timestamp,
+                'last_seen': timestamp,
+                'level': LEVELS[columns.levels[index]] if columns.levels[index] >= 0 else '?',
+                'message': message[:300],
+                'detail': detail[:2],
+                'count': 1,
+            }
+        else:
+            item['count'] += 1
+            item['last_seen'] = timestamp
+
+    # Keep the records closest to the failure
+    return sorted(evidence.values(), key=lambda item: item['last_seen'])[-max_evidence:]
+
+
+def merge_evidence(per_source, limit=40):
+    """Merge per-file evidence into one time-ordered list, keeping the most recent entries"""
+    merged = sorted((item for items in per_source for item in items), key=lambda item: (item['time'], item['source']))
+    return merged[-limit:]
+
+
+def format_evidence(evidence, limit=40):
+    """One line per evidence entry for prompts and emails"""
+    lines = []
+    for item in evidence[-limit:]:
+        repeat = f" (x{item['count']} until {item['last_seen'][11:19]})" if item['count'] > 1 else ''
+        lines.append(f"{item['time'][11:23]} {item['source']:<22} {item['level']:<5} {item['message'][:200]}{repeat}")
+        for detail in item['detail']:
+            lines.append(f"{'':>36}{detail}")
+    return '\n'.join(lines)
+
+
+class LogSourceFetcher:
+    """Reads the primary and additional log files of a service with a single local or SSH command"""
+
+    def __init__(self, config):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+
+        sources_config = config.get('log_sources', {})
+        self.default_lines = sources_config.get('lines_per_file', config['monitoring']['log_lines_to_analyze'])
+        self.timeout = sources_config.get('fetch_timeout_seconds', 30)
+        self.ssh_user = sources_config.get('ssh_user', 'wasadmin')
+
+    def sources(self, service):
+        """[(path, lines)] for a service: log_file first, then additional_log_files"""
+        sources = [(service['log_file'], self.config['monitoring']['log_lines_to_analyze'])]
+        for entry in service.get('additional_log_files', []):
+            if isinstance(entry, dict):
+                sources.append((entry['path'], entry.get('lines', self.default_lines)))
+            else:
+                sources.append((entry, self.default_lines))
+        return sources
+
+    def run(self, host, command, text=True):
+        """Run a shell command on the service host (locally or over SSH)"""
+        if host == socket.gethostname() or host.startswith(socket.gethostname().split('.')[0]):
+            return subprocess.run(['bash', '-c', command], capture_output=True, text=text, timeout=self.timeout)
+        return subprocess.run(['ssh', f"{self.ssh_user}@{host}", command], capture_output=True, text=text, timeout=self.timeout)
+
+    def fetch_appended(self, server, path, position=None, max_bytes=1048576):
+        """Bytes appended to path since position=(inode, offset); returns (text, new position)
+
+        The first call (or a rotated file) returns the last max_bytes. Only complete lines are
+        consumed; a trailing partial line is re-read next time.
+        """
+        inode, offset = position if position else ('', -1)
+        quoted = shlex.quote(path)
+        command = (
+            f"f={quoted}; set -- $(stat -c '%s %i' -- \"$f\" 2>/dev/null || echo -1 0); size=$1; ino=$2; start={int(offset)}; "
+            f"if [ \"$size\" -lt 0 ]; then echo '-1 0 0'; exit 0; fi; "
+            f"if [ \"$ino\" != {shlex.quote(str(inode))} ]; then start=-1; fi; "
+            f"if [ \"$start\" -lt 0 ] || [ \"$start\" -gt \"$size\" ] || [ $((size - start)) -gt {int(max_bytes)} ]; then "
+            f"start=$((size > {int(max_bytes)} ? size - {int(max_bytes)} : 0)); fi; "
+            f"echo \"$size $ino $start\"; tail -c +$((start + 1)) -- \"$f\" | head -c $((size - start))"
+        )
+
+        try:
+            result = self.run(server['host'], command, text=False)
+        except Exception as e:
+            self.logger.error(f"Error reading appended log data from {server['host']}:{path}: {e}")
+            return '', position
+
+        header, _, data = result.stdout.partition(b'\n')
+        try:
+            size, new_inode, start = header.decode('ascii').split()
+        except ValueError:
+            self.logger.error(f"Failed to read {server['host']}:{path}: {result.stderr.decode('utf-8', 'replace').strip()}")
+            return '', position
+        if int(size) < 0:
+            return '', position
+
+        start = int(start)
+        complete = data[:data.rfind(b'\n') + 1]
+        text = complete
+        if start > 0 and start != offset:
+            # Jumped into the middle of the file: drop the leading partial line
+            text = complete[complete.find(b'\n') + 1:]
+        return text.decode('utf-8', 'replace'), (new_inode, start + len(complete))
+
+    def build_command(self, sources, marker):
+        """Shell script that tails every readable file behind a marker line
+
+        Each marker starts with a newline so it begins its own line even when the previous
+        file does not end in one (a log still being written); parse_output drops that newline.
+        """
+        parts = []
+        for path, lines in sources:
+            quoted = shlex.quote(path)
+            parts.append(f"printf '\\n%s %s\\n' {shlex.quote(marker)} {quoted}; if [ -r {quoted} ]; then tail -n {int(lines)} {quoted}; fi")
+        return '; '.join(parts)
+
+    def parse_output(self, output, sources, marker):
+        """Split build_command output into {path: content}"""
+        contents = {path: [] for path, _ in sources}
+        current = None
+        for line in output.splitlines(keepends=True):
+            if line.startswith(marker):
+                if current is not None and contents[current]:
+                    # The newline printed before this marker belongs to the script, not the file
+                    contents[current][-1] = contents[current][-1][:-1]
+                current = line[len(marker):].strip()
+                contents.setdefault(current, [])
+            elif current is not None:
+                contents[current].append(line)
+        return {path: ''.join(lines) for path, lines in contents.items()}
+
+    def fetch(self, server, service):
+        """Return {path: content} for every declared source (empty content if unreadable)"""
+        host = server['host']
+        sources = self.sources(service)
+        marker = f"@@KAFKA-MONITOR-{uuid.uuid4().hex}@@"
+        command = self.build_command(sources, marker)
+
+        try:
+            result = self.run(host, command)
+        except Exception as e:
+            self.logger.error(f"Error fetching logs from {host}: {e}")
+            return {}
+
+        if result.returncode != 0 and marker not in result.stdout:
+            self.logger.error(f"Failed to read logs from {host}: {result.stderr.strip()}")
+            return {}
+
+        fetched = self.parse_output(result.stdout, sources, marker)
+        self.logger.debug(f"Fetched {len(fetched)} log files from {host} in one round trip")
+        return fetched
+
+
+class LogSourceAnalyzer:
+    """Analyzes several log files of one service in parallel worker processes"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        sources_config = config.get('log_sources', {})
+        self.workers = sources_config.get('process_pool_workers', min(4, os.cpu_count() or 1))
+        self.max_evidence_per_file = sources_config.get('max_evidence_per_file', 50)
+        self.max_evidence = sources_config.get('max_evidence_in_prompt', 40)
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def analyze(self, log_sources, window_start=None, window_end=None):
+        """Merged, time-ordered evidence from {path: content}"""
+        jobs = [(os.path.basename(path), content) for path, content in log_sources.items() if content.strip()]
+        if not jobs:
+            return []
+
+        try:
+            if self.workers > 1 and len(jobs) > 1:
+                with self.lock:
+                    if self.executor is None:
+                        # spawn, not fork: the monitor process is multi-threaded
+                        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                futures = [
+                    self.executor.submit(analyze_log_source, source, content, window_start, window_end, self.max_evidence_per_file)
+                    for source, content in jobs
+                ]
+                per_source = [future.result() for future in futures]
+            else:
+                per_source = [
+                    analyze_log_source(source, content, window_start, window_end, self.max_evidence_per_file)
+                    for source, content in jobs
+                ]
+        except Exception as e:
+            self.logger.error(f"Error analyzing log sources: {e}")
+            return []
+
+        evidence = merge_evidence(per_source, self.max_evidence)
+        self.logger.info(f"Merged {len(evidence)} evidence entries from {len(jobs)} log files")
+        return evidence
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+log_templates.py
+Online log template mining (Drain-style) for Kafka/Zookeeper logs
+Collapses repeated messages into masked templates with occurrence counts
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# log4j headers used by server.log and zookeeper.out
+LOG_HEADER_PATTERNS = [
+    # [2024-01-15 10:23:45,123] ERROR message (kafka.server.KafkaServer)
+    re.compile(r'^\[(?P<ts>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}[,.]\d{3})\]\s+(?P<level>[A-Z]+)\s+(?P<msg>.*)$'),
+    # 2024-01-15 10:23:45,123 [myid:1] - WARN  [main:QuorumPeer@123] - message
+    re.compile(r'^(?P<ts>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}[,.]\d{3})\s+(?:\[myid:\d*\]\s+-\s+)?(?P<level>[A-Z]+)\s+(?P<msg>.*)$'),
+]
+
+# Variable fields masked before clustering, applied in order
+MASK_PATTERNS = [
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<UUID>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    (re.compile(r'\b[\w-]+(?:\.[\w-]+)+:\d{2,5}\b'), '<HOST>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<HEX>'),
+    (re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?:ms|s|MB|KB|GB|B)?\b'), '<NUM>'),
+]
+
+PARAM = '<*>'
+MASK_TOKENS = {'<UUID>', '<IP>', '<HOST>', '<HEX>', '<NUM>', PARAM}
+
+
+def parse_log_line(line):
+    """Split a log4j line into (timestamp, level, message); header fields may be None"""
+    for pattern in LOG_HEADER_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return match.group('ts'), match.group('level'), match.group('msg')
+    return None, None, line
+
+
+def mask_message(message):
+    """Replace variable fields with typed placeholders"""
+    for pattern, placeholder in MASK_PATTERNS:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+class LogTemplate:
+    """A cluster of log messages sharing one masked template"""
+
+    def __init__(self, template_id, tokens, count=0, level=None, first_seen=None, last_seen=None):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.count = count
+        self.level = level
+        self.first_seen = first_seen
+        self.last_seen = last_seen
+
+    @property
+    def template(self):
+        return ' '.join(self.tokens)
+
+    def to_dict(self):
+        return {
+            'id': self.template_id,
+            'tokens': self.tokens,
+            'count': self.count,
+            'level': self.level,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], data['tokens'], data.get('count', 0), data.get('level'),
+                   data.get('first_seen'), data.get('last_seen'))
+
+
+class LogTemplateMiner:
+    """Drain-style miner: fixed-depth prefix tree keyed by token count and leading tokens"""
+
+    def __init__(self, config):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+
+        mining_config = config.get('log_mining', {})
+        self.similarity_threshold = mining_config.get('similarity_threshold', 0.5)
+        self.depth = max(3, mining_config.get('tree_depth', 4))
+        self.max_children = mining_config.get('max_children', 100)
+        self.max_templates = mining_config.get('max_templates', 5000)
+        self.state_file = mining_config.get('state_file')
+
+        # token count -> prefix token -> ... -> list of template ids
+        self.tree = {}
+        self.templates = {}
+        self.next_id = 1
+        self.lock = threading.RLock()
+
+        if self.state_file:
+            self.load()
+
+    def parse_line(self, line):
+        return parse_log_line(line)
+
+    def tokenize(self, message):
+        return mask_message(message).split()
+
+    def add_line(self, line, keep=()):
+        """Add a single log line, returning the template it was assigned to (ids in keep are evicted last)"""
+        line = line.strip()
+        if not line:
+            return None
+
+        timestamp, level, message = self.parse_line(line)
+        tokens = self.tokenize(message)
+        if not tokens:
+            return None
+
+        template = self._match(tokens)
+        if template is None:
+            template = self._create(tokens, keep)
+        else:
+            self._merge(template, tokens)
+
+        template.count += 1
+        if level and not template.level:
+            template.level = level
+        if timestamp:
+            if not template.first_seen:
+                template.first_seen = timestamp
+            template.last_seen = timestamp
+
+        return template
+
+    def template_id(self, line):
+        """Id of the mined template a line matches (-1 if none); read-only, nothing is created or merged"""
+        tokens = self.tokenize(self.parse_line(line.strip())[2])
+        if not tokens:
+            return -1
+        with self.lock:
+            template = self._match(tokens)
+        return template.template_id if template is not None else -1
+
+    def mine(self, log_content):
+        """Mine a block of log text, returning [(template, occurrences_in_block)] by descending count"""
+        # template id -> [template, occurrences]; holds the objects so a template evicted mid-batch is still reported
+        batch_counts = {}
+        with self.lock:
+            for line in log_content.splitlines():
+                template = self.add_line(line, keep=batch_counts)
+                if template is not None:
+                    batch_counts.setdefault(template.template_id, [template, 0])[1] += 1
+
+        results = [(template, count) for template, count in batch_counts.values()]
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def summarize(self, log_content, limit=15, ignore_levels=None):
+        """Return the top templates of a log block as plain dicts for prompts and emails"""
+        summary = []
+        for template, occurrences in self.mine(log_content):
+            if ignore_levels and template.level in ignore_levels:
+                continue
+            summary.append({
+                'id': template.template_id,
+                'template': template.template,
+                'level': template.level or 'UNKNOWN',
+                'occurrences': occurrences,
+                'total_count': template.count,
+                'first_seen': template.first_seen,
+                'last_seen': template.last_seen,
+            })
+            if len(summary) >= limit:
+                break
+        return summary
+
+    def format_summary(self, summary):
+        """Render a template summary as compact prompt/email lines"""
+        return '\n'.join(
+            f"{item['occurrences']:>5}x [{item['level']}] {item['template']}" for item in summary
+        )
+
+    def _leaf(self, tokens, create=False):
+        """Walk the prefix tree to the leaf holding candidate templates"""
+        node = self.tree.get(len(tokens))
+        if node is None:
+            if not create:
+                return None
+            node = self.tree[len(tokens)] = {}
+
+        for token in tokens[:self.depth - 2]:
+            key = PARAM if token in MASK_TOKENS or any(c.isdigit() for c in token) else token
+            child = node.get(key)
+            if child is None:
+                if not create:
+                    child = node.get(PARAM)
+                    if child is None:
+                        return None
+                elif len(node) >= self.max_children:
+                    child = node.setdefault(PARAM, {})
+                else:
+                    child = node[key] = {}
+            node = child
+
+        return node.setdefault('__templates__', []) if create else node.get('__templates__')
+
+    def _similarity(self, template_tokens, tokens):
+        matched = 0
+        params = 0
+        for left, right in zip(template_tokens, tokens):
+            if left == PARAM:
+                params += 1
+            elif left == right:
+                matched += 1
+        return matched / len(tokens), params
+
+    def _match(self, tokens):
+        leaf = self._leaf(tokens)
+        if not leaf:
+            return None
+
+        best, best_score = None, (-1.0, -1)
+        for template_id in leaf:
+            template = self.templates[template_id]
+            score = self._similarity(template.tokens, tokens)
+            if score > best_score:
+                best, best_score = template, score
+
+        if best is not None and best_score[0] >= self.similarity_threshold:
+            return best
+        return None
+
+    def _create(self, tokens, keep=()):
+        if len(self.templates) >= self.max_templates:
+            self._evict(keep)
+
+        template = LogTemplate(self.next_id, list(tokens))
+        self.templates[template.template_id] = template
+        self._leaf(tokens, create=True).append(template.template_id)
+        self.next_id += 1
+        return template
+
+    def _merge(self, template, tokens):
+        template.tokens = [
+            left if left == right else PARAM
+            for left, right in zip(template.tokens, tokens)
+        ]
+
+    def _evict(self, keep=()):
+        """Drop the least frequent tenth of templates to bound memory, templates in keep last"""
+        victims = sorted(self.templates.values(), key=lambda t: (t.template_id in keep, t.count))
+        victims = victims[:max(1, len(self.templates) // 10)]
+        victim_ids = {t.template_id for t in victims}
+        for template_id in victim_ids:
+            del self.templates[template_id]
+        self.tree = {}
+        for template in self.templates.values():
+            self._leaf(template.tokens, create=True).append(template.template_id)
+        self.logger.debug(f"Evicted {len(victim_ids)} rare log templates")
+
+    def load(self):
+        """Load persisted templates and rebuild the prefix tree"""
+        path = Path(self.state_file)
+        if not path.exists():
+            return
+
+        try:
+            with open(path, 'r') as f:
+                state = json.load(f)
+            for data in state.get('templates', []):
+                template = LogTemplate.from_dict(data)
+                self.templates[template.template_id] = template
+                self._leaf(template.tokens, create=True).append(template.template_id)
+            self.next_id = state.get('next_id', len(self.templates) + 1)
+            self.logger.info(f"Loaded {len(self.templates)} log templates from {path}")
+        except Exception as e:
+            self.logger.error(f"Error loading log templates from {path}: {e}")
+            self.tree, self.templates, self.next_id = {}, {}, 1
+
+    def save(self):
+        """Persist templates atomically so the tree survives monitor restarts"""
+        if not self.state_file:
+            return
+
+        path = Path(self.state_file)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self.lock:
+                state = {
+                    'saved_at': datetime.now().isoformat(),
+                    'next_id': self.next_id,
+                    'templates': [t.to_dict() for t in self.templates.values()],
+                }
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Error saving log templates to {path}: {e}")
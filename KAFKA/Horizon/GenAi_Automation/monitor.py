@@ -9,6 +9,7 @@ Main monitoring script for Kafka/Zookeeper cluster
 """
 
 import os
+import signal
 import sys
 import socket
 import subprocess
@@ -16,6 +17,7 @@ import time
 import yaml
 import logging
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -23,6 +25,8 @@ from pathlib import Path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from log_analyzer import LogAnalyzer
+from analysis_queue import AnalysisQueue
+from log_sources import LogSourceFetcher
 from email_sender import EmailSender
 
 class KafkaMonitor:
@@ -30,8 +34,25 @@ class KafkaMonitor:
         self.config = self.load_config(config_path)
         self.setup_logging()
         self.analyzer = LogAnalyzer(self.config)
+        self.analysis_queue = AnalysisQueue(self.config, self.analyzer)
+        self.log_fetcher = LogSourceFetcher(self.config)
+        
+        # Incremental log reads for early-warning rate baselines and GC heap pressure
+        detection_config = self.config.get('anomaly_detection', {})
+        self.watch_logs = self.analyzer.anomaly_detector.enabled or self.analyzer.gc_monitor.enabled
+        self.watch_max_bytes = detection_config.get('max_bytes_per_poll', 1048576)
+        # Kept with the detector state so a restart or --once run does not re-read old lines
+        self.log_positions = self.analyzer.anomaly_detector.positions
         self.emailer = EmailSender(self.config)
         
+        # Log capture before the restart; preparation and analysis overlap with it
+        speculative_config = self.config.get('speculative_analysis', {})
+        self.speculative = speculative_config.get('enabled', True)
+        self.speculative_on_recovery = speculative_config.get('on_recovery', 'cancel')
+        self.capture_executor = ThreadPoolExecutor(
+            max_workers=speculative_config.get('workers', 2), thread_name_prefix='capture'
+        )
+        
         # Service state tracking
         self.service_states = {}
         self.last_failure_time = {}
@@ -97,6 +118,7 @@ class KafkaMonitor:
                 self.logger.info(f"Service recovered: {service_key}")
                 self.service_states[service_key] = True
                 self.restart_attempts[service_key] = 0
+                self.analyzer.record_outcome(host, service_name, True)
                 
                 # Send recovery notification
                 self.emailer.send_recovery_notification(
@@ -217,51 +239,177 @@ class KafkaMonitor:
             self.logger.error(f"Error getting log content from {host}: {e}")
             return f"Error accessing log file: {str(e)}"
     
+    def capture_failure_logs(self, server, service):
+        """Read the primary and additional log files of a failed service"""
+        log_sources = self.log_fetcher.fetch(server, service)
+        log_content = log_sources.pop(service['log_file'], None)
+        if log_content is None:
+            log_content = self.get_log_content(server, service)
+        return log_content, log_sources
+    
+    def prepare_analysis(self, server, service, log_content, log_sources, failure_time):
+        """Preprocess captured logs and queue the AI analysis; returns the capture with its analysis future"""
+        host = server['host']
+        service_name = service['name']
+        
+        # Analyze only the records around the detected failure; keep a per-minute error profile
+        window_content, error_profile = self.analyzer.slice_failure_window(log_content, failure_time)
+        
+        # Merge findings from controller/state-change/GC logs into one time-ordered evidence set
+        evidence = self.analyzer.analyze_log_sources(log_sources, failure_time)
+        
+        # Collapse repeated log messages into weighted templates
+        log_templates = self.analyzer.summarize_log_templates(window_content)
+        
+        # Fold Java stack traces into fingerprinted exception events
+        exceptions = self.analyzer.fold_exceptions(window_content)
+        
+        # Queue the AI analysis (prioritized, concurrency-limited)
+        analysis = self.analysis_queue.submit(
+            service_name=service_name,
+            log_content=window_content,
+            server_host=host,
+            log_templates=log_templates,
+            exceptions=exceptions,
+            evidence=evidence
+        )
+        
+        return {
+            'log_content': log_content,
+            'error_profile': error_profile,
+            'evidence': evidence,
+            'log_templates': log_templates,
+            'exceptions': exceptions,
+            'analysis': analysis,
+        }
+    
+    def settle_speculative_analysis(self, server, service, task):
+        """The restart fixed the service: cancel the speculative analysis or keep it as a background record"""
+        host = server['host']
+        service_name = service['name']
+        
+        def settle(task):
+            if task.cancelled() or task.exception() is not None:
+                return
+            analysis = task.result()['analysis']
+            if self.speculative_on_recovery == 'record' and self.analysis_queue.downgrade(analysis):
+                # Finish when the queue is idle and remember that a restart fixed this signature
+                analysis.add_done_callback(
+                    lambda f: f.cancelled() or f.exception() is not None or self.analyzer.record_outcome(host, service_name, True)
+                )
+                self.logger.info(f"Speculative analysis for {host}:{service_name} downgraded to a background record")
+            elif self.analysis_queue.cancel(analysis):
+                self.logger.info(f"Speculative analysis for {host}:{service_name} cancelled")
+        
+        if task.cancel():
+            self.logger.info(f"Speculative analysis for {host}:{service_name} cancelled before it started")
+        else:
+            task.add_done_callback(settle)
+    
     def handle_service_failure(self, server, service):
         """Handle service failure - restart and analyze if needed"""
         host = server['host']
         service_name = service['name']
         service_key = f"{host}:{service_name}"
+        failure_time = self.last_failure_time.get(service_key)
         
         self.logger.warning(f"Handling service failure: {service_key}")
         
+        # Capture the logs before the restart can rotate or overwrite them, and analyze while it runs
+        task = None
+        if self.speculative:
+            log_content, log_sources = self.capture_failure_logs(server, service)
+            task = self.capture_executor.submit(self.prepare_analysis, server, service, log_content, log_sources, failure_time)
+        
         # Attempt restart
+        restart_started = time.monotonic()
         restart_success = self.restart_service(server, service)
+        restart_done = time.monotonic()
         
         if restart_success:
             self.logger.info(f"Service {service_key} successfully recovered via restart")
+            if task is not None:
+                self.settle_speculative_analysis(server, service, task)
             return True
         
         # If restart failed, get logs and analyze
         self.logger.warning(f"Service {service_key} restart failed, analyzing logs")
         
-        log_content = self.get_log_content(server, service)
+        if task is not None:
+            capture = task.result()
+        else:
+            log_content, log_sources = self.capture_failure_logs(server, service)
+            capture = self.prepare_analysis(server, service, log_content, log_sources, failure_time)
         
-        # Get AI analysis of the logs
-        ai_analysis = self.analyzer.analyze_service_logs(
-            service_name=service_name,
-            log_content=log_content,
-            server_host=host
+        ai_analysis = capture['analysis'].result()
+        self.logger.info(
+            f"Analysis for {service_key} ready {time.monotonic() - restart_done:.1f}s after the restart attempt "
+            f"({restart_done - restart_started:.1f}s restart{', speculative' if task is not None else ''})"
         )
         
+        # Restart did not fix this incident - remember that for future retrieval
+        self.analyzer.record_outcome(host, service_name, False)
+        
         # Send failure notification with analysis
         self.emailer.send_failure_alert(
             server_host=host,
             service_name=service_name,
-            log_content=log_content,
+            log_content=capture['log_content'],
             ai_analysis=ai_analysis,
             restart_attempted=True,
-            restart_attempts=self.restart_attempts[service_key]
+            restart_attempts=self.restart_attempts[service_key],
+            log_templates=capture['log_templates'],
+            exceptions=capture['exceptions'],
+            error_profile=capture['error_profile'],
+            evidence=capture['evidence'],
+            early_warnings=self.analyzer.early_warning_context(host, service_name),
+            gc_metrics=self.analyzer.gc_context(host, service_name)
         )
         
         return False
     
+    def run_failure_handler(self, server, service):
+        """Failure handler thread: errors go to the monitor log and the alert still goes out with rule-based analysis"""
+        service_key = f"{server['host']}:{service['name']}"
+        try:
+            self.handle_service_failure(server, service)
+        except Exception as e:
+            self.logger.error(f"Error handling failure of {service_key}: {e}")
+            self.send_fallback_alert(server, service)
+    
+    def send_fallback_alert(self, server, service):
+        """Failure alert with rule-based analysis after the normal handling raised"""
+        host = server['host']
+        service_name = service['name']
+        service_key = f"{host}:{service_name}"
+        try:
+            if self.check_port(host, service['port']):
+                # Back up after all; the next cycle reports the recovery
+                return
+            try:
+                log_content, _ = self.capture_failure_logs(server, service)
+            except Exception as e:
+                self.logger.error(f"Error capturing logs for {service_key}: {e}")
+                log_content = ''
+            analysis = self.analyzer.analysis_result(self.analyzer.rule_based_analysis(log_content), source='rules')
+            self.emailer.send_failure_alert(
+                server_host=host,
+                service_name=service_name,
+                log_content=log_content,
+                ai_analysis=analysis,
+                restart_attempted=self.restart_attempts.get(service_key, 0) > 0,
+                restart_attempts=self.restart_attempts.get(service_key, 0)
+            )
+        except Exception as e:
+            self.logger.error(f"Error sending fallback failure alert for {service_key}: {e}")
+    
     def monitor_cycle(self):
         """Single monitoring cycle - check all services"""
         self.logger.info("Starting monitoring cycle")
         
         all_services_up = True
         failed_services = []
+        failure_handlers = []
         
         for server in self.config['servers']:
             for service in server['services']:
@@ -269,6 +417,9 @@ class KafkaMonitor:
                 
                 is_up = self.check_service_status(server, service)
                 
+                if is_up and self.watch_logs:
+                    self.watch_service_logs(server, service)
+                
                 if not is_up:
                     all_services_up = False
                     failed_services.append({
@@ -279,7 +430,29 @@ class KafkaMonitor:
                     
                     # Check if we should handle this failure
                     if self.should_handle_failure(service_key):
-                        self.handle_service_failure(server, service)
+                        # Handle failures concurrently; the analysis queue serializes LLM work
+                        handler = threading.Thread(
+                            target=self.run_failure_handler,
+                            args=(server, service),
+                            name=f"failure-{service_key}"
+                        )
+                        handler.start()
+                        failure_handlers.append(handler)
+        
+        for handler in failure_handlers:
+            handler.join()
+        
+        if failure_handlers:
+            self.logger.info(f"Analysis queue stats: {self.analysis_queue.stats()}")
+            self.logger.info(f"Prompt prefix stats: {self.analyzer.prompt_prefixes.stats()}")
+            self.logger.info(f"SMTP pool stats: {self.emailer.transport.stats()}")
+            self.logger.info(f"Notification spool stats: {self.emailer.spool.stats()}")
+            self.logger.info(f"Notification channel stats: {self.emailer.channels.stats()}")
+            self.logger.info(f"Alert coalescing stats: {self.emailer.coalescer.stats()}")
+            self.logger.info(f"Log attachment stats: {self.emailer.attachments.stats()}")
+        
+        if self.analyzer.anomaly_detector.enabled:
+            self.analyzer.anomaly_detector.save()
         
         # Log cycle completion
         if all_services_up:
@@ -289,6 +462,39 @@ class KafkaMonitor:
         
         return all_services_up
     
+    def watch_service_logs(self, server, service):
+        """Feed log lines appended since the last cycle into the rate detector and GC monitor"""
+        host = server['host']
+        service_key = f"{host}:{service['name']}"
+        events, context = [], []
+        
+        if self.analyzer.anomaly_detector.enabled:
+            log_content, self.log_positions[service_key] = self.log_fetcher.fetch_appended(
+                server, service['log_file'], self.log_positions.get(service_key), self.watch_max_bytes
+            )
+            rate_events = self.analyzer.observe_log_rates(host, service['name'], log_content)
+            if rate_events:
+                events.extend(rate_events)
+                context.append(self.analyzer.early_warning_context(host, service['name'], rate_events))
+        
+        if self.analyzer.gc_monitor.enabled and service.get('gc_log_file'):
+            gc_key = f"{service_key}:gc"
+            gc_content, self.log_positions[gc_key] = self.log_fetcher.fetch_appended(
+                server, service['gc_log_file'], self.log_positions.get(gc_key), self.watch_max_bytes
+            )
+            gc_events = self.analyzer.observe_gc_log(host, service['name'], gc_content)
+            if gc_events:
+                events.extend(gc_events)
+                context.append(f"JVM GC:\n{self.analyzer.gc_context(host, service['name'], gc_events)}")
+        
+        if events:
+            self.emailer.send_early_warning(
+                server_host=host,
+                service_name=service['name'],
+                events=events,
+                context='\n\n'.join(context)
+            )
+    
     def should_handle_failure(self, service_key):
         """Determine if we should handle this service failure"""
         # Avoid handling the same failure too frequently
@@ -310,23 +516,34 @@ class KafkaMonitor:
         
         return True
     
+    def handle_sigterm(self, signum, frame):
+        """systemd stop: unwind the monitoring loop so held alerts and the spool are flushed"""
+        self.logger.info("Monitoring stopped by SIGTERM")
+        raise SystemExit(0)
+    
     def run_continuous_monitoring(self):
         """Run continuous monitoring loop"""
         self.logger.info("Starting continuous monitoring")
         
         check_interval = self.config['monitoring']['check_interval_seconds']
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
         
-        while True:
-            try:
-                self.monitor_cycle()
-                time.sleep(check_interval)
-                
-            except KeyboardInterrupt:
-                self.logger.info("Monitoring stopped by user")
-                break
-            except Exception as e:
-                self.logger.error(f"Error in monitoring loop: {e}")
-                time.sleep(30)  # Wait before retrying
+        try:
+            while True:
+                try:
+                    self.monitor_cycle()
+                    time.sleep(check_interval)
+                    
+                except KeyboardInterrupt:
+                    self.logger.info("Monitoring stopped by user")
+                    break
+                except Exception as e:
+                    self.logger.error(f"Error in monitoring loop: {e}")
+                    time.sleep(30)  # Wait before retrying
+        finally:
+            # Held (coalesced) alerts, channel queues and the spool are sent before exit
+            self.logger.info("Flushing held alerts and queued notifications")
+            self.emailer.close()
     
     def send_daily_report(self):
         """Send daily health report"""
@@ -349,11 +566,17 @@ def main():
         if sys.argv[1] == '--once':
             # Run single monitoring cycle
             monitor = KafkaMonitor()
-            monitor.monitor_cycle()
+            try:
+                monitor.monitor_cycle()
+            finally:
+                monitor.emailer.close()
         elif sys.argv[1] == '--report':
             # Send daily report
             monitor = KafkaMonitor()
-            monitor.send_daily_report()
+            try:
+                monitor.send_daily_report()
+            finally:
+                monitor.emailer.close()
         else:
             print("Usage: python3 monitor.py [--once|--report]")
     else:
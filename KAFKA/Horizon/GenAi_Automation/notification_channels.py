@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+notification_channels.py
+Parallel fan-out of notifications to SMTP, webhook, local file and syslog channels
+Each channel has its own priority queue, worker threads, token bucket, timeout, retries and delivery metrics
+"""
+
+import itertools
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+from datetime import datetime
+from logging.handlers import SysLogHandler
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from notification_spool import LANES
+
+# Syslog severity per lane
+SYSLOG_LEVELS = {'critical': 'crit', 'warning': 'warning', 'recovery': 'notice', 'report': 'info'}
+TIMEOUT_ERRORS = (requests.exceptions.Timeout, socket.timeout, TimeoutError)
+
+
+class TokenBucket:
+    """rate_per_minute sustained with bursts of up to burst; acquire() waits for a token"""
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+            time.sleep(delay)
+            waited += delay
+
+
+class NotificationChannel:
+    """One sink: publish() only queues; worker threads rate-limit, deliver and record metrics"""
+
+    DEFAULTS = {'workers': 1, 'rate_per_minute': 60, 'burst': 10, 'timeout_seconds': 10, 'retries': 2, 'max_queue': 1000}
+
+    def __init__(self, name, channel_config):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        settings = {**self.DEFAULTS, **channel_config}
+        self.workers = settings['workers']
+        self.timeout = settings['timeout_seconds']
+        self.retries = settings['retries']
+        self.retry_backoff = settings.get('retry_backoff_seconds', 1)
+        self.lanes = set(settings.get('lanes') or LANES)
+        self.bucket = TokenBucket(settings['rate_per_minute'], settings['burst'])
+
+        # Lane order first (failure alerts ahead of reports), then arrival
+        self.queue = queue.PriorityQueue(maxsize=settings['max_queue'])
+        self.sequence = itertools.count()
+        self.threads = []
+        self.condition = threading.Condition()
+        self.pending = 0
+        self.metrics = {
+            'queued': 0, 'attempts': 0, 'delivered': 0, 'failed': 0, 'dropped': 0, 'retries': 0, 'timeouts': 0,
+            'throttled': 0, 'throttle_seconds': 0.0, 'deliver_seconds': 0.0, 'max_deliver_ms': 0.0,
+        }
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"notify-{self.name}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def accepts(self, notification):
+        return notification['lane'] in self.lanes
+
+    def publish(self, notification):
+        """Queue without blocking; False when the queue is full"""
+        rank = LANES.index(notification['lane']) if notification['lane'] in LANES else len(LANES)
+        with self.condition:
+            try:
+                self.queue.put_nowait((rank, next(self.sequence), notification))
+            except queue.Full:
+                self.metrics['dropped'] += 1
+                self.logger.warning(f"Channel {self.name} queue full, dropped '{notification['subject']}'")
+                return False
+            self.pending += 1
+            self.metrics['queued'] += 1
+        return True
+
+    def deliver(self, notification):
+        """Send one notification within self.timeout; raise on failure"""
+        raise NotImplementedError
+
+    def drain(self, timeout):
+        """Wait until everything queued has been delivered or given up on; False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self):
+        for _ in self.threads:
+            try:
+                self.queue.put((len(LANES) + 1, next(self.sequence), None), timeout=self.timeout)
+            except queue.Full:
+                self.logger.warning(f"Channel {self.name} still backed up at shutdown; {self.pending} notifications abandoned")
+                break
+        for thread in self.threads:
+            thread.join(timeout=self.timeout + 1)
+
+    def stats(self):
+        with self.condition:
+            attempts = self.metrics['attempts']
+            return {
+                **self.metrics,
+                'throttle_seconds': round(self.metrics['throttle_seconds'], 3),
+                'deliver_seconds': round(self.metrics['deliver_seconds'], 3),
+                'avg_deliver_ms': round(self.metrics['deliver_seconds'] / attempts * 1000, 2) if attempts else 0.0,
+                'max_deliver_ms': round(self.metrics['max_deliver_ms'], 2),
+                'queue_depth': self.pending,
+            }
+
+    def _run(self):
+        while True:
+            _, _, notification = self.queue.get()
+            if notification is None:
+                return
+            try:
+                self._attempt(notification)
+            finally:
+                with self.condition:
+                    self.pending -= 1
+                    self.condition.notify_all()
+
+    def _attempt(self, notification):
+        for attempt in range(self.retries + 1):
+            waited = self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                self.deliver(notification)
+            except Exception as e:
+                elapsed = time.perf_counter() - started
+                with self.condition:
+                    self._record(waited, elapsed)
+                    if isinstance(e, TIMEOUT_ERRORS):
+                        self.metrics['timeouts'] += 1
+                    if attempt < self.retries:
+                        self.metrics['retries'] += 1
+                    else:
+                        self.metrics['failed'] += 1
+                if attempt < self.retries:
+                    self.logger.warning(f"Channel {self.name} failed to deliver '{notification['subject']}' ({e}), retrying")
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+                    continue
+                self.logger.error(f"Channel {self.name} gave up on '{notification['subject']}' after {attempt + 1} attempts: {e}")
+                return
+            elapsed = time.perf_counter() - started
+            with self.condition:
+                self._record(waited, elapsed)
+                self.metrics['delivered'] += 1
+            self.logger.debug(f"Channel {self.name} delivered '{notification['subject']}' in {elapsed * 1000:.1f} ms")
+            return
+
+    def _record(self, waited, elapsed):
+        if waited:
+            self.metrics['throttled'] += 1
+            self.metrics['throttle_seconds'] += waited
+        self.metrics['attempts'] += 1
+        self.metrics['deliver_seconds'] += elapsed
+        self.metrics['max_deliver_ms'] = max(self.metrics['max_deliver_ms'], elapsed * 1000)
+
+    @staticmethod
+    def payload(notification):
+        """Channel-neutral form of a notification for webhook, file and syslog sinks"""
+        return {
+            'timestamp': datetime.fromtimestamp(notification['created']).isoformat(timespec='seconds'),
+            'source': socket.gethostname(),
+            'lane': notification['lane'],
+            'priority': notification['priority'],
+            'subject': notification['subject'],
+            **(notification.get('details') or {}),
+            'text': notification['text'] or notification['subject'],
+        }
+
+
+class SmtpChannel(NotificationChannel):
+    """Email over the SMTP pool when the spool is off (with it on, EmailSender journals email before returning)"""
+
+    # Timeouts and reconnects are the SMTP pool's; one worker per pooled session
+    DEFAULTS = {**NotificationChannel.DEFAULTS, 'rate_per_minute': 600, 'burst': 50, 'retries': 0}
+
+    def __init__(self, name, channel_config, send):
+        super().__init__(name, channel_config)
+        self.send = send
+
+    def deliver(self, notification):
+        self.send(notification)
+
+
+class WebhookChannel(NotificationChannel):
+    """JSON POST of the notification payload to a generic webhook (chat bridge, incident tool, custom receiver)"""
+
+    def __init__(self, name, channel_config):
+        super().__init__(name, channel_config)
+        self.url = channel_config['url']
+        self.headers = {'Content-Type': 'application/json', **channel_config.get('headers', {})}
+        self.connect_timeout = min(channel_config.get('connect_timeout_seconds', 3), self.timeout)
+
+        # Keep-alive session shared by this channel's workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def deliver(self, notification):
+        response = self.session.post(
+            self.url, data=json.dumps(self.payload(notification)), headers=self.headers,
+            timeout=(self.connect_timeout, self.timeout),
+        )
+        response.raise_for_status()
+
+
+class FileChannel(NotificationChannel):
+    """Appends one JSON line per notification to a local file (reopened per write, so logrotate is safe)"""
+
+    DEFAULTS = {**NotificationChannel.DEFAULTS, 'rate_per_minute': 6000, 'burst': 500, 'retries': 1}
+
+    def __init__(self, name, channel_config):
+        super().__init__(name, channel_config)
+        self.path = Path(channel_config.get('path', '/opt/kafka-monitor/logs/notifications.jsonl'))
+        self.lock = threading.Lock()
+
+    def deliver(self, notification):
+        line = json.dumps(self.payload(notification)) + '\n'
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class SyslogChannel(NotificationChannel):
+    """One RFC 3164 line per notification to the local syslog socket or a remote host:port (UDP or TCP)"""
+
+    DEFAULTS = {**NotificationChannel.DEFAULTS, 'rate_per_minute': 600, 'burst': 100, 'retries': 1}
+
+    def __init__(self, name, channel_config):
+        super().__init__(name, channel_config)
+        self.address = channel_config.get('address', '/dev/log')
+        self.protocol = channel_config.get('protocol', 'udp')
+        self.facility = SysLogHandler.facility_names[channel_config.get('facility', 'local0')]
+        self.tag = channel_config.get('tag', 'kafka-monitor')
+        self.max_bytes = channel_config.get('max_bytes', 2048)
+
+    def deliver(self, notification):
+        payload = self.payload(notification)
+        fields = ' '.join(f"{key}={value}" for key, value in payload.items()
+                          if key not in ('text', 'subject', 'timestamp', 'source') and value is not None)
+        severity = SysLogHandler.priority_names[SYSLOG_LEVELS.get(notification['lane'], 'info')]
+        message = f"<{self.facility << 3 | severity}>{self.tag}: {notification['subject']} [{fields}]"
+        data = message.encode('utf-8', 'replace')[:self.max_bytes]
+
+        if ':' not in self.address:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.sendto(data, self.address)
+            return
+        host, port = self.address.rsplit(':', 1)
+        if self.protocol == 'tcp':
+            with socket.create_connection((host, int(port)), timeout=self.timeout) as sock:
+                sock.sendall(data + b'\n')
+            return
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.sendto(data, (host, int(port)))
+
+
+class NotificationChannels:
+    """Fans each notification out to every enabled channel; publishing never waits on a channel
+
+    send_email is None when the caller spools email itself, so no smtp channel is created.
+    """
+
+    def __init__(self, config, send_email):
+        self.logger = logging.getLogger(__name__)
+
+        channels_config = config.get('notification_channels', {})
+        self.drain_timeout = channels_config.get('drain_timeout_seconds', 30)
+        smtp_workers = config.get('smtp_pool', {}).get('max_connections', 2)
+
+        self.channels = []
+        for name, kind in (('smtp', SmtpChannel), ('webhook', WebhookChannel), ('file', FileChannel), ('syslog', SyslogChannel)):
+            channel_config = channels_config.get(name, {})
+            if not channel_config.get('enabled', name == 'smtp'):
+                continue
+            try:
+                if kind is SmtpChannel:
+                    if send_email is None:
+                        # The caller journals email on the durable spool itself
+                        continue
+                    channel = SmtpChannel(name, {'workers': smtp_workers, **channel_config}, send_email)
+                else:
+                    channel = kind(name, channel_config)
+                self.channels.append(channel.start())
+            except Exception as e:
+                self.logger.error(f"Error configuring notification channel {name}: {e}")
+        self.logger.info(f"Notification channels: {', '.join(channel.name for channel in self.channels) or 'none'}")
+
+    def publish(self, notification):
+        """Queue on every channel that takes the notification's lane; True if at least one accepted it"""
+        accepted = [channel.publish(notification) for channel in self.channels if channel.accepts(notification)]
+        return any(accepted)
+
+    def drain(self, timeout=None):
+        """Wait for every channel to empty its queue; channels drain in parallel, so this is bounded by the slowest"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.drain_timeout)
+        return all([channel.drain(max(deadline - time.monotonic(), 0)) for channel in self.channels])
+
+    def close(self):
+        if not self.drain():
+            self.logger.warning(f"Notification channels not drained within {self.drain_timeout}s: {self.stats()}")
+        for channel in self.channels:
+            channel.close()
+
+    def stats(self):
+        return {channel.name: channel.stats() for channel in self.channels}
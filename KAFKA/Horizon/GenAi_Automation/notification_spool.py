@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+notification_spool.py
+Durable on-disk spool for outbound notification emails
+Append-only journal with batched fsync; a background sender drains it by priority lane with retries and expiry
+"""
+
+import email
+import fcntl
+import json
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Drain order: failure alerts first, daily reports last
+LANES = ('critical', 'warning', 'recovery', 'report')
+DEFAULT_EXPIRY_HOURS = {'critical': 24, 'warning': 2, 'recovery': 6, 'report': 12}
+
+
+class NotificationSpool:
+    """Journal-backed queue of rendered messages, drained by one sender thread"""
+
+    def __init__(self, config, transport):
+        self.logger = logging.getLogger(__name__)
+        self.transport = transport
+
+        spool_config = config.get('notification_spool', {})
+        self.enabled = spool_config.get('enabled', True)
+        self.directory = Path(spool_config.get('directory', '/opt/kafka-monitor/state/spool'))
+        self.fsync_interval = spool_config.get('fsync_interval_ms', 200) / 1000
+        self.retry_base = spool_config.get('retry_base_seconds', 30)
+        self.retry_max = spool_config.get('retry_max_seconds', 900)
+        self.expiry = {lane: hours * 3600 for lane, hours in {**DEFAULT_EXPIRY_HOURS, **spool_config.get('expiry_hours', {})}.items()}
+        self.compact_after = spool_config.get('compact_after', 200)
+        self.adopt_interval = spool_config.get('adopt_interval_seconds', 60)
+        self.drain_timeout = spool_config.get('drain_timeout_seconds', 30)
+
+        self.pending = {}              # id -> entry (a spool holds tens of messages, so lookups are scans)
+        self.journal = None
+        self.journal_path = None
+        self.dirty = False
+        self.finished = 0              # done/dropped records in the current segment
+        self.resume_at = 0.0           # relay-level back-off after a connection failure
+        self.relay_failures = 0
+        self.last_fsync = time.monotonic()
+        self.last_adopt = time.monotonic()
+        self.stopping = False
+        self.thread = None
+        self.condition = threading.Condition()
+        self.metrics = {'queued': 0, 'sent': 0, 'retries': 0, 'expired': 0, 'rejected': 0, 'adopted': 0, 'fsyncs': 0}
+
+    def start(self):
+        """Open a journal segment, adopt segments left by dead processes and start the sender"""
+        if not self.enabled:
+            return self
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.journal = self._open_segment()
+            self.adopt()
+        except Exception as e:
+            self.logger.error(f"Notification spool unavailable in {self.directory}, sending directly: {e}")
+            self.enabled = False
+            return self
+
+        self.thread = threading.Thread(target=self._run, name='notification-spool', daemon=True)
+        self.thread.start()
+        return self
+
+    def enqueue(self, msg, lane='warning', subject=''):
+        """Journal a rendered message and return immediately; the sender delivers it"""
+        now = time.time()
+        entry = {
+            'op': 'add',
+            'id': uuid.uuid4().hex,
+            'lane': lane if lane in LANES else 'warning',
+            'subject': subject,
+            'created': now,
+            'expires': now + self.expiry.get(lane, self.expiry['warning']),
+            'attempts': 0,
+            'next_at': now,
+            'raw': msg.as_string(),
+        }
+        with self.condition:
+            self._append(entry)
+            self.pending[entry['id']] = entry
+            self.metrics['queued'] += 1
+            depth = len(self.pending)
+            self.condition.notify()
+        self.logger.info(f"Queued email '{subject}' ({entry['lane']}, {depth} pending)")
+        return entry['id']
+
+    def drain(self, timeout=None):
+        """Wait until nothing is pending; False on timeout"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.drain_timeout)
+        with self.condition:
+            while self.pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(min(remaining, 0.5))
+        return True
+
+    def close(self, drain=True):
+        """Stop the sender; anything still pending stays in the journal for the next process"""
+        if not self.enabled or self.thread is None:
+            return
+        if drain and not self.drain():
+            self.logger.warning(f"{len(self.pending)} notification(s) left in the spool for the next run")
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join(timeout=10)
+        with self.condition:
+            self._fsync()
+            self.journal.close()
+
+    def stats(self):
+        with self.condition:
+            now = time.time()
+            lanes = {lane: 0 for lane in LANES}
+            for entry in self.pending.values():
+                lanes[entry['lane']] += 1
+            oldest = min((entry['created'] for entry in self.pending.values()), default=None)
+            return {
+                **self.metrics,
+                'pending': len(self.pending),
+                'lanes': lanes,
+                'oldest_age_seconds': round(now - oldest, 1) if oldest else 0.0,
+            }
+
+    def adopt(self):
+        """Take over journal segments whose owning process is gone (crash, restart, one-shot runs)"""
+        for path in sorted(self.directory.glob('spool-*.jsonl')):
+            if path == self.journal_path:
+                continue
+            try:
+                with open(path, 'r+') as f:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue            # Owned by a live process
+                    entries = self._replay(f)
+                    with self.condition:
+                        for entry in entries.values():
+                            self._append(entry)
+                            self.pending[entry['id']] = entry
+                        self.metrics['adopted'] += len(entries)
+                        self._fsync()
+                    path.unlink()
+                if entries:
+                    self.logger.info(f"Adopted {len(entries)} pending notification(s) from {path.name}")
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                self.logger.error(f"Error adopting spool segment {path}: {e}")
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.stopping:
+                    return
+                now = time.monotonic()
+                if self.dirty and now - self.last_fsync >= self.fsync_interval:
+                    self._fsync()
+                if self.finished >= self.compact_after:
+                    self._compact()
+
+                entry, wait = self._next_due()
+                if entry is None:
+                    timeouts = [self.adopt_interval - (now - self.last_adopt)]
+                    if self.dirty:
+                        timeouts.append(self.fsync_interval - (now - self.last_fsync))
+                    if wait is not None:
+                        timeouts.append(wait)
+                    self.condition.wait(max(min(timeouts), 0.01))
+                    adopt = time.monotonic() - self.last_adopt >= self.adopt_interval
+                else:
+                    adopt = False
+
+            if adopt:
+                self.last_adopt = time.monotonic()
+                self.adopt()
+            if entry is not None:
+                self._deliver(entry)
+
+    def _next_due(self):
+        """(entry, None) for the most urgent due message, else (None, seconds until one is due)"""
+        now = time.time()
+        if now < self.resume_at:
+            return None, self.resume_at - now
+        due = [entry for entry in self.pending.values() if entry['next_at'] <= now]
+        if due:
+            return min(due, key=lambda entry: (LANES.index(entry['lane']), entry['created'])), None
+        if self.pending:
+            return None, min(entry['next_at'] for entry in self.pending.values()) - now
+        return None, None
+
+    def _deliver(self, entry):
+        now = time.time()
+        if now > entry['expires']:
+            self._finish(entry, 'expired')
+            self.logger.error(f"Dropped expired email '{entry['subject']}' after {entry['attempts']} attempt(s)")
+            return
+
+        try:
+            self.transport.send(email.message_from_string(entry['raw']))
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+            code = getattr(e, 'smtp_code', None)
+            if code is None or 500 <= code < 600:
+                # Permanent refusal: retrying cannot succeed
+                self._finish(entry, 'rejected')
+                self.logger.error(f"Email '{entry['subject']}' rejected by the relay: {e}")
+                return
+            # 4xx for this message (e.g. mailbox busy): back off this message only
+            self._retry(entry, e, relay_down=False)
+            return
+        except Exception as e:
+            self._retry(entry, e, relay_down=True)
+            return
+
+        self._finish(entry, 'sent')
+        age = now - entry['created']
+        self.logger.info(f"Email sent: {entry['subject']} ({entry['lane']}, attempt {entry['attempts'] + 1}, queued {age:.1f}s)")
+
+    def _retry(self, entry, error, relay_down):
+        with self.condition:
+            entry['attempts'] += 1
+            if relay_down:
+                # Unreachable relay fails every message alike: hold the whole queue, lanes keep their order
+                self.relay_failures += 1
+                delay = self._backoff(self.relay_failures)
+                self.resume_at = time.time() + delay
+            else:
+                delay = self._backoff(entry['attempts'])
+                entry['next_at'] = time.time() + delay
+            self._append({'op': 'retry', 'id': entry['id'], 'attempts': entry['attempts'], 'next_at': entry['next_at']})
+            self.metrics['retries'] += 1
+        self.logger.warning(f"Email '{entry['subject']}' failed (attempt {entry['attempts']}): {error}; retrying in {delay:.0f}s")
+
+    def _backoff(self, failures):
+        return min(self.retry_base * 2 ** (failures - 1), self.retry_max) * random.uniform(0.8, 1.2)
+
+    def _finish(self, entry, outcome):
+        with self.condition:
+            self._append({'op': 'done', 'id': entry['id'], 'outcome': outcome})
+            self.pending.pop(entry['id'], None)
+            self.finished += 1
+            if outcome == 'sent':
+                self.relay_failures = 0
+            self.metrics[outcome] += 1
+            self.condition.notify_all()
+
+    def _append(self, record):
+        # Caller holds the lock; flushed to the OS now (survives a crash), fsynced in batches
+        self.journal.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.journal.flush()
+        self.dirty = True
+
+    def _fsync(self):
+        # Caller holds the lock
+        if self.dirty:
+            os.fsync(self.journal.fileno())
+            self.dirty = False
+            self.metrics['fsyncs'] += 1
+        self.last_fsync = time.monotonic()
+
+    def _open_segment(self):
+        path = self.directory / f"spool-{time.time_ns()}-{os.getpid()}.jsonl"
+        # Locked under a name adopt() ignores, then renamed (the lock follows the inode)
+        new_path = path.with_name(path.name + '.new')
+        journal = open(new_path, 'a')
+        fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.rename(new_path, path)
+        self.journal_path = path
+        self.finished = 0
+        return journal
+
+    def _compact(self):
+        """Start a new segment holding only pending messages, then drop the old one"""
+        # Caller holds the lock
+        old_journal, old_path = self.journal, self.journal_path
+        try:
+            self.journal = self._open_segment()
+            for entry in self.pending.values():
+                self._append(entry)
+            self._fsync()
+        except Exception as e:
+            self.logger.error(f"Spool compaction failed: {e}")
+            self.journal, self.journal_path = old_journal, old_path
+            self.finished = 0
+            return
+        old_journal.close()
+        old_path.unlink()
+
+    def _replay(self, f):
+        """Pending entries from a journal segment"""
+        entries = {}
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue                    # Torn final write
+            if record['op'] == 'add':
+                entries[record['id']] = record
+            elif record['op'] == 'retry' and record['id'] in entries:
+                entries[record['id']].update(attempts=record['attempts'], next_at=record['next_at'])
+            elif record['op'] == 'done':
+                entries.pop(record['id'], None)
+        return entries
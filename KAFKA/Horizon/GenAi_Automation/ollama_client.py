@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+ollama_client.py
+Streaming Ollama client with a pooled keep-alive session
+Supports time-to-first-token and total deadlines, early stop and cancellation
+"""
+
+import json
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Re-exported: callers import the generation types from here
+from llm_backend import CancelToken, GenerationCancelled, GenerationResult, LLMBackend, PromptPrefix
+
+# Closes the priming turn so the model answers briefly; the incident follows as the next turn
+PRIME_REQUEST = "\nReply with READY only. The failure report follows in the next message."
+
+
+class OllamaClient(LLMBackend):
+    """Pooled, streaming client for the Ollama generate API"""
+
+    name = 'ollama'
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        ai_config = config['ai']
+        self.base_url = ai_config['ollama_url'].rstrip('/')
+        self.model = ai_config['model']
+        self.total_timeout = ai_config.get('analysis_timeout_seconds', 120)
+        self.first_token_timeout = ai_config.get('first_token_timeout_seconds', 30)
+        self.connect_timeout = ai_config.get('connect_timeout_seconds', 5)
+        pool_size = ai_config.get('connection_pool_size', 4)
+        # Same num_ctx as analysis calls, or Ollama reloads the model and the primed context is lost
+        self.num_ctx = config.get('prompt', {}).get('context_window_tokens', 8192)
+
+        # One session for the process: TCP connections are kept alive between calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def generate(self, prompt, options=None, required_sections=None, cancel_token=None,
+                 first_token_timeout=None, total_timeout=None, prefix=None, **extra):
+        """Stream a completion, stopping on deadline, cancellation or once required sections are complete"""
+        result = GenerationResult()
+        first_token_timeout = first_token_timeout or self.first_token_timeout
+        total_timeout = total_timeout or self.total_timeout
+        cancel_token = cancel_token or CancelToken()
+
+        payload = {'model': self.model, 'prompt': prompt, 'stream': True, 'options': options or {}}
+        payload.update(extra)
+        if prefix is not None:
+            # Ollama continues from the context tokens instead of re-evaluating the prefix
+            payload['context'] = prefix.handle
+
+        start = time.monotonic()
+        deadline = start + total_timeout
+        parts = []
+
+        try:
+            # Read timeout bounds the wait for the first chunk; later chunks are checked against the deadline
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=(self.connect_timeout, min(first_token_timeout, total_timeout))
+            )
+            cancel_token.response = response
+
+            with response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if cancel_token.cancelled:
+                        raise GenerationCancelled()
+                    if not line:
+                        continue
+
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise RuntimeError(chunk['error'])
+
+                    token = chunk.get('response', '')
+                    if token:
+                        if result.time_to_first_token is None:
+                            result.time_to_first_token = time.monotonic() - start
+                        parts.append(token)
+                        result.chunks += 1
+
+                    if chunk.get('done'):
+                        result.stop_reason = 'complete'
+                        result.eval_count = chunk.get('eval_count')
+                        result.prompt_eval_count = chunk.get('prompt_eval_count')
+                        result.prompt_eval_duration = chunk.get('prompt_eval_duration')
+                        result.context = chunk.get('context')
+                        break
+
+                    if required_sections and token and self._sections_complete(''.join(parts), required_sections):
+                        result.stop_reason = 'early_stop'
+                        break
+
+                    if time.monotonic() > deadline:
+                        result.stop_reason = 'deadline'
+                        break
+
+        except GenerationCancelled:
+            result.stop_reason = 'cancelled'
+        except requests.exceptions.ReadTimeout as e:
+            result.stop_reason = 'first_token_timeout' if result.time_to_first_token is None else 'deadline'
+            result.error = e
+        except Exception as e:
+            # Closing the response from cancel() surfaces as a connection/stream error
+            result.stop_reason = 'cancelled' if cancel_token.cancelled else 'error'
+            result.error = e
+
+        result.text = ''.join(parts)
+        result.duration = time.monotonic() - start
+        self.logger.debug(
+            f"Ollama generation {result.stop_reason}: {result.chunks} chunks, "
+            f"ttft={result.time_to_first_token}, duration={result.duration:.2f}s"
+        )
+        return result
+
+    def get(self, path, timeout=10):
+        """GET a JSON endpoint through the pooled session"""
+        response = self.session.get(f"{self.base_url}{path}", timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def model_id(self):
+        """Digest of the model as installed; changes when the model is re-pulled"""
+        for model in self.get('/api/tags', timeout=5).get('models', []):
+            if model.get('name') == self.model:
+                return model.get('digest') or self.model
+        return self.model
+
+    def prime(self, text):
+        """Evaluate text once and keep the returned context tokens"""
+        model_id = self.model_id()
+        result = self.generate(text + PRIME_REQUEST, options={'temperature': 0, 'num_predict': 4, 'num_ctx': self.num_ctx})
+        if result.stop_reason != 'complete' or not result.context:
+            raise RuntimeError(f"priming {result.stop_reason}: {result.error}")
+        eval_seconds = (result.prompt_eval_duration or 0) / 1e9 or result.time_to_first_token or 0.0
+        return PromptPrefix(text, result.context, result.prompt_eval_count or len(result.context), eval_seconds, model_id)
+
+    def probe(self):
+        """Cheap liveness check for the circuit breaker"""
+        return self.get('/api/tags', timeout=5)
+
+    def close(self):
+        self.session.close()
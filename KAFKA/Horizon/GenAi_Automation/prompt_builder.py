@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+prompt_builder.py
+Token-budget-aware log excerpt builder for AI prompts
+Ranks log events by severity, recency and novelty and packs them into a token budget
+"""
+
+import logging
+import re
+
+from log_templates import mask_message, parse_log_line
+
+LEVEL_WEIGHTS = {'FATAL': 1.0, 'ERROR': 0.8, 'WARN': 0.4, 'WARNING': 0.4, 'INFO': 0.1, 'DEBUG': 0.0, 'TRACE': 0.0}
+
+CONTINUATION_PATTERN = re.compile(r'^(\s+at\s|\s*Caused by:|\s*\.\.\. \d+ more|\s*Suppressed:)')
+CAUSED_BY_PATTERN = re.compile(r'^\s*(Caused by:|Suppressed:)')
+PACKAGE_PATTERN = re.compile(r'\b(?:[a-z_][\w$]*\.){2,}(?=[A-Z][\w$]*)')
+EXCEPTION_PATTERN = re.compile(r'(Exception|Error|Throwable)\b')
+
+
+class LogEvent:
+    """One log record plus its continuation lines (stack frames, Caused by)"""
+
+    def __init__(self, index, line):
+        self.index = index
+        self.timestamp, self.level, self.message = parse_log_line(line.strip())
+        self.frames = []
+        self.causes = []
+        self.key = mask_message(self.message)
+        self.occurrences = 1
+        self.score = 0.0
+
+    def add_continuation(self, line):
+        if CAUSED_BY_PATTERN.match(line):
+            self.causes.append(line.strip())
+        else:
+            self.frames.append(line.strip())
+
+
+class PromptBuilder:
+    """Selects the most informative log content that fits a token budget"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        prompt_config = config.get('prompt', {})
+        self.context_window = prompt_config.get('context_window_tokens', 8192)
+        self.chars_per_token = prompt_config.get('chars_per_token', 4)
+        self.max_log_tokens = prompt_config.get('max_log_tokens', 1500)
+        self.max_stack_frames = prompt_config.get('max_stack_frames', 6)
+        self.reserve_output_tokens = config.get('ai', {}).get('num_predict', 1000)
+
+        weights = prompt_config.get('weights', {})
+        self.severity_weight = weights.get('severity', 0.5)
+        self.recency_weight = weights.get('recency', 0.2)
+        self.novelty_weight = weights.get('novelty', 0.3)
+
+    def estimate_tokens(self, text):
+        """Cheap token estimate: characters per token, with a floor of one token per word"""
+        if not text:
+            return 0
+        return max(len(text) // self.chars_per_token, len(text.split())) + 1
+
+    def available_tokens(self, fixed_text):
+        """Tokens left for log content once the fixed prompt and the reply are accounted for"""
+        remaining = self.context_window - self.reserve_output_tokens - self.estimate_tokens(fixed_text)
+        return max(0, min(remaining, self.max_log_tokens))
+
+    def parse_events(self, log_content):
+        """Fold continuation lines into their parent record and merge repeated records"""
+        records = []
+        for line in log_content.splitlines():
+            if not line.strip():
+                continue
+            if records and CONTINUATION_PATTERN.match(line):
+                records[-1].add_continuation(line)
+            else:
+                records.append(LogEvent(len(records), line))
+
+        # Repetitive noise (including identical traces): keep one copy, counted, at its latest position
+        events = {}
+        for record in records:
+            key = (record.key, tuple(record.frames[:self.max_stack_frames]), tuple(record.causes))
+            previous = events.get(key)
+            if previous is None:
+                events[key] = record
+            else:
+                previous.occurrences += 1
+                previous.index = record.index
+                previous.timestamp = record.timestamp or previous.timestamp
+
+        return list(events.values())
+
+    def score(self, event, total):
+        if event.level in LEVEL_WEIGHTS:
+            severity = LEVEL_WEIGHTS[event.level]
+        else:
+            severity = 0.7 if EXCEPTION_PATTERN.search(event.message) else 0.2
+        if event.frames or event.causes:
+            severity = min(1.0, severity + 0.3)
+
+        recency = event.index / max(1, total - 1)
+        novelty = 1.0 / event.occurrences
+        return self.severity_weight * severity + self.recency_weight * recency + self.novelty_weight * novelty
+
+    def render(self, event, max_frames=None):
+        """Render an event with timestamps and package prefixes stripped"""
+        max_frames = self.max_stack_frames if max_frames is None else max_frames
+
+        prefix = ''
+        if event.timestamp:
+            prefix = event.timestamp[11:19] + ' '
+        if event.level:
+            prefix += event.level + ' '
+
+        lines = [prefix + self.shorten(event.message)]
+        if event.occurrences > 1:
+            lines[0] += f"  (x{event.occurrences})"
+
+        for frame in event.frames[:max_frames]:
+            lines.append('    ' + self.shorten(frame))
+        if len(event.frames) > max_frames:
+            lines.append(f"    ... {len(event.frames) - max_frames} more frames")
+        for cause in event.causes:
+            lines.append(self.shorten(cause))
+
+        return '\n'.join(lines)
+
+    def shorten(self, text):
+        """org.apache.kafka.clients.NetworkClient -> NetworkClient"""
+        return PACKAGE_PATTERN.sub('', text)
+
+    def build_log_excerpt(self, log_content, token_budget):
+        """Pack the highest-value events into token_budget, emitted in chronological order"""
+        events = self.parse_events(log_content)
+        total = max((event.index for event in events), default=0) + 1
+        for event in events:
+            event.score = self.score(event, total)
+
+        selected = []
+        used = 0
+        for event in sorted(events, key=lambda e: e.score, reverse=True):
+            rendered = self.render(event)
+            cost = self.estimate_tokens(rendered)
+            if used + cost > token_budget and event.frames:
+                # Keep the exception and its causes, drop the frames
+                rendered = self.render(event, max_frames=0)
+                cost = self.estimate_tokens(rendered)
+            if used + cost > token_budget:
+                continue
+            selected.append((event.index, rendered))
+            used += cost
+
+        selected.sort()
+        self.logger.debug(f"Prompt excerpt: {len(selected)}/{total} events, ~{used}/{token_budget} tokens")
+        return '\n'.join(rendered for _, rendered in selected)
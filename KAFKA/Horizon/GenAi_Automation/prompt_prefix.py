@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+prompt_prefix.py
+Per-model cache of evaluated prompt prefixes (fixed analysis instructions)
+Prompts send only the incident-specific suffix; invalidated when the model or the instructions change
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class PromptPrefixCache:
+    """Evaluated prefixes keyed by instruction text, primed lazily through the backend"""
+
+    def __init__(self, config, client):
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+
+        prefix_config = config.get('prompt_prefix', {})
+        self.enabled = prefix_config.get('enabled', True)
+        self.max_entries = prefix_config.get('max_entries', 4)
+        self.model_check_interval = prefix_config.get('model_check_minutes', 10) * 60
+        self.retry_interval = prefix_config.get('retry_minutes', 5) * 60
+        # First use after priming and every Nth after that send the full prompt, measuring what the
+        # backend's own prompt cache achieves without the prefix; savings are counted against that
+        self.baseline_every = prefix_config.get('baseline_every', 20)
+
+        self.entries = OrderedDict()       # sha1(text) -> PromptPrefix
+        self.failed = {}                   # sha1(text) -> monotonic time of the last failed priming
+        self.uses = {}                     # sha1(text) -> get() calls since priming
+        self.baseline = {}                 # sha1(text) -> measured seconds per prompt token with the full prompt
+        self.model_id = None
+        self.model_checked = 0.0
+        self.lock = threading.Lock()
+        self.prime_locks = {}
+        self.metrics = {'primed': 0, 'reused': 0, 'invalidated': 0, 'prime_failures': 0, 'baseline_samples': 0,
+                        'unmeasured': 0, 'saved_seconds': 0.0}
+
+    def get(self, text):
+        """PromptPrefix for text (priming it on first use), or None to send the full prompt"""
+        if not self.enabled:
+            return None
+
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        self.check_model()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                uses = self.uses[key] = self.uses.get(key, 0) + 1
+                if self.baseline_every and (uses == 1 or uses % self.baseline_every == 0):
+                    return None
+                return entry
+            if time.monotonic() - self.failed.get(key, -self.retry_interval) < self.retry_interval:
+                return None
+            prime_lock = self.prime_locks.setdefault(key, threading.Lock())
+
+        # One priming per prefix; concurrent callers wait for it instead of priming again
+        with prime_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry is not None:
+                return entry
+            try:
+                entry = self.client.prime(text)
+            except Exception as e:
+                self.logger.warning(f"Prompt prefix priming failed, sending full prompts: {e}")
+                with self.lock:
+                    self.failed[key] = time.monotonic()
+                    self.metrics['prime_failures'] += 1
+                return None
+            if entry is None:
+                # Backend cannot reuse prefixes
+                self.enabled = False
+                return None
+
+            with self.lock:
+                self.entries[key] = entry
+                self.failed.pop(key, None)
+                self.uses[key] = 1
+                self.metrics['primed'] += 1
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            self.logger.info(f"Primed prompt prefix {key[:8]}: {entry.tokens} tokens evaluated in {entry.eval_seconds * 1000:.0f} ms")
+            # This first use sends the full prompt as the baseline sample
+            return None if self.baseline_every else entry
+
+    def check_model(self, force=False):
+        """Drop every prefix when the backend's model identity changed"""
+        now = time.monotonic()
+        if not force and now - self.model_checked < self.model_check_interval:
+            return
+        self.model_checked = now
+        try:
+            model_id = self.client.model_id()
+        except Exception as e:
+            self.logger.debug(f"Model identity check failed: {e}")
+            return
+
+        if self.model_id is not None and model_id != self.model_id:
+            self.logger.info(f"Model changed ({self.model_id} -> {model_id}), invalidating prompt prefixes")
+            self.invalidate()
+        self.model_id = model_id
+
+    def invalidate(self, entry=None):
+        """Forget one prefix (e.g. after the backend rejected it) or all of them"""
+        with self.lock:
+            if entry is None:
+                self.metrics['invalidated'] += len(self.entries)
+                self.entries.clear()
+                self.uses.clear()
+                self.baseline.clear()
+                return
+            key = hashlib.sha1(entry.text.encode('utf-8')).hexdigest()
+            if self.entries.get(key) is entry:
+                del self.entries[key]
+                self.uses.pop(key, None)
+                self.metrics['invalidated'] += 1
+
+    def record(self, text, entry, result, suffix_tokens):
+        """Account for a generation with prefix text; entry is the reused prefix, or None if the full prompt went out.
+        Returns the prompt-evaluation seconds saved, measured against full-prompt calls of the same prefix"""
+        if entry is not None and result.stop_reason == 'error':
+            self.invalidate(entry)
+            return 0.0
+        if not result.ok or not result.prompt_eval_duration:
+            # Cancelled, failed or without timings: neither a reuse nor a baseline
+            return 0.0
+
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        seconds = result.prompt_eval_duration / 1e9
+        with self.lock:
+            if entry is None:
+                primed = self.entries.get(key)
+                if primed is None:
+                    return 0.0
+                rate = seconds / (primed.tokens + suffix_tokens)
+                previous = self.baseline.get(key)
+                self.baseline[key] = rate if previous is None else 0.7 * previous + 0.3 * rate
+                self.metrics['baseline_samples'] += 1
+                self.logger.debug(f"Prompt prefix {key[:8]} baseline: full prompt evaluated in {seconds * 1000:.0f} ms")
+                return 0.0
+
+            rate = self.baseline.get(key)
+            if rate is None and not self.baseline_every:
+                # Not sampling: price the prefix at its uncached priming cost
+                rate = entry.eval_seconds / max(entry.tokens, 1)
+            self.metrics['reused'] += 1
+            if rate is None:
+                self.metrics['unmeasured'] += 1
+                return 0.0
+            full = rate * (entry.tokens + suffix_tokens)
+            saved = max(full - seconds, 0.0)
+            self.metrics['saved_seconds'] += saved
+
+        evaluated = result.prompt_eval_count if result.prompt_eval_count is not None else '?'
+        self.logger.info(
+            f"Prompt prefix reused ({entry.tokens} tokens): {evaluated} prompt tokens evaluated in {seconds * 1000:.0f} ms "
+            f"vs ~{full * 1000:.0f} ms for the full prompt, {saved * 1000:.0f} ms saved"
+        )
+        return saved
+
+    def stats(self):
+        with self.lock:
+            measured = self.metrics['reused'] - self.metrics['unmeasured']
+            return {
+                **self.metrics,
+                'saved_seconds': round(self.metrics['saved_seconds'], 3),
+                'avg_saved_ms': round(self.metrics['saved_seconds'] / measured * 1000, 1) if measured else 0.0,
+                'entries': len(self.entries),
+            }
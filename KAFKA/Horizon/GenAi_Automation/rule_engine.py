@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+rule_engine.py
+Data-driven, indexed rule engine for fast failure triage
+Rules live in rules.yml and are compiled into a single keyword index
+"""
+
+import logging
+import re
+from pathlib import Path
+
+import yaml
+
+# Rules shipped with the monitor; used when rule_engine.rules_file does not exist
+BUNDLED_RULES = Path(__file__).resolve().parent / 'rules.yml'
+
+SEVERITY_ORDER = ['Critical', 'High', 'Medium', 'Low']
+ACTION_ORDER = ['escalate', 'restart', 'investigate', 'no-action']
+
+# Used when no rule matches
+SERVICE_DEFAULTS = {
+    'kafka': {
+        'severity': 'High',
+        'reason': 'Kafka service disruption affects message processing',
+        'actions': ['Check system resources (memory, disk, CPU)', 'Verify Zookeeper connectivity', 'Review Kafka configuration files'],
+        'prevention': ['Monitor JVM heap usage', 'Set up resource monitoring alerts', 'Regular log rotation and cleanup', 'Network connectivity monitoring'],
+    },
+    'zookeeper': {
+        'severity': 'Critical',
+        'reason': 'Zookeeper failure impacts all Kafka brokers',
+        'actions': ['Check Zookeeper process status', 'Verify available disk space in Zookeeper data directory', 'Check network connectivity between Zookeeper nodes'],
+        'prevention': ['Monitor Zookeeper ensemble health', 'Set up disk space monitoring', 'Regular backup of Zookeeper data', 'Network connectivity monitoring between nodes'],
+    },
+}
+GENERIC_DEFAULT = {
+    'severity': 'Medium',
+    'reason': 'Service disruption requires attention',
+    'actions': ['Check service status: systemctl status <service>', 'Review system resources', 'Check recent system changes'],
+    'prevention': ['Regular system health monitoring', 'Proper log management', 'System resource monitoring'],
+}
+
+
+class Rule:
+    def __init__(self, data):
+        self.rule_id = data['id']
+        self.services = set(data.get('services') or [])
+        self.keywords = [k.lower() for k in data.get('keywords', [])]
+        self.regexes = [re.compile(r, re.IGNORECASE) for r in data.get('regexes', [])]
+        self.severity = data.get('severity', 'Medium')
+        self.action = data.get('action', 'investigate')
+        self.issue = data.get('issue', self.rule_id)
+        self.remediation = data.get('remediation', [])
+
+    def applies_to(self, service_name):
+        return not self.services or service_name in self.services
+
+
+class RuleEngine:
+    """Evaluates compiled rules against log lines in a single pass"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        engine_config = config.get('rule_engine', {})
+        self.rules_file = engine_config.get('rules_file') or str(BUNDLED_RULES)
+        self.max_samples = engine_config.get('max_samples_per_rule', 2)
+
+        self.rules = []
+        self.keyword_index = {}
+        self.keyword_pattern = None
+        self.regex_rules = []
+        self.load_rules()
+
+    def load_rules(self, rules=None):
+        """Load rule definitions (from rules_file unless given) and build the keyword index"""
+        if rules is None:
+            rules_file = Path(self.rules_file)
+            if not rules_file.exists() and BUNDLED_RULES.exists():
+                self.logger.warning(f"Rules file {rules_file} not found, using bundled {BUNDLED_RULES}")
+                rules_file = BUNDLED_RULES
+            try:
+                with open(rules_file, 'r') as f:
+                    rules = yaml.safe_load(f).get('rules', [])
+            except Exception as e:
+                self.logger.error(f"Error loading rules from {rules_file}: {e}")
+                rules = []
+
+        self.rules = [Rule(data) for data in rules]
+        self.keyword_index = {}
+        for rule in self.rules:
+            for keyword in rule.keywords:
+                self.keyword_index.setdefault(keyword, []).append(rule)
+
+        # Longest first so overlapping keywords resolve to the most specific literal
+        keywords = sorted(self.keyword_index, key=len, reverse=True)
+        self.keyword_pattern = re.compile('|'.join(re.escape(k) for k in keywords), re.IGNORECASE) if keywords else None
+        self.regex_rules = [rule for rule in self.rules if rule.regexes]
+        self.logger.info(f"Rule engine loaded {len(self.rules)} rules ({len(keywords)} indexed keywords)")
+
+    def evaluate(self, service_name, lines):
+        """Match rules against log lines; returns a structured triage result"""
+        matches = {}
+
+        def record(rule, line):
+            match = matches.setdefault(rule.rule_id, {'rule': rule, 'hits': 0, 'samples': []})
+            match['hits'] += 1
+            if len(match['samples']) < self.max_samples:
+                match['samples'].append(line.strip()[:300])
+
+        regex_rules = [rule for rule in self.regex_rules if rule.applies_to(service_name)]
+        for line in lines:
+            fired = set()
+            if self.keyword_pattern is not None:
+                for found in self.keyword_pattern.finditer(line):
+                    for rule in self.keyword_index.get(found.group(0).lower(), []):
+                        if rule.rule_id not in fired and rule.applies_to(service_name):
+                            fired.add(rule.rule_id)
+                            record(rule, line)
+            for rule in regex_rules:
+                if rule.rule_id not in fired and any(r.search(line) for r in rule.regexes):
+                    fired.add(rule.rule_id)
+                    record(rule, line)
+
+        ordered = sorted(
+            matches.values(),
+            key=lambda m: (SEVERITY_ORDER.index(m['rule'].severity) if m['rule'].severity in SEVERITY_ORDER else len(SEVERITY_ORDER), -m['hits'])
+        )
+
+        defaults = SERVICE_DEFAULTS.get(service_name, GENERIC_DEFAULT)
+        results = [{
+            'id': m['rule'].rule_id,
+            'issue': m['rule'].issue,
+            'severity': m['rule'].severity,
+            'action': m['rule'].action,
+            'remediation': m['rule'].remediation,
+            'hits': m['hits'],
+            'samples': m['samples'],
+        } for m in ordered]
+
+        return {
+            'service': service_name,
+            'severity': results[0]['severity'] if results else defaults['severity'],
+            'action': min((r['action'] for r in results), key=self._action_rank, default='investigate'),
+            'matches': results,
+        }
+
+    def format_triage(self, triage):
+        """Short triage summary for AI prompts"""
+        if not triage['matches']:
+            return "No known failure signatures matched"
+        return '\n'.join(
+            f"- [{m['severity']}] {m['issue']} ({m['hits']} lines, rule {m['id']})" for m in triage['matches']
+        )
+
+    def format_analysis(self, triage):
+        """Render a triage result in the same sections as the AI analysis"""
+        service_name = triage['service']
+        defaults = SERVICE_DEFAULTS.get(service_name, GENERIC_DEFAULT)
+        matches = triage['matches']
+        issues = [m['issue'] for m in matches]
+        solutions = [step for m in matches for step in m['remediation']]
+        reason = matches[0]['issue'] if matches else defaults['reason']
+
+        return f"""
+PROBLEM SUMMARY:
+{service_name.capitalize()} service failure detected. Issues found: {', '.join(issues) if issues else 'Unknown issue'}
+
+ROOT CAUSE:
+Based on log patterns, this appears to be related to {issues[0] if issues else 'service startup failure'}
+
+SEVERITY LEVEL:
+{triage['severity']} - {reason}
+
+RECOMMENDED ACTION:
+{triage['action']}
+
+IMMEDIATE ACTIONS:
+{chr(10).join(f"{i+1}. {action}" for i, action in enumerate(defaults['actions']))}
+
+SOLUTION STEPS:
+{chr(10).join(f"{i+1}. {step}" for i, step in enumerate(solutions[:5])) or '1. Review the service logs manually'}
+
+EVIDENCE:
+{chr(10).join(f"- {sample}" for m in matches for sample in m['samples']) or '- No matching log lines'}
+
+PREVENTION MEASURES:
+{chr(10).join(f"- {item}" for item in defaults['prevention'])}
+"""
+
+    def _action_rank(self, action):
+        return ACTION_ORDER.index(action) if action in ACTION_ORDER else len(ACTION_ORDER)
@@ -5,6 +5,9 @@
 
 set -e
 
+# Directory holding this script (and the bundled templates/)
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # Colors for output
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -44,6 +47,7 @@ print_step "Creating monitor directory structure..."
 sudo mkdir -p $MONITOR_DIR
 sudo mkdir -p $MONITOR_DIR/logs
 sudo mkdir -p $MONITOR_DIR/templates
+sudo mkdir -p $MONITOR_DIR/state
 
 # Set ownership to wasadmin
 sudo chown -R wasadmin:wasadmin $MONITOR_DIR
@@ -58,7 +62,9 @@ sudo yum install -y python3 python3-pip curl wget
 
 # Install Python packages
 print_step "Installing Python dependencies..."
-pip3 install --user pyyaml requests psutil
+pip3 install --user pyyaml requests psutil numpy jinja2
+# Optional in-process backend (ai.backend: llama_cpp): pip3 install --user llama-cpp-python
+# Optional zstd log attachments (log_attachments.codec: auto/zstd): pip3 install --user zstandard
 
 # Install Ollama for local AI
 print_step "Installing Ollama for local AI analysis..."
@@ -81,6 +87,7 @@ sleep 5
 # Pull the Llama model
 print_info "Pulling Llama3 8B model (this may take several minutes)..."
 ollama pull llama3:8b
+ollama pull nomic-embed-text
 
 print_info "AI model setup complete"
 
@@ -150,132 +157,42 @@ else
     print_info "SSH key already exists"
 fi
 
-# Create email templates
-print_step "Creating email templates..."
-
-# Create failure alert template
-cat > $MONITOR_DIR/templates/failure_alert.html << 'EOF'
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Service Failure Alert</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 20px; }
-        .alert { background: #ffebee; border: 1px solid #f44336; padding: 15px; border-radius: 5px; }
-        .info { background: #e3f2fd; border: 1px solid #2196F3; padding: 15px; border-radius: 5px; margin-top: 15px; }
-        .logs { background: #f5f5f5; padding: 10px; font-family: monospace; font-size: 12px; max-height: 300px; overflow-y: auto; }
-    </style>
-</head>
-<body>
-    <div class="alert">
-        <h2>🚨 Service Alert: {{service_name}} on {{server_host}}</h2>
-        <p><strong>Time:</strong> {{timestamp}}</p>
-        <p><strong>Status:</strong> Service Down</p>
-        <p><strong>Restart Attempted:</strong> {{restart_status}}</p>
-    </div>
-    
-    <div class="info">
-        <h3>AI Analysis</h3>
-        <pre>{{ai_analysis}}</pre>
-    </div>
-    
-    <div class="info">
-        <h3>Recent Logs</h3>
-        <div class="logs">{{log_content}}</div>
-    </div>
-</body>
-</html>
-EOF
-
-# Create recovery notification template
-cat > $MONITOR_DIR/templates/recovery_notification.html << 'EOF'
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Service Recovery</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 20px; }
-        .success { background: #e8f5e8; border: 1px solid #4CAF50; padding: 15px; border-radius: 5px; }
-        .info { background: #e3f2fd; border: 1px solid #2196F3; padding: 15px; border-radius: 5px; margin-top: 15px; }
-    </style>
-</head>
-<body>
-    <div class="success">
-        <h2>✅ Service Recovered: {{service_name}} on {{server_host}}</h2>
-        <p><strong>Recovery Time:</strong> {{timestamp}}</p>
-        <p><strong>Status:</strong> Service Restored</p>
-    </div>
-    
-    <div class="info">
-        <h3>Recovery Details</h3>
-        <ul>
-            <li>Service successfully restarted</li>
-            <li>Port connectivity confirmed</li>
-            <li>Monitoring resumed</li>
-        </ul>
-    </div>
-</body>
-</html>
-EOF
-
-# Create daily report template
-cat > $MONITOR_DIR/templates/daily_report.html << 'EOF'
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Daily Cluster Report</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 20px; }
-        .header { background: #2196F3; color: white; padding: 15px; border-radius: 5px; }
-        .metrics { display: flex; justify-content: space-around; margin: 20px 0; }
-        .metric { text-align: center; padding: 15px; background: #f5f5f5; border-radius: 5px; }
-        .services { margin: 20px 0; }
-        .service { padding: 10px; border-bottom: 1px solid #eee; }
-        .up { color: #4CAF50; }
-        .down { color: #f44336; }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>📊 Daily Kafka/Zookeeper Report</h1>
-        <p>Generated: {{timestamp}}</p>
-    </div>
-    
-    <div class="metrics">
-        <div class="metric">
-            <h3>{{total_services}}</h3>
-            <p>Total Services</p>
-        </div>
-        <div class="metric">
-            <h3>{{healthy_services}}</h3>
-            <p>Healthy</p>
-        </div>
-        <div class="metric">
-            <h3>{{failed_services}}</h3>
-            <p>Failed</p>
-        </div>
-    </div>
-    
-    <div class="services">
-        <h3>Service Status</h3>
-        {{service_list}}
-    </div>
-    
-    <div>
-        <h3>🤖 AI Recommendations</h3>
-        <pre>{{recommendations}}</pre>
-    </div>
-</body>
-</html>
-EOF
-
-print_info "Email templates created"
+# Install email templates (compiled on first use; edits are picked up without a restart) and triage rules
+print_step "Installing email templates and rules..."
+if [[ "$SCRIPT_DIR" != "$MONITOR_DIR" ]]; then
+    cp "$SCRIPT_DIR"/templates/*.html "$SCRIPT_DIR"/templates/*.txt $MONITOR_DIR/templates/
+    cp "$SCRIPT_DIR"/rules.yml $MONITOR_DIR/rules.yml
+fi
+print_info "Email templates and rules installed"
 
 # Set proper permissions
 print_step "Setting file permissions..."
 chmod +x $MONITOR_DIR/monitor.py
 chmod +x $MONITOR_DIR/log_analyzer.py
 chmod +x $MONITOR_DIR/email_sender.py
+chmod +x $MONITOR_DIR/log_templates.py
+chmod +x $MONITOR_DIR/analysis_cache.py
+chmod +x $MONITOR_DIR/analysis_schema.py
+chmod +x $MONITOR_DIR/llm_backend.py
+chmod +x $MONITOR_DIR/ollama_client.py
+chmod +x $MONITOR_DIR/smtp_pool.py
+chmod +x $MONITOR_DIR/notification_spool.py
+chmod +x $MONITOR_DIR/alert_coalescer.py
+chmod +x $MONITOR_DIR/email_templates.py
+chmod +x $MONITOR_DIR/log_attachments.py
+chmod +x $MONITOR_DIR/fleet_report.py
+chmod +x $MONITOR_DIR/notification_channels.py
+chmod +x $MONITOR_DIR/prompt_prefix.py
+chmod +x $MONITOR_DIR/analysis_queue.py
+chmod +x $MONITOR_DIR/prompt_builder.py
+chmod +x $MONITOR_DIR/circuit_breaker.py
+chmod +x $MONITOR_DIR/rule_engine.py
+chmod +x $MONITOR_DIR/incident_index.py
+chmod +x $MONITOR_DIR/exception_folder.py
+chmod +x $MONITOR_DIR/log_columns.py
+chmod +x $MONITOR_DIR/log_sources.py
+chmod +x $MONITOR_DIR/anomaly_detector.py
+chmod +x $MONITOR_DIR/gc_log.py
 chmod 600 $MONITOR_DIR/config.yml
 
 # Reload systemd and enable service
@@ -419,7 +336,7 @@ cat << EOF
 📁 Installation Directory: $MONITOR_DIR
 
 📋 What was installed:
-   ✅ Python dependencies (pyyaml, requests, psutil)
+   ✅ Python dependencies (pyyaml, requests, psutil, numpy)
    ✅ Ollama AI service with Llama3 8B model
    ✅ Systemd service (kafka-monitor.service)
    ✅ Log rotation configuration
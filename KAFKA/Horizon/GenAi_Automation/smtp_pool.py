@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+smtp_pool.py
+Pooled persistent SMTP connections for notification emails
+Idle sessions are health-checked with NOOP, dropped sessions are reconnected transparently
+"""
+
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+
+# Errors meaning the session is gone (relay timeout, 421 shutdown, reset); the message was not accepted
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class SmtpSession:
+    """One open SMTP connection and its usage"""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.messages = 0
+
+
+class SmtpPool:
+    """Bounded pool of SMTP sessions shared by every sender thread"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+
+        email_config = config['email']
+        self.host = email_config['smtp_server']
+        self.port = email_config['smtp_port']
+
+        pool_config = config.get('smtp_pool', {})
+        self.enabled = pool_config.get('enabled', True)
+        self.max_connections = pool_config.get('max_connections', 2)
+        self.timeout = pool_config.get('timeout_seconds', 30)
+        self.noop_after = pool_config.get('noop_after_seconds', 10)
+        self.idle_timeout = pool_config.get('idle_timeout_seconds', 120)
+        self.max_messages = pool_config.get('max_messages_per_connection', 100)
+
+        self.idle = deque()
+        self.open = 0
+        self.condition = threading.Condition()
+        self.metrics = {'connections': 0, 'messages': 0, 'reused': 0, 'noop_checks': 0, 'stale': 0, 'reconnects': 0}
+
+    def send(self, msg):
+        """Send one message, reconnecting once if the pooled session turns out to be dead"""
+        for attempt in range(2):
+            session = self.acquire()
+            try:
+                session.smtp.send_message(msg)
+            except RECONNECT_ERRORS as e:
+                self.discard(session)
+                if attempt == 0 and session.messages:
+                    # A reused session was dropped by the relay; retry on a fresh one
+                    self.logger.info(f"SMTP session lost ({e}), reconnecting")
+                    with self.condition:
+                        self.metrics['reconnects'] += 1
+                    continue
+                raise
+            except smtplib.SMTPResponseException as e:
+                # 421: the relay is closing the session (throttling); other refusals leave it usable
+                if e.smtp_code == 421:
+                    self.discard(session)
+                else:
+                    self.release(session)
+                raise
+            except smtplib.SMTPRecipientsRefused:
+                self.release(session)
+                raise
+            except Exception:
+                self.discard(session)
+                raise
+
+            session.messages += 1
+            with self.condition:
+                self.metrics['messages'] += 1
+                if session.messages > 1:
+                    self.metrics['reused'] += 1
+            self.release(session)
+            return
+
+    def acquire(self):
+        """Healthy idle session, a new one, or wait for one to be released"""
+        while True:
+            with self.condition:
+                session = None
+                if self.idle:
+                    session = self.idle.pop()
+                elif self.open < self.max_connections:
+                    self.open += 1
+                else:
+                    self.condition.wait()
+                    continue
+
+            if session is None:
+                return self._connect()
+
+            # Health checks run outside the lock so a hung relay does not block other senders
+            idle_for = time.monotonic() - session.last_used
+            healthy = idle_for <= self.idle_timeout and (idle_for <= self.noop_after or self._noop(session))
+            if healthy:
+                return session
+            with self.condition:
+                self.metrics['stale'] += 1
+            self._close(session)
+
+    def release(self, session):
+        session.last_used = time.monotonic()
+        if not self.enabled or session.messages >= self.max_messages:
+            self._close(session)
+            return
+        with self.condition:
+            self.idle.append(session)
+            self.condition.notify()
+
+    def discard(self, session):
+        self._close(session, quit=False)
+
+    def close(self):
+        """Quit every idle session (shutdown)"""
+        with self.condition:
+            sessions = list(self.idle)
+            self.idle.clear()
+        for session in sessions:
+            self._close(session)
+
+    def stats(self):
+        with self.condition:
+            return {**self.metrics, 'open': self.open, 'idle': len(self.idle)}
+
+    def _connect(self):
+        # The slot is already reserved in self.open
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.ehlo_or_helo_if_needed()
+        except Exception:
+            with self.condition:
+                self.open -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.metrics['connections'] += 1
+        self.logger.debug(f"Opened SMTP session to {self.host}:{self.port}")
+        return SmtpSession(smtp)
+
+    def _noop(self, session):
+        with self.condition:
+            self.metrics['noop_checks'] += 1
+        try:
+            return session.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _close(self, session, quit=True):
+        try:
+            if quit:
+                session.smtp.quit()
+            else:
+                session.smtp.close()
+        except Exception:
+            session.smtp.close()
+        with self.condition:
+            self.open -= 1
+            self.condition.notify()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+test_log_sources.py
+Splitting the single-round-trip fetch output back into files
+"""
+
+import socket
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from log_sources import LogSourceFetcher
+
+
+def fetcher():
+    return LogSourceFetcher({'monitoring': {'log_lines_to_analyze': 100}})
+
+
+def test_fetch_keeps_a_file_without_trailing_newline_separate(tmp_path):
+    server_log = tmp_path / 'server.log'
+    controller_log = tmp_path / 'controller.log'
+    gc_log = tmp_path / 'gc log.log'
+    server_log.write_text('[2024-01-15 10:23:45,123] INFO started\n[2024-01-15 10:23:46,123] ERROR still writ')
+    controller_log.write_text('[2024-01-15 10:23:47,123] INFO Controller moved\n')
+    gc_log.write_text('[2024-01-15T10:23:48.123+0000][gc] Pause Full')
+    service = {
+        'log_file': str(server_log),
+        'additional_log_files': [str(controller_log), str(tmp_path / 'missing.log'), str(gc_log)],
+    }
+
+    fetched = fetcher().fetch({'host': socket.gethostname()}, service)
+
+    assert fetched == {
+        str(server_log): server_log.read_text(),
+        str(controller_log): controller_log.read_text(),
+        str(tmp_path / 'missing.log'): '',
+        str(gc_log): gc_log.read_text(),
+    }
+
+
+def test_parse_output_drops_only_the_newline_before_each_marker():
+    marker = '@@MARKER@@'
+    sources = [('/a.log', 10), ('/b.log', 10), ('/c.log', 10)]
+    output = f"\n{marker} /a.log\nno newline\n{marker} /b.log\nline\n\n\n{marker} /c.log\nlast\n"
+
+    assert fetcher().parse_output(output, sources, marker) == {'/a.log': 'no newline', '/b.log': 'line\n\n', '/c.log': 'last\n'}
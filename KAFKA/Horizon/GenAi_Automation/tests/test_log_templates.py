@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+test_log_templates.py
+Template miner behaviour at the max_templates cap
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from log_templates import LogTemplateMiner
+
+
+def distinct_lines(count):
+    return '\n'.join(
+        f"[2024-01-15 10:23:{i % 60:02d},123] ERROR word{i} other{i} thing{i} here{i} (kafka.server.KafkaServer)"
+        for i in range(count)
+    )
+
+
+def test_mine_more_distinct_lines_than_max_templates():
+    miner = LogTemplateMiner({'log_mining': {'max_templates': 10}})
+
+    summary = miner.summarize(distinct_lines(40), limit=100)
+
+    assert len(summary) == 40
+    assert sum(item['occurrences'] for item in summary) == 40
+    assert len(miner.templates) <= 10
+
+
+def test_eviction_prefers_templates_outside_the_batch():
+    miner = LogTemplateMiner({'log_mining': {'max_templates': 10}})
+    miner.summarize(distinct_lines(10))
+    old_ids = set(miner.templates)
+
+    results = miner.mine('\n'.join(f"fresh{i} line{i} token{i}" for i in range(3)))
+
+    assert len(results) == 3
+    assert all(template.template_id in miner.templates for template, _ in results)
+    assert len(old_ids - set(miner.templates)) >= 1
+
+
+def test_template_id_does_not_change_the_miner():
+    miner = LogTemplateMiner({})
+    miner.summarize("[2024-01-15 10:23:45,123] ERROR Connection to node 1 refused (kafka.network.Selector)")
+    before = {tid: (list(t.tokens), t.count) for tid, t in miner.templates.items()}
+
+    matched = miner.template_id("[2024-01-15 10:24:45,123] ERROR Connection to node 2 closed (kafka.network.Selector)")
+    unseen = miner.template_id("[2024-01-15 10:25:45,123] INFO Completely different startup message here")
+
+    assert matched in before
+    assert unseen == -1
+    assert {tid: (list(t.tokens), t.count) for tid, t in miner.templates.items()} == before
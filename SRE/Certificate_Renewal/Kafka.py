@@ -80,6 +80,10 @@ os.makedirs(LOG_DIR, exist_ok=True)
 # Safety: only allow automatic restarts if enabled
 AUTO_RESTART_ENABLED = os.getenv("AUTO_RESTART_ENABLED", "true").lower() in ("1","true","yes")
 
+# Alert aggregation: one email per cycle, a cluster alert past the threshold, repeats held back for the quiet period
+ALERT_QUIET_MINUTES = int(os.getenv("ALERT_QUIET_MINUTES", "30"))
+CLUSTER_ALERT_THRESHOLD = int(os.getenv("CLUSTER_ALERT_THRESHOLD", "2"))
+
 # Health check command templates
 CHECK_CMD_TEMPLATE = "ssh wasadmin@{host} 'systemctl is-active {service}'"
 FETCH_LOG_CMD_TEMPLATE = "ssh wasadmin@{host} 'sudo journalctl -u {service} -n {lines} --no-pager --no-hostname --output=short-iso'"
@@ -101,7 +105,26 @@ if LLAMA_ENABLED:
         print(f"[WARN] Could not import llama-cpp-python or load model: {e}")
         llama = None
 
+# One SMTP session reused across alerts; checked with NOOP and reopened when the relay dropped it
+_smtp = None
+
+def smtp_session():
+    global _smtp
+    if _smtp is not None:
+        try:
+            if _smtp.noop()[0] == 250:
+                return _smtp
+        except Exception:
+            pass
+        try:
+            _smtp.close()
+        except Exception:
+            pass
+    _smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+    return _smtp
+
 def send_email(subject, body, attachment_paths=None):
+    global _smtp
     msg = MIMEMultipart()
     msg['From'] = FROM_EMAIL
     msg['To'] = TO_EMAIL
@@ -119,13 +142,56 @@ def send_email(subject, body, attachment_paths=None):
                 print(f"[WARN] Failed to attach {path}: {e}")
 
     try:
-        s = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
-        s.send_message(msg)
-        s.quit()
+        try:
+            smtp_session().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Dropped between the NOOP and the send; one retry on a fresh session
+            _smtp = None
+            smtp_session().send_message(msg)
         print(f"[INFO] Email sent: {subject}")
     except Exception as e:
         print(f"[ERROR] Failed to send email: {e}")
 
+# Alerts raised during a cycle are sent together at its end
+_pending_alerts = []
+_announced = {}  # (kind, key) -> time the last email covering it went out
+
+def queue_alert(kind, key, subject, body, attachment_paths=None):
+    now = time.time()
+    last = _announced.get((kind, key))
+    if last and now - last < ALERT_QUIET_MINUTES * 60:
+        print(f"[INFO] Suppressed repeat {kind} alert for {key} (sent {(now - last) / 60:.0f} min ago)")
+        return
+    _pending_alerts.append((kind, key, subject, body, attachment_paths or []))
+
+def flush_alerts():
+    """Send everything queued this cycle as one email; a cluster alert once enough services are down"""
+    if not _pending_alerts:
+        return
+    alerts = list(_pending_alerts)
+    _pending_alerts.clear()
+    now = time.time()
+    for kind, key, *_ in alerts:
+        # Only a state change re-arms the opposite side (down after a recovery is always sent);
+        # down / restart-failed / escalate for the same outage keep each other's quiet period
+        recovered = kind == "recovered"
+        for announced in [a for a in _announced if a[1] == key and (a[0] == "recovered") != recovered]:
+            del _announced[announced]
+        _announced[(kind, key)] = now
+
+    if len(alerts) == 1:
+        _, _, subject, body, attachments = alerts[0]
+        send_email(subject, body, attachments)
+        return
+    down = sorted({key for kind, key, *_ in alerts if kind == "down"})
+    if len(down) >= CLUSTER_ALERT_THRESHOLD:
+        subject = f"[CLUSTER ALERT] {len(down)} services down: {', '.join(down)}"
+    else:
+        subject = f"[ALERT DIGEST] {len(alerts)} alerts from cluster_monitor_ai"
+    body = "\n\n".join(f"=== {alert_subject} ===\n{alert_body}" for _, _, alert_subject, alert_body, _ in alerts)
+    attachments = list(dict.fromkeys(path for *_, paths in alerts for path in paths))
+    send_email(subject, body, attachments)
+
 def check_service(host, service):
     """Return True if systemctl is-active returns active."""
     try:
@@ -302,7 +368,7 @@ def monitor_cycle():
                         f"AI Action Suggestion: {ai_result.get('action')}\n"
                         f"AI Confidence: {ai_result.get('confidence')}\n\n"
                         f"Full logs are attached ({logfile}).")
-                send_email(subject_alert, body, [logfile])
+                queue_alert("down", f"{service}@{host}", subject_alert, body, [logfile])
                 # take action based on AI suggestion
                 action = ai_result.get("action", "no-action")
                 if action == "restart" and AUTO_RESTART_ENABLED:
@@ -312,17 +378,17 @@ def monitor_cycle():
                         rec_subject = f"[RECOVERED] {service} restarted on {host}"
                         rec_body = (f"{service} on {host} was restarted automatically at {datetime.datetime.utcnow().isoformat()}Z.\n\n"
                                     f"AI summary: {ai_result['summary']}\n\nRestart stdout/stderr:\n{restart_out}")
-                        send_email(rec_subject, rec_body, [logfile])
+                        queue_alert("recovered", f"{service}@{host}", rec_subject, rec_body, [logfile])
                     else:
                         fail_subject = f"[FAILED] Restart failed for {service} on {host}"
                         fail_body = (f"Attempted automatic restart but it failed.\n\nAI summary: {ai_result['summary']}\n\n"
                                      f"Restart output:\n{restart_out}\n\nPlease investigate manually.")
-                        send_email(fail_subject, fail_body, [logfile])
+                        queue_alert("restart-failed", f"{service}@{host}", fail_subject, fail_body, [logfile])
                 elif action == "escalate":
                     esc_subject = f"[ESCALATE] {service} issue on {host}"
                     esc_body = (f"AI suggests escalation for {service} on {host}.\n\nAI summary:\n{ai_result['summary']}\n\n"
                                 f"Please investigate manually. Logs attached.")
-                    send_email(esc_subject, esc_body, [logfile])
+                    queue_alert("escalate", f"{service}@{host}", esc_subject, esc_body, [logfile])
                 else:
                     # no-action
                     print(f"[INFO] AI suggested no-action for {service} on {host}. Email sent with analysis.")
@@ -330,7 +396,10 @@ def monitor_cycle():
             except Exception as exc:
                 trace = traceback.format_exc()
                 print(f"[ERROR] Exception in monitor_cycle for {host} {service}: {exc}\n{trace}")
-                send_email(f"[ERROR] monitor exception for {host}", f"Exception:\n{exc}\n\nTraceback:\n{trace}")
+                # Keyed by exception type so a recurring error is reported once per quiet period
+                queue_alert("error", f"{service}@{host} {type(exc).__name__}",
+                            f"[ERROR] monitor exception for {host}", f"Exception:\n{exc}\n\nTraceback:\n{trace}")
+    flush_alerts()
     return
 
 if __name__ == "__main__":
@@ -340,7 +409,8 @@ if __name__ == "__main__":
             monitor_cycle()
         except Exception as e:
             print(f"[CRITICAL] Fatal loop exception: {e}")
-            send_email("[CRITICAL] cluster_monitor_ai crashed", f"Exception: {e}\n\nTrace: {traceback.format_exc()}")
+            queue_alert("crash", type(e).__name__, "[CRITICAL] cluster_monitor_ai crashed", f"Exception: {e}\n\nTrace: {traceback.format_exc()}")
+            flush_alerts()
         time.sleep(CHECK_INTERVAL)
 
 
@@ -369,7 +439,7 @@ If the LLaMA model is not installed or fails, it falls back to a rule-based heur
 
 
 
-7. The script sends an [ALERT] email immediately with the AI summary and the logs attached.
+7. The script queues an [ALERT] with the AI summary and the logs attached; everything queued in a cycle is sent as one email at its end (a [CLUSTER ALERT] once CLUSTER_ALERT_THRESHOLD services are down), and an alert already sent within ALERT_QUIET_MINUTES is not repeated.
 
 
 8. If AI suggests restart and AUTO_RESTART_ENABLED=true, the script performs sudo systemctl restart on the remote host (via SSH).
@@ -436,6 +506,8 @@ LLAMA_ENABLED=true
 LOG_LINES=200
 CHECK_INTERVAL=300
 AUTO_RESTART_ENABLED=true
+ALERT_QUIET_MINUTES=30
+CLUSTER_ALERT_THRESHOLD=2
 BASE_DIR=/opt/kafka-ai
 
 Save as root and set chmod 600.